@@ -0,0 +1,247 @@
+"""Occupancy analytics: space x slot matrices rasterized with NumPy.
+
+Ranges are split into local calendar months. Each month is reduced to
+additive aggregates (occupied slot fractions per weekday/hour, type and
+activity, peak concurrency, status counts) which are summed into the final
+report. Months that are over are cached for good: only the current month is
+ever recomputed.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+try:
+    import numpy as np
+except ImportError:  # in requirements.txt; without it the analytics API answers 501
+    np = None
+
+from . import archive
+from .cache import TTLCache
+from .catalog import current_revision
+from .conflicts import ACTIVE_STATUSES
+from .db import unindexed
+from .models import BookingStatus, Space, SpaceType, ActivityType
+from .recurrence import series_busy
+from .settings import settings
+
+# (period start, period end, slot, tz, type, activity, catalog revision) -> aggregates of a closed period
+period_cache = TTLCache("analytics", maxsize=settings.ANALYTICS_CACHE_SIZE)
+
+def available() -> bool:
+    return np is not None
+
+def _month_periods(start: datetime, end: datetime, tz: ZoneInfo) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) at local month boundaries."""
+    periods = []
+    cursor = start
+    while cursor < end:
+        local = cursor.astimezone(tz)
+        first = date(local.year + local.month // 12, local.month % 12 + 1, 1)
+        boundary = datetime(first.year, first.month, 1, tzinfo=tz).astimezone(timezone.utc)
+        periods.append((cursor, min(boundary, end)))
+        cursor = min(boundary, end)
+    return periods
+
+def rasterize(rows, starts, ends, n_rows: int, n_slots: int):
+    """Occupied fraction of each (row, slot) cell for intervals given in slot units.
+
+    Whole slots are marked through a difference array and one cumulative
+    sum; the partial slots at each end are added with np.add.at. Overlaps
+    on one row are capped at 1.
+    """
+    s = np.clip(starts, 0, n_slots)
+    e = np.clip(ends, 0, n_slots)
+    keep = e > s
+    rows, s, e = rows[keep], s[keep], e[keep]
+    first_full, last_full = np.ceil(s).astype(np.int64), np.floor(e).astype(np.int64)
+
+    diff = np.zeros((n_rows, n_slots + 1))
+    full = last_full > first_full
+    np.add.at(diff, (rows[full], first_full[full]), 1.0)
+    np.add.at(diff, (rows[full], last_full[full]), -1.0)
+    grid = np.cumsum(diff, axis=1)[:, :n_slots]
+
+    inside = np.floor(s).astype(np.int64) == last_full  # starts and ends within one slot
+    np.add.at(grid, (rows[inside], last_full[inside].clip(max=n_slots - 1)), (e - s)[inside])
+    head = ~inside & (first_full > s)
+    np.add.at(grid, (rows[head], first_full[head] - 1), (first_full - s)[head])
+    tail = ~inside & (e > last_full)
+    np.add.at(grid, (rows[tail], last_full[tail]), (e - last_full)[tail])
+    return np.minimum(grid, 1.0, out=grid)
+
+def _period_aggregates(
+    db: Session, spaces: List[Space], start: datetime, end: datetime, slot_minutes: int, tz: ZoneInfo,
+) -> dict:
+    slot = timedelta(minutes=slot_minutes)
+    n_slots = -(-int((end - start) / timedelta(minutes=1)) // slot_minutes)
+    index = {s.id: i for i, s in enumerate(spaces)}
+
+    # Months before the archive watermark also read bookings_archive (see archive.py)
+    models = archive.tables(db, start)
+    intervals = [
+        row
+        for model in models
+        for row in db.execute(
+            select(model.space_id, model.start_utc, model.end_utc).where(
+                model.space_id.in_(index),
+                model.status.in_(ACTIVE_STATUSES),
+                model.end_utc > start,
+                # Without statistics SQLite scans ix_bookings_status_start_id for
+                # `start_utc < end`, i.e. every earlier booking; the end_utc range of
+                # ix_bookings_space_status_range is the narrow one for a month
+                unindexed(model.start_utc) < end,
+            )
+        )
+    ]
+    occurrences = [
+        (sid, o_start, o_end)
+        for sid, occs in series_busy(db, index.keys(), start, end).items()
+        for o_start, o_end, _ in occs
+    ]
+    intervals += occurrences
+
+    rows = np.fromiter((index[sid] for sid, _, _ in intervals), dtype=np.int64, count=len(intervals))
+    starts = np.fromiter(((b - start) / slot for _, b, _ in intervals), dtype=float, count=len(intervals))
+    ends = np.fromiter(((e - start) / slot for _, _, e in intervals), dtype=float, count=len(intervals))
+    grid = rasterize(rows, starts, ends, len(spaces), n_slots)
+
+    # Local weekday/hour of every slot start
+    slot_starts = [(start + i * slot).astimezone(tz) for i in range(n_slots)]
+    hour = np.fromiter((t.hour for t in slot_starts), dtype=np.int64, count=n_slots)
+    week_hour = np.fromiter((t.weekday() * 24 + t.hour for t in slot_starts), dtype=np.int64, count=n_slots)
+
+    per_slot = grid.sum(axis=0)
+    in_use = (grid > 0).sum(axis=0)
+    peak_slot = int(in_use.argmax()) if n_slots else 0
+
+    def by_group(attr: str) -> Dict[str, dict]:
+        groups: Dict[str, List[int]] = {}
+        for s in spaces:
+            groups.setdefault(getattr(s, attr).value, []).append(index[s.id])
+        return {
+            key: {
+                "spaces": len(members),
+                "occupied_by_hour": np.bincount(hour, weights=grid[members].sum(axis=0), minlength=24),
+            }
+            for key, members in groups.items()
+        }
+
+    statuses: Dict[BookingStatus, int] = {}
+    for model in models:
+        for status, n in db.execute(
+            select(model.status, func.count()).where(
+                model.space_id.in_(index), model.start_utc >= start, model.start_utc < end,
+            ).group_by(model.status)
+        ):
+            statuses[status] = statuses.get(status, 0) + n
+
+    return {
+        "occupied_week_hour": np.bincount(week_hour, weights=per_slot, minlength=168),
+        "slots_week_hour": np.bincount(week_hour, minlength=168).astype(float),
+        "slots_by_hour": np.bincount(hour, minlength=24).astype(float),
+        "by_type": by_group("type"),
+        "by_activity": by_group("activity"),
+        "peak": (int(in_use[peak_slot]) if n_slots else 0, start + peak_slot * slot),
+        "statuses": {status.value: n for status, n in statuses.items()},
+        "series_occurrences": len(occurrences),
+    }
+
+def _merge(parts: List[dict]) -> dict:
+    total = {
+        "occupied_week_hour": sum(p["occupied_week_hour"] for p in parts),
+        "slots_week_hour": sum(p["slots_week_hour"] for p in parts),
+        "slots_by_hour": sum(p["slots_by_hour"] for p in parts),
+        "peak": max((p["peak"] for p in parts), key=lambda peak: peak[0]),
+        "statuses": {},
+        "series_occurrences": sum(p["series_occurrences"] for p in parts),
+    }
+    for p in parts:
+        for status, n in p["statuses"].items():
+            total["statuses"][status] = total["statuses"].get(status, 0) + n
+    for group in ("by_type", "by_activity"):
+        merged: Dict[str, dict] = {}
+        for p in parts:
+            for key, agg in p[group].items():
+                into = merged.setdefault(key, {"spaces": agg["spaces"], "occupied_by_hour": np.zeros(24)})
+                into["occupied_by_hour"] = into["occupied_by_hour"] + agg["occupied_by_hour"]
+        total[group] = merged
+    return total
+
+def _ratio(occupied, capacity):
+    return np.divide(occupied, capacity, out=np.zeros_like(occupied, dtype=float), where=capacity > 0)
+
+def occupancy_report(
+    db: Session, start_day: date, end_day: date, slot_minutes: int, tz_name: str,
+    type: Optional[SpaceType] = None, activity: Optional[ActivityType] = None,
+) -> dict:
+    """Utilization of bookable spaces over local days [start_day, end_day).
+
+    Utilization is occupied space-time over available space-time, counting
+    pending and approved bookings and series occurrences.
+    """
+    tz = ZoneInfo(tz_name)
+    start = datetime(start_day.year, start_day.month, start_day.day, tzinfo=tz).astimezone(timezone.utc)
+    end = datetime(end_day.year, end_day.month, end_day.day, tzinfo=tz).astimezone(timezone.utc)
+    q = db.query(Space).filter(Space.is_bookable == True)  # noqa: E712
+    if type:
+        q = q.filter(Space.type == type)
+    if activity:
+        q = q.filter(Space.activity == activity)
+    spaces = q.order_by(Space.id).all()
+
+    revision = current_revision(db)
+    now = datetime.now(timezone.utc)
+    parts = []
+    for p_start, p_end in _month_periods(start, end, tz):
+        key = (p_start, p_end, slot_minutes, tz_name, type, activity, revision)
+        part = period_cache.get(key)
+        if part is None:
+            part = _period_aggregates(db, spaces, p_start, p_end, slot_minutes, tz)
+            if p_end <= now:
+                period_cache.set(key, part)
+        parts.append(part)
+    total = _merge(parts)
+
+    n = len(spaces)
+    occupied_wh = total["occupied_week_hour"]
+    capacity_wh = total["slots_week_hour"] * n
+    heatmap = _ratio(occupied_wh, capacity_wh).reshape(7, 24)
+    by_hour = _ratio(occupied_wh.reshape(7, 24).sum(axis=0), capacity_wh.reshape(7, 24).sum(axis=0))
+    by_weekday = _ratio(occupied_wh.reshape(7, 24).sum(axis=1), capacity_wh.reshape(7, 24).sum(axis=1))
+
+    def groups(merged: Dict[str, dict]) -> Dict[str, dict]:
+        out = {}
+        for key, agg in sorted(merged.items()):
+            capacity = total["slots_by_hour"] * agg["spaces"]
+            out[key] = {
+                "spaces": agg["spaces"],
+                "utilization": float(_ratio(agg["occupied_by_hour"].sum(), capacity.sum())),
+                "by_hour": _ratio(agg["occupied_by_hour"], capacity).round(4).tolist(),
+            }
+        return out
+
+    statuses = total["statuses"]
+    counted = sum(statuses.values())
+    peak_count, peak_at = total["peak"]
+    return {
+        "start_utc": start,
+        "end_utc": end,
+        "timezone": tz_name,
+        "slot_minutes": slot_minutes,
+        "spaces": n,
+        "utilization": float(_ratio(occupied_wh.sum(), capacity_wh.sum())),
+        "by_hour": by_hour.round(4).tolist(),
+        "by_weekday": by_weekday.round(4).tolist(),
+        "heatmap": heatmap.round(4).tolist(),  # [weekday (Mon=0)][local hour]
+        "by_type": groups(total["by_type"]),
+        "by_activity": groups(total["by_activity"]),
+        "peak_concurrency": {"spaces_in_use": peak_count, "slot_start_utc": peak_at if peak_count else None},
+        "statuses": {
+            s.value: {"count": statuses.get(s.value, 0), "ratio": statuses.get(s.value, 0) / counted if counted else 0.0}
+            for s in BookingStatus
+        },
+        "series_occurrences": total["series_occurrences"],
+    }
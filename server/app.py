@@ -1,18 +1,31 @@
+import logging
 import os
+import time
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.exc import SQLAlchemyError
 
 from .settings import settings
-from .db import engine, Base
+from .db import init_db, count_queries
+from . import archive, events, hashing, idempotency, metrics, profiler
 from .routers import auth as auth_router
 from .routers import users as users_router
 from .routers import spaces as spaces_router
 from .routers import bookings as bookings_router
+from .routers import analytics as analytics_router
+
+log = logging.getLogger(__name__)
 
 app = FastAPI(title="Interactive Office Planner API", version="1.1.0")
 
+# Response headers the frontend may read cross-origin
+EXPOSED_HEADERS = ["ETag", "X-Access-Token", "X-Query-Count", "X-Next-Cursor", idempotency.REPLAYED]
+
+# Idempotency-Key replay for booking writes. Middleware added later wraps it,
+# so replayed responses get CORS headers and show up in the request metrics
+app.middleware("http")(idempotency.middleware)
+
 # CORS: prefer ENV origins, else allow localhost/127.* via regex
 if settings.origins:
     app.add_middleware(
@@ -21,6 +34,7 @@ if settings.origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=EXPOSED_HEADERS,
     )
 else:
     app.add_middleware(
@@ -29,16 +43,50 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=EXPOSED_HEADERS,
     )
 
+# Per-request SQL statement count (e.g. to check list endpoints stay O(1) in queries),
+# latency and SQL time per route for /metrics, and the opt-in profiler
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    profile = profiler.begin(request.headers)
+    started = time.perf_counter()
+    status = 500
+    try:
+        with count_queries() as queries:
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        # the route template, so /spaces/1 and /spaces/2 share a series
+        path = route.path if route is not None else "unmatched"
+        metrics.observe_request(request.method, path, status, elapsed, queries.count, queries.seconds)
+        if profile is not None:
+            written = profiler.end(profile, request.method, path, elapsed)
+            if written:
+                log.info("profile of %s %s (%.0f ms): %s", request.method, request.url.path, elapsed * 1000, written)
+    response.headers["X-Query-Count"] = str(queries.count)
+    return response
+
 # Create tables on startup
 @app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
+async def on_startup():
+    await init_db()
+    await events.start()
+    await archive.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await archive.stop()
+    await events.stop()
+    hashing.shutdown()
 
 # Error normalization
 @app.exception_handler(SQLAlchemyError)
 async def db_error_handler(request: Request, exc: SQLAlchemyError):
+    log.exception("database error in %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(status_code=500, content={"detail": "Database error"})
 
 @app.exception_handler(Exception)
@@ -47,6 +95,7 @@ async def default_error_handler(request: Request, exc: Exception):
     from fastapi.exceptions import HTTPException
     if isinstance(exc, HTTPException):
         raise exc
+    log.exception("unhandled error in %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 # Routers
@@ -54,7 +103,13 @@ app.include_router(auth_router.router)
 app.include_router(users_router.router)
 app.include_router(spaces_router.router)
 app.include_router(bookings_router.router)
+app.include_router(analytics_router.router)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,163 @@
+"""Hot/cold booking storage: past bookings move out of the live table.
+
+Bookings that ended more than ARCHIVE_AFTER_DAYS ago are moved from
+`bookings` to `bookings_archive` (models.ArchivedBooking), keeping their
+ids, ARCHIVE_BATCH_SIZE rows per transaction. The live table then holds
+the recent past and the future only, so conflict checks, the approval
+queue and "my bookings" work on a table that does not grow with history.
+
+Each pass records the horizon it archived up to (the watermark, in the
+revisions table). A read whose window starts before the watermark also
+reads the archive (see `tables`): space availability of past days and
+occupancy analytics do so transparently; /bookings/mine, /bookings/pending
+and the export when asked with `include_archived=true`. New bookings may
+not start before the watermark, so conflict checks never need the archive.
+
+Passes run every ARCHIVE_INTERVAL_SECONDS in every worker (a worker that
+loses a race for a batch gives up until the next pass), or from cron:
+
+    python -m server.archive
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .catalog import current_revision
+from .conflicts import is_retryable
+from .db import IS_ASYNC, SessionLocal, migrate, run_db, run_session
+from .models import ArchivedBooking, Booking, Revision
+from .settings import settings
+
+log = logging.getLogger(__name__)
+
+WATERMARK = "bookings_archive"  # revisions row: minutes since the epoch
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+LIVE = (Booking,)
+ALL = (Booking, ArchivedBooking)
+COLUMNS = [c.name for c in Booking.__table__.columns]
+
+def horizon(days: Optional[float] = None) -> Optional[datetime]:
+    """Bookings that ended before this are due for the archive; None when archiving is off."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    if days <= 0:
+        return None
+    at = datetime.now(timezone.utc) - timedelta(days=days)
+    return at.replace(second=0, microsecond=0)
+
+def archived_until(db: Session) -> Optional[datetime]:
+    minutes = current_revision(db, WATERMARK)
+    return EPOCH + timedelta(minutes=minutes) if minutes else None
+
+def archived_before(db: Session) -> Optional[datetime]:
+    """Bookings ending before this may be archived (or be archived by a pass running now)."""
+    return max((t for t in (archived_until(db), horizon()) if t is not None), default=None)
+
+def tables(db: Session, since: Optional[datetime]) -> Tuple[type, ...]:
+    """Booking tables to read for bookings still running at `since` (None: all history)."""
+    if since is not None and since >= datetime.now(timezone.utc):
+        return LIVE  # nothing running now or later is archived: no lookup
+    limit = archived_before(db)
+    if limit is None or (since is not None and since >= limit):
+        return LIVE
+    return ALL
+
+def _advance(db: Session, to: datetime) -> None:
+    minutes = int((to - EPOCH) / timedelta(minutes=1))
+    result = db.execute(
+        update(Revision).where(Revision.name == WATERMARK, Revision.value < minutes).values(value=minutes)
+    )
+    if result.rowcount == 0 and not current_revision(db, WATERMARK):
+        db.execute(insert(Revision).values(name=WATERMARK, value=minutes))
+
+def archive_pass(db: Session, before: datetime, batch_size: int) -> int:
+    """Move bookings that ended before `before`, a batch per transaction; returns how many moved."""
+    moved = 0
+    source = select(*(Booking.__table__.c[name] for name in COLUMNS))
+    # The newest booking stays live: SQLite hands out max(id) + 1, which must not be an archived id
+    newest = select(func.max(Booking.id)).scalar_subquery()
+    while True:
+        ids = db.execute(
+            select(Booking.id).where(Booking.end_utc < before, Booking.id < newest)
+            .order_by(Booking.end_utc).limit(batch_size)
+        ).scalars().all()
+        try:
+            if ids:
+                db.execute(insert(ArchivedBooking).from_select(COLUMNS, source.where(Booking.id.in_(ids))))
+                db.execute(delete(Booking).where(Booking.id.in_(ids)).execution_options(synchronize_session=False))
+            _advance(db, before)
+            db.commit()
+        except DBAPIError as exc:
+            db.rollback()
+            # Another worker is moving the same rows: a duplicate archived id or, on SQLite, a lock
+            if not isinstance(exc, IntegrityError) and not is_retryable(exc):
+                raise
+            log.info("archive pass stopped after %d bookings: another pass is running", moved)
+            return moved
+        moved += len(ids)
+        metrics.archive_moved.inc(amount=len(ids))
+        if len(ids) < batch_size:
+            return moved
+
+async def run_pass() -> int:
+    before = horizon()
+    if before is None:
+        return 0
+    if IS_ASYNC:
+        async with SessionLocal() as db:
+            moved = await run_db(db, archive_pass, before, settings.ARCHIVE_BATCH_SIZE)
+    else:
+        with SessionLocal() as db:
+            moved = await run_db(db, archive_pass, before, settings.ARCHIVE_BATCH_SIZE)
+    metrics.archive_passes.inc()
+    return moved
+
+_task: Optional[asyncio.Task] = None
+
+async def start() -> None:
+    global _task
+    if horizon() is None or settings.ARCHIVE_INTERVAL_SECONDS <= 0:
+        return
+
+    async def loop() -> None:
+        while True:
+            try:
+                moved = await run_pass()
+                if moved:
+                    log.info("archived %d bookings that ended before %s", moved, horizon())
+            except Exception:
+                log.exception("archive pass failed")
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+    _task = asyncio.create_task(loop())
+
+async def stop() -> None:
+    if _task is not None:
+        _task.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Move bookings that ended long ago to bookings_archive")
+    parser.add_argument("--days", type=float, default=None, help="archive bookings that ended this many days ago "
+                        "(default: ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    before = horizon(args.days)
+    if before is None:
+        parser.error("set ARCHIVE_AFTER_DAYS or --days")
+
+    def run(db: Session) -> int:
+        migrate(db.connection())  # the archive table may not exist yet
+        db.commit()
+        return archive_pass(db, before, args.batch_size)
+
+    moved = run_session(run)
+    print(f"Archived {moved} bookings that ended before {before.isoformat()}.")
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,31 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from typing import Optional, Tuple
 
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
-
-from .db import get_db
+from .db import get_db, run_db, sync_session, DBSession
 from .models import User, Role
 from .settings import settings
+from .cache import TTLCache
+from .hashing import (
+    hash_password,
+    verify_password,
+    hash_password_async,
+    verify_password_async,
+    needs_rehash,
+)
 
 SECRET_KEY = settings.SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-pwd_hasher = PasswordHasher()
+
+# user id -> detached User snapshot; entries are only trusted for the token version they carry
+user_cache = TTLCache("users", maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -26,35 +35,72 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_password(plain_password: str, password_hash: str) -> bool:
+def issue_token(user: User) -> str:
+    return create_access_token({"sub": str(user.id), "ver": user.token_version})
+
+def _snapshot(user: User) -> User:
+    """Detached copy of a loaded user, safe to share between requests."""
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.pop(user_id)
+
+def _claims(token: str) -> Tuple[int, int]:
+    """(user id, token version) of a signed, unexpired token; raises JWTError, TypeError or ValueError."""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return int(payload.get("sub")), int(payload.get("ver", 0))
+
+def token_user_id(authorization: Optional[str]) -> Optional[int]:
+    """User id behind an `Authorization: Bearer` header, without a database read.
+
+    None when the token is invalid, or the user cache knows it was revoked.
+    """
+    scheme, token = get_authorization_scheme_param(authorization)
+    if scheme.lower() != "bearer" or not token:
+        return None
     try:
-        pwd_hasher.verify(password_hash, plain_password)
-        return True
-    except VerifyMismatchError:
-        return False
+        user_id, version = _claims(token)
+    except (JWTError, TypeError, ValueError):
+        return None
+    cached = user_cache.get(user_id)
+    if cached is not None and cached.token_version != version:
+        return None
+    return user_id
 
-def hash_password(plain_password: str) -> str:
-    return pwd_hasher.hash(plain_password)
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    user = db.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = _snapshot(user)
+    user_cache.set(user_id, snapshot)
+    # Give the connection back: read-only endpoints must not pin the single writer
+    db.close()
+    return db.merge(snapshot, load=False)
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user(db: DBSession = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = int(payload.get("sub"))
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id, version = _claims(token)
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
-    user = db.get(User, user_id)
-    if user is None:
+
+    cached = user_cache.get(user_id)
+    if cached is not None and cached.token_version == version:
+        # Attach a per-session copy without touching the database
+        return sync_session(db).merge(cached, load=False)
+
+    user = await run_db(db, _load_user, user_id)
+    if user is None or user.token_version != version:
         raise credentials_exception
     return user
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
+async def require_admin(user: User = Depends(get_current_user)) -> User:
     if user.role != Role.admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
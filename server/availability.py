@@ -0,0 +1,166 @@
+"""Cache of rendered single-space day views (GET /spaces/{id}/availability).
+
+Entries are keyed by (space, UTC day) and hold the JSON body with the
+catalog revision it was rendered at, so a hit costs one revision read and
+no serialization. Every committed booking or series change drops the days
+it touches for its space and the spaces it blocks (see
+`events.add_listener`); space edits bump the catalog revision.
+
+A view computed while a write commits must not be stored after that write
+has invalidated it. Each backend keeps a generation counter that every
+invalidation bumps: lookups return it, and an entry is only stored if it
+has not moved since.
+
+Backends: `MemoryBackend`, a per-worker LRU (with several workers, needs
+EVENTS_BROKER_URL=redis://... to hear about other workers' writes), and
+`RedisBackend`, shared by all workers and invalidated by the writer.
+"""
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .cache import TTLCache
+from .settings import settings
+from . import events
+
+try:
+    import redis
+except ImportError:  # optional dependency: only needed for AVAILABILITY_CACHE_URL=redis://...
+    redis = None
+
+Key = Tuple[int, str]  # (space id, UTC day)
+
+class MemoryBackend:
+    """Per-worker LRU of day views."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float]):
+        self.cache = TTLCache("availability", maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Key, revision: int) -> Tuple[Optional[bytes], int]:
+        generation = self._generation
+        entry = self.cache.get(key)
+        if entry is None or entry[0] != revision:
+            return None, generation
+        return entry[1], generation
+
+    def store(self, key: Key, revision: int, body: bytes, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return  # a write committed meanwhile; the view may predate it
+            self.cache.set(key, (revision, body))
+
+    def invalidate(self, space_id: int, days: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for day in days:
+                self.cache.pop((space_id, day))
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+class RedisBackend:
+    """Day views in Redis, shared by every worker.
+
+    Values are b"<catalog revision>\\n<body>". Entries expire after the TTL;
+    size is bounded by the server's `maxmemory` with an LRU
+    `maxmemory-policy` (evictions are read from its INFO). Hit and miss
+    counters are per worker.
+    """
+
+    PREFIX = "office:availability:"
+    GENERATION = PREFIX + "generation"
+    # Store only if no invalidation happened since the lookup
+    _STORE = """
+    if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    end
+    """
+
+    def __init__(self, url: str, ttl: Optional[float]):
+        if redis is None:
+            raise RuntimeError("AVAILABILITY_CACHE_URL=redis://... needs the redis package (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = int(ttl or 24 * 3600)
+        self._store = self._redis.register_script(self._STORE)
+        self.hits = self.misses = 0
+
+    def _name(self, space_id: int, day: str) -> str:
+        return f"{self.PREFIX}{space_id}:{day}"
+
+    def lookup(self, key: Key, revision: int) -> Tuple[Optional[bytes], int]:
+        value, generation = self._redis.mget(self._name(*key), self.GENERATION)
+        body = None
+        if value is not None:
+            head, _, rest = value.partition(b"\n")
+            if int(head) == revision:
+                body = rest
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body, int(generation or 0)
+
+    def store(self, key: Key, revision: int, body: bytes, generation: int) -> None:
+        value = b"%d\n%s" % (revision, body)
+        self._store(keys=[self._name(*key), self.GENERATION], args=[generation, value, self._ttl])
+
+    def invalidate(self, space_id: int, days: Iterable[str]) -> None:
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.incr(self.GENERATION)
+        pipe.delete(*(self._name(space_id, day) for day in days))
+        pipe.execute()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._redis.info("stats").get("evicted_keys", 0),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+def _make_backend(url: str):
+    ttl = settings.AVAILABILITY_CACHE_TTL_SECONDS or None
+    if url == "memory":
+        return MemoryBackend(settings.AVAILABILITY_CACHE_SIZE, ttl)
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url, ttl)
+    raise ValueError(f"Unsupported AVAILABILITY_CACHE_URL {url!r}")
+
+backend = _make_backend(settings.AVAILABILITY_CACHE_URL) if settings.AVAILABILITY_CACHE_SIZE > 0 else None
+
+def _days(start: datetime, end: datetime) -> List[str]:
+    """UTC days whose view [00:00, 23:59:59] a change over [start, end] shows up in."""
+    day, last = start.date(), end.date()
+    days = []
+    while day <= last:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+def _invalidate(change: dict) -> None:
+    days = _days(change["start_utc"], change["end_utc"])
+    # the views of related spaces show the change too
+    for space_id in (change["space_id"], *change["blocks"]):
+        backend.invalidate(space_id, days)
+
+def lookup(space_id: int, day: date, revision: int) -> Tuple[Optional[bytes], Any]:
+    """Cached body for the view, or None and a token to pass to `store`."""
+    if backend is None:
+        return None, None
+    key = (space_id, day.isoformat())
+    body, generation = backend.lookup(key, revision)
+    return body, (key, revision, generation)
+
+def store(token: Any, body: bytes) -> None:
+    if token is not None:
+        backend.store(*token[:2], body, token[2])
+
+def stats() -> dict:
+    return backend.stats() if backend is not None else {}
+
+if backend is not None:
+    # A per-worker cache also needs the writes committed by other workers
+    events.add_listener(_invalidate, remote=isinstance(backend, MemoryBackend))
@@ -0,0 +1,69 @@
+"""Occupancy report cost: cold, with closed months cached, and per-month rasterization.
+
+    python -m server.bench.analytics --bookings 200000 --months 12
+
+Requires numpy. Runs in-process against a throwaway database filled with
+random bookings over the past `months` months, then times
+analytics.occupancy_report for the whole range twice (cold, then served
+from the closed-month cache) and once for the current month only.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=200_000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--slot-minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'analytics.db')}"
+    # the engine is configured from DATABASE_URL at import time
+    from sqlalchemy import insert
+    from .. import analytics
+    from ..db import run_session
+    from ..models import Booking, BookingStatus, Space, User
+    from ..seed import seed
+
+    seed()
+    today = datetime.now(timezone.utc).date()
+    first = date(today.year, today.month, 1)
+    for _ in range(args.months - 1):
+        first = date(first.year - (first.month == 1), (first.month - 2) % 12 + 1, 1)
+    start = datetime(first.year, first.month, 1, tzinfo=timezone.utc)
+    span = int((datetime.now(timezone.utc) - start).total_seconds() // 900)
+
+    def fill(db):
+        user_id = db.query(User.id).first()[0]
+        space_ids = [s for (s,) in db.query(Space.id)]
+        rng = random.Random(0)
+        rows = []
+        for _ in range(args.bookings):
+            begin = start + timedelta(minutes=15 * rng.randrange(span))
+            rows.append({
+                "user_id": user_id, "space_id": rng.choice(space_ids), "title": "bench", "attendees": 1,
+                "start_utc": begin, "end_utc": begin + timedelta(minutes=rng.choice([30, 60, 120, 480])),
+                "status": rng.choice(list(BookingStatus)),
+            })
+        db.execute(insert(Booking), rows)
+        db.commit()
+
+    run_session(fill)
+    end = today + timedelta(days=1)
+
+    def timed(label: str, start_day: date):
+        t0 = time.perf_counter()
+        report = run_session(lambda db: analytics.occupancy_report(db, start_day, end, args.slot_minutes, "UTC"))
+        print(f"{label:<28}{(time.perf_counter() - t0) * 1000:9.1f} ms  utilization={report['utilization']:.4f}")
+
+    print(f"{args.bookings} bookings over {args.months} months, {args.slot_minutes}-minute slots")
+    timed("full range, cold", first)
+    timed("full range, months cached", first)
+    timed("current month only", date(today.year, today.month, 1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Clearing the approval queue: POST /bookings/decisions vs. one approve call per booking.
+
+    python -m server.bench.approval_queue --queued 3000 --sample 200
+
+Requires httpx. Starts a local server and fills the queue with `queued`
+pending bookings on the approval-only spaces (via POST /bookings/bulk). A
+sample of them is approved one POST /bookings/{id}/approve at a time and the
+rest in a single batch; both are reported per booking and the batch is
+extrapolated against the per-call rate.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+ADMIN = {"email": "admin@example.com", "password": "Hackathon@1234"}
+FIRST = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+def _login(client: httpx.Client, creds: dict) -> dict:
+    return {"Authorization": f"Bearer {client.post('/auth/login', json=creds).json()['access_token']}"}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queued", type=int, default=3000)
+    parser.add_argument("--sample", type=int, default=200, help="bookings approved one call at a time")
+    args = parser.parse_args()
+
+    with local_server() as base, httpx.Client(base_url=base, timeout=300) as client:
+        user, admin = _login(client, CREDS), _login(client, ADMIN)
+        spaces = [s["id"] for s in client.get("/spaces").json() if s["requires_approval"]]
+        items = [
+            {"space_id": spaces[i % len(spaces)], "title": "queued",
+             "start_utc": (FIRST + timedelta(hours=i)).isoformat(),
+             "end_utc": (FIRST + timedelta(hours=i, minutes=45)).isoformat()}
+            for i in range(args.queued)
+        ]
+        for chunk in range(0, len(items), 200):
+            client.post("/bookings/bulk", json={"items": items[chunk:chunk + 200]}, headers=user).raise_for_status()
+        queue = [b["id"] for b in client.get("/bookings/pending", headers=admin).json()]
+        print(f"queued: {len(queue)}")
+
+        single, batch = queue[: args.sample], queue[args.sample:]
+        t0 = time.perf_counter()
+        for booking_id in single:
+            client.post(f"/bookings/{booking_id}/approve", headers=admin).raise_for_status()
+        per_call = (time.perf_counter() - t0) / max(1, len(single))
+
+        t0 = time.perf_counter()
+        r = client.post("/bookings/decisions", json={"approve": batch}, headers=admin)
+        r.raise_for_status()
+        elapsed = time.perf_counter() - t0
+
+    print(f"single calls: {per_call * 1000:.2f} ms/booking ({len(single)} bookings)")
+    print(f"batch:        {elapsed * 1000 / max(1, len(batch)):.3f} ms/booking ({len(batch)} bookings in "
+          f"{elapsed * 1000:.0f} ms, {r.headers['X-Query-Count']} SQL statements, {r.json()['approved']} approved)")
+    print(f"speedup x{per_call * len(batch) / elapsed:.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Hot-path latency as booking history grows, with and without the archive.
+
+    python -m server.bench.archive --per-year 40000 --years 1 4 10 --requests 200
+
+Requires httpx. For each history length, seeds `per-year` synthetic
+bookings a year (so the recent past and the future look the same whatever
+the length) and runs the same requests against a server that keeps all of
+them live and one started with ARCHIVE_AFTER_DAYS, whose first pass moves
+everything older to bookings_archive before measuring. Reports p50 of:
+create + cancel (conflict checks), a page of GET /bookings/mine and of
+GET /bookings/pending, and GET /bookings/mine unpaged (legacy clients, the
+whole history of the demo user). With the archive these should stay flat
+as the history grows; the unpaged list without it grows with the history.
+"""
+import argparse
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+ADMIN = {"email": "admin@example.com", "password": "Hackathon@1234"}
+USER = {"email": "test@example.com", "password": "Hackathon@1234"}
+FIRST = datetime(2100, 1, 1, 8, tzinfo=timezone.utc)
+
+def _metric(client: httpx.Client, name: str) -> float:
+    found = re.search(rf"^{name} (\S+)$", client.get("/metrics").text, re.M)
+    return float(found.group(1)) if found else 0.0
+
+def _p50(client: httpx.Client, requests: int, send) -> float:
+    samples = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        send(client, i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return percentiles(samples)["p50"]
+
+def measure(base: str, requests: int) -> dict:
+    with httpx.Client(base_url=base, timeout=300) as client:
+        user = {"Authorization": f"Bearer {client.post('/auth/login', json=USER).json()['access_token']}"}
+        admin = {"Authorization": f"Bearer {client.post('/auth/login', json=ADMIN).json()['access_token']}"}
+        space_id = client.get("/spaces", params={"q": "Small Room"}).json()[0]["id"]
+
+        def book(c: httpx.Client, i: int):
+            start = FIRST + timedelta(hours=i)
+            r = c.post("/bookings", headers=user, json={
+                "space_id": space_id, "title": "bench", "start_utc": start.isoformat(),
+                "end_utc": (start + timedelta(minutes=30)).isoformat(),
+            })
+            r.raise_for_status()
+            c.delete(f"/bookings/{r.json()['id']}", headers=user).raise_for_status()
+
+        def get(path: str, headers: dict, params: dict):
+            return lambda c, i: c.get(path, params=params, headers=headers).raise_for_status()
+
+        return {
+            "create+cancel": _p50(client, requests, book),
+            "mine page": _p50(client, requests, get("/bookings/mine", user, {"limit": 50})),
+            "pending page": _p50(client, requests, get("/bookings/pending", admin, {"limit": 50})),
+            "mine unpaged": _p50(client, max(1, requests // 10), get("/bookings/mine", user, {})),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-year", type=int, default=40_000)
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 4, 10])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--archive-after-days", type=float, default=30)
+    args = parser.parse_args()
+
+    cases = None
+    for years in args.years:
+        seed_args = ["--bookings", str(round(args.per_year * years)), "--years", str(years)]
+        for archived in (False, True):
+            env = {"ARCHIVE_AFTER_DAYS": str(args.archive_after_days if archived else 0)}
+            with local_server(env=env, seed_args=seed_args) as base, httpx.Client(base_url=base) as client:
+                t0 = time.perf_counter()
+                while archived and _metric(client, "archive_passes_total") < 1:
+                    time.sleep(0.05)
+                moved = _metric(client, "archive_bookings_moved_total")
+                waited = time.perf_counter() - t0
+                result = measure(base, args.requests)
+            if cases is None:
+                cases = list(result)
+                print(f"{'history':<22}{'live rows':>10}" + "".join(f"{case + ' ms':>18}" for case in cases))
+            label = f"{years:g}y " + (f"archived ({waited:.1f}s)" if archived else "all live")
+            live = round(args.per_year * years) - int(moved)
+            print(f"{label:<22}{live:>10}" + "".join(f"{result[case]:>18.2f}" for case in cases))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""GET /spaces/{id}/availability with and without the day-view cache.
+
+    python -m server.bench.availability_cache --requests 2000 --days 5
+
+Requires httpx. Starts a local server per setting and reads the day views of
+`days` days of every space in a loop, creating a booking every 100 reads.
+Each created booking must show up in the next read of its day, and that
+read must match one made with the cache off.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+FIRST = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+def run(base: str, requests: int, days: int) -> tuple[list[float], list]:
+    with httpx.Client(base_url=base, timeout=60) as client:
+        auth = {"Authorization": f"Bearer {client.post('/auth/login', json=CREDS).json()['access_token']}"}
+        spaces = [s["id"] for s in client.get("/spaces").json() if s["type"] != "desk" and not s["requires_approval"]]
+        samples, checked = [], []
+        for i in range(requests):
+            space, day = spaces[i % len(spaces)], FIRST + timedelta(days=(i // len(spaces)) % days)
+            if i % 100 == 99:
+                start = day + timedelta(minutes=15 * (i // 100))
+                client.post("/bookings", headers=auth, json={
+                    "space_id": space, "title": f"bench {i}",
+                    "start_utc": start.isoformat(), "end_utc": (start + timedelta(minutes=15)).isoformat(),
+                }).raise_for_status()
+            t0 = time.perf_counter()
+            r = client.get(f"/spaces/{space}/availability", params={"date": day.date().isoformat()})
+            samples.append((time.perf_counter() - t0) * 1000)
+            r.raise_for_status()
+            if i % 100 == 99:
+                titles = [b["title"] for b in r.json()["bookings"]]
+                assert f"bench {i}" in titles, f"booking {i} missing from a cached view"
+                checked.append(r.json())
+    return samples, checked
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=5)
+    args = parser.parse_args()
+
+    views = {}
+    for label, size in (("no cache", "0"), ("cache", "20000")):
+        with local_server(env={"AVAILABILITY_CACHE_SIZE": size}) as base:
+            samples, views[label] = run(base, args.requests, args.days)
+        p = percentiles(samples)
+        print(f"{label:>8}: p50 {p['p50']:.2f} ms, p95 {p['p95']:.2f} ms, "
+              f"{len(samples) / (sum(samples) / 1000):.0f} req/s sequential")
+    assert views["cache"] == views["no cache"], "cached views differ from uncached ones"
+    print(f"{len(views['cache'])} views read right after a booking matched the uncached ones")
+
+if __name__ == "__main__":
+    main()
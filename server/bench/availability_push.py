@@ -0,0 +1,86 @@
+"""Availability push: delivery latency of GET /spaces/events to many open streams.
+
+    python -m server.bench.availability_push --subscribers 200 --changes 50
+
+Requires httpx. Starts a local server and opens `subscribers` SSE streams,
+half on the booked space and half on every space. Each change (a booking
+created, then cancelled) is timed from the write request until every stream
+has received its event.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+FIRST = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+async def _listen(client: httpx.AsyncClient, params: dict, seen: dict, ready: asyncio.Event, count: list) -> None:
+    async with client.stream("GET", "/spaces/events", params=params) as r:
+        count[0] += 1
+        if count[0] == count[1]:
+            ready.set()
+        event = None
+        async for line in r.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "availability":
+                change = json.loads(line[6:])
+                key = (change["id"], change["status"])
+                seen[key] = seen.get(key, 0) + 1
+
+async def run(base: str, subscribers: int, changes: int) -> None:
+    limits = httpx.Limits(max_connections=subscribers + 10)
+    async with httpx.AsyncClient(base_url=base, timeout=None, limits=limits) as client:
+        token = (await client.post("/auth/login", json=CREDS)).json()["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        space = next(s["id"] for s in (await client.get("/spaces")).json()
+                     if s["type"] != "desk" and not s["requires_approval"])
+
+        seen: dict = {}
+        ready, count = asyncio.Event(), [0, subscribers]
+        listeners = [
+            asyncio.create_task(_listen(client, {"space_id": space} if i % 2 else {}, seen, ready, count))
+            for i in range(subscribers)
+        ]
+        await ready.wait()
+
+        samples = []
+        for i in range(changes):
+            start = FIRST + timedelta(hours=i)
+            t0 = time.perf_counter()
+            r = await client.post("/bookings", headers=auth, json={
+                "space_id": space, "title": "push", "attendees": 1,
+                "start_utc": start.isoformat(), "end_utc": (start + timedelta(minutes=30)).isoformat(),
+            })
+            r.raise_for_status()
+            booking = r.json()
+            await client.delete(f"/bookings/{booking['id']}", headers=auth)
+            for status in (booking["status"], "cancelled"):
+                while seen.get((booking["id"], status), 0) < subscribers:
+                    await asyncio.sleep(0.0005)
+            samples.append((time.perf_counter() - t0) * 1000)
+
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    p = percentiles(samples)
+    print(f"{subscribers} streams, {changes} create+cancel pairs, all streams notified of both: "
+          f"p50 {p['p50']:.1f} ms, p95 {p['p95']:.1f} ms, p99 {p['p99']:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--changes", type=int, default=50)
+    args = parser.parse_args()
+    with local_server() as base:
+        asyncio.run(run(base, args.subscribers, args.changes))
+
+if __name__ == "__main__":
+    main()
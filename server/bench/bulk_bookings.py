@@ -0,0 +1,72 @@
+"""POST /bookings/bulk vs. the same bookings made one POST /bookings at a time.
+
+    python -m server.bench.bulk_bookings --desks 20 --days 5 --rounds 5
+
+Requires httpx. Starts a local server; each round books `days` single days
+on each of `desks` desks (a team's week), once as sequential single-booking
+calls and once as one bulk request, on fresh dates so nothing conflicts.
+Reports wall time per round and the SQL statements the server ran
+(X-Query-Count).
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+FIRST_DAY = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+def _items(desks: list[int], first: datetime, days: int) -> list[dict]:
+    return [
+        {"space_id": desk, "title": "bench", "start_utc": (first + timedelta(days=d)).isoformat(),
+         "end_utc": (first + timedelta(days=d + 1)).isoformat()}
+        for desk in desks for d in range(days)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--desks", type=int, default=20)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with local_server() as base, httpx.Client(base_url=base, timeout=120) as client:
+        token = client.post("/auth/login", json=CREDS).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        desks = [s["id"] for s in client.get("/spaces", params={"type": "desk"}).json()][: args.desks]
+        client.get("/bookings/mine", headers=headers, params={"limit": 1})  # warm the user cache
+
+        timings = {"single": [], "bulk": []}
+        queries = {"single": 0, "bulk": 0}
+        first = FIRST_DAY
+        for _ in range(args.rounds):
+            items = _items(desks, first, args.days)
+            t0 = time.perf_counter()
+            for item in items:
+                r = client.post("/bookings", json=item, headers=headers)
+                r.raise_for_status()
+                queries["single"] += int(r.headers["X-Query-Count"])
+            timings["single"].append(time.perf_counter() - t0)
+            first += timedelta(days=args.days)
+
+            items = _items(desks, first, args.days)
+            t0 = time.perf_counter()
+            r = client.post("/bookings/bulk", json={"items": items}, headers=headers)
+            r.raise_for_status()
+            timings["bulk"].append(time.perf_counter() - t0)
+            queries["bulk"] += int(r.headers["X-Query-Count"])
+            first += timedelta(days=args.days)
+
+    n = args.desks * args.days
+    print(f"{n} bookings per round, {args.rounds} rounds")
+    for mode, samples in timings.items():
+        print(f"{mode:<7} median {statistics.median(samples) * 1000:8.1f} ms/round"
+              f"  {queries[mode] / args.rounds:6.0f} SQL statements/round")
+    print(f"speedup x{statistics.median(timings['single']) / statistics.median(timings['bulk']):.1f}")
+
+if __name__ == "__main__":
+    main()
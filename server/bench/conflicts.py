@@ -0,0 +1,96 @@
+"""Create-booking latency vs. size of a space's booking history.
+
+    python -m server.bench.conflicts --sizes 100 10000 1000000
+    python -m server.bench.conflicts --members 8
+
+Each size gets a fresh SQLite file with that many past bookings on one
+space; we then time the conflict check + insert + commit of new bookings
+in the future. With the range-bounded query the timings should stay flat.
+
+With `--members N` the space is a combined space of N member spaces and the
+history is spread over all of them. Its conflict check covers the whole
+group in one IN range query; "per-space" times the alternative of one
+check per related space.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from ..db import Base
+from ..models import Booking, BookingStatus, Space, SpaceType, ActivityType, User, Role
+from ..conflicts import conflict_graph, find_conflict, overlapping
+
+def _populate(engine, history: int, members: int):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "full_name": "Bench",
+                                     "password_hash": "x", "role": Role.employee}])
+        conn.execute(insert(Space), [{"id": 1, "name": "Room", "type": SpaceType.meeting_room,
+                                      "activity": ActivityType.meeting, "capacity": 10,
+                                      "requires_approval": False, "is_bookable": True}])
+        if members:
+            conn.execute(insert(Space), [{"id": 2 + m, "name": f"Room part {m + 1}", "type": SpaceType.meeting_room,
+                                          "activity": ActivityType.meeting, "capacity": 10, "parent_id": 1,
+                                          "requires_approval": False, "is_bookable": True} for m in range(members)])
+        origin = datetime(2000, 1, 1, tzinfo=timezone.utc)
+        batch = []
+        for i in range(history):
+            start = origin + timedelta(hours=i)
+            batch.append({"user_id": 1, "space_id": 1 + i % (members + 1), "title": "past", "attendees": 1,
+                          "start_utc": start, "end_utc": start + timedelta(minutes=50),
+                          "status": BookingStatus.approved})
+            if len(batch) == 50_000:
+                conn.execute(insert(Booking), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(Booking), batch)
+
+def run(history: int, creates: int, members: int = 0) -> tuple[list[float], list[float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        _populate(engine, history, members)
+        Session = sessionmaker(bind=engine)
+        start = datetime(2100, 1, 1, tzinfo=timezone.utc)
+        timings, per_space = [], []
+        for i in range(creates):
+            s = start + timedelta(hours=i)
+            e = s + timedelta(minutes=30)
+            if members:
+                with Session() as db:
+                    related = conflict_graph(db).closure(1)
+                    t0 = time.perf_counter()
+                    any(db.execute(overlapping([sid], s, e).with_only_columns(Booking.id).limit(1)).scalar()
+                        for sid in related)
+                    per_space.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            with Session() as db:
+                if find_conflict(db, 1, s, e) is None:
+                    db.add(Booking(user_id=1, space_id=1, title="new", attendees=1,
+                                   start_utc=s, end_utc=e, status=BookingStatus.approved))
+                    db.commit()
+            timings.append((time.perf_counter() - t0) * 1000)
+        engine.dispose()
+        return timings, per_space
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--creates", type=int, default=200)
+    parser.add_argument("--members", type=int, default=0, help="member spaces of the booked (combined) space")
+    args = parser.parse_args()
+    print(f"{'history':>10} {'p50 ms':>8} {'p99 ms':>8}" + (f" {'per-space check p50 ms':>24}" if args.members else ""))
+    for size in args.sizes:
+        timings, per_space = run(size, args.creates, args.members)
+        t = sorted(timings)
+        p99 = t[min(len(t) - 1, int(len(t) * 0.99))]
+        extra = f" {statistics.median(per_space):>24.3f}" if per_space else ""
+        print(f"{size:>10} {statistics.median(t):>8.3f} {p99:>8.3f}{extra}")
+
+if __name__ == "__main__":
+    main()
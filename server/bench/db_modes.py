@@ -0,0 +1,56 @@
+"""Sync vs async database stack under many concurrent connections.
+
+    python -m server.bench.db_modes --connections 64 256 --seconds 10
+
+Requires httpx and aiosqlite. For each mode (sqlite:// and
+sqlite+aiosqlite://) a local server is started and driven by a closed loop
+of clients reading availability, the catalog and their own bookings.
+Throughput and p50/p99 latency are reported per connection count.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+PATHS = ["/spaces/availability", "/spaces/1/availability", "/bookings/mine", "/auth/verify"]
+
+async def drive(base: str, connections: int, seconds: float) -> tuple[int, list[float]]:
+    limits = httpx.Limits(max_connections=connections)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        token = (await client.post("/auth/login", json=CREDS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        samples: list[float] = []
+        deadline = time.perf_counter() + seconds
+
+        async def client_loop(i: int):
+            n = i
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                await client.get(PATHS[n % len(PATHS)], headers=headers)
+                samples.append((time.perf_counter() - t0) * 1000)
+                n += 1
+
+        await asyncio.gather(*(client_loop(i) for i in range(connections)))
+    return len(samples), samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'mode':<18}{'conns':>6}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for scheme in ("sqlite", "sqlite+aiosqlite"):
+        with local_server(workers=args.workers, scheme=scheme) as base:
+            for conns in args.connections:
+                count, samples = asyncio.run(drive(base, conns, args.seconds))
+                p = percentiles(samples)
+                print(f"{scheme:<18}{conns:>6}{count / args.seconds:>9.0f}{p['p50']:>9.1f}{p['p99']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Server memory and throughput of GET /bookings/export as the exported range grows.
+
+    python -m server.bench.export --bookings 300000 --years 2
+
+Requires httpx and Linux (the server's resident memory comes from
+process_resident_memory_bytes on GET /metrics, sampled while each request
+runs). Seeds `bookings` synthetic bookings over `years`, then exports the
+last month, the last half of the history and all of it as CSV, NDJSON and
+gzipped CSV. The export's memory should not grow with the row count. The
+last case, for comparison, is the unpaged GET /bookings/mine of the demo
+user holding about half of the bookings, which builds its whole body
+in memory; it runs last because freed memory is not always returned to
+the OS.
+"""
+import argparse
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server
+
+ADMIN = {"email": "admin@example.com", "password": "Hackathon@1234"}
+USER = {"email": "test@example.com", "password": "Hackathon@1234"}
+
+def _rss(client: httpx.Client) -> int:
+    return int(re.search(r"^process_resident_memory_bytes (\d+)$", client.get("/metrics").text, re.M).group(1))
+
+class _PeakRSS:
+    """Samples the server's resident memory on another connection until stopped."""
+
+    def __init__(self, base: str):
+        self._client = httpx.Client(base_url=base, timeout=60)
+        self.start = self.peak = _rss(self._client)
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(0.02):
+            self.peak = max(self.peak, _rss(self._client))
+
+    def stop(self) -> float:
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss(self._client))
+        self._client.close()
+        return (self.peak - self.start) / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=300_000)
+    parser.add_argument("--years", type=float, default=2.0)
+    args = parser.parse_args()
+
+    seed_args = ["--bookings", str(args.bookings), "--years", str(args.years)]
+    with local_server(seed_args=seed_args) as base, httpx.Client(base_url=base, timeout=600) as client:
+        admin = {"Authorization": f"Bearer {client.post('/auth/login', json=ADMIN).json()['access_token']}"}
+        now = datetime.now(timezone.utc)
+        ranges = [
+            ("last month", {"from": (now - timedelta(days=30)).isoformat()}),
+            ("last half", {"from": (now - timedelta(days=365 * args.years / 2)).isoformat()}),
+            ("all", {}),
+        ]
+        formats = [("csv", {}), ("ndjson", {"format": "ndjson"}), ("csv.gz", {"gzip": "true"})]
+
+        print(f"{'case':<28}{'rows':>9}{'MB sent':>9}{'seconds':>9}{'rows/s':>10}{'RSS +MB':>9}")
+        for label, window in ranges:
+            for fmt, options in formats:
+                peak = _PeakRSS(base)
+                t0 = time.perf_counter()
+                rows = size = 0
+                unzip = zlib.decompressobj(31) if options.get("gzip") else None
+                with client.stream("GET", "/bookings/export", params={**window, **options}, headers=admin) as r:
+                    r.raise_for_status()
+                    for chunk in r.iter_raw():
+                        size += len(chunk)
+                        rows += (unzip.decompress(chunk) if unzip else chunk).count(b"\n")
+                elapsed = time.perf_counter() - t0
+                grown = peak.stop()
+                rows -= fmt.startswith("csv")  # header
+                print(f"{label + ' ' + fmt:<28}{rows:>9}{size / 2**20:>9.1f}{elapsed:>9.2f}{rows / elapsed:>10.0f}{grown:>9.1f}")
+
+        user = {"Authorization": f"Bearer {client.post('/auth/login', json=USER).json()['access_token']}"}
+        peak = _PeakRSS(base)
+        t0 = time.perf_counter()
+        r = client.get("/bookings/mine", params={"include_cancelled": "true"}, headers=user)
+        r.raise_for_status()
+        elapsed = time.perf_counter() - t0
+        grown = peak.stop()
+        rows = len(r.json())
+        print(f"{'GET /bookings/mine':<28}{rows:>9}{len(r.content) / 2**20:>9.1f}{elapsed:>9.2f}{rows / elapsed:>10.0f}{grown:>9.1f}")
+
+if __name__ == "__main__":
+    main()
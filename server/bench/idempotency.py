@@ -0,0 +1,92 @@
+"""Client retries with Idempotency-Key: first attempt vs. replay, and concurrent duplicates.
+
+    python -m server.bench.idempotency --bookings 300 --retries 3 --duplicates 50
+
+Requires httpx. Starts a local server and books `bookings` free slots, each
+sent once and then retried `retries` times with the same key, as a client
+does after a timeout. Reports latency and SQL statements (X-Query-Count)
+of first attempts vs. replays, and without a key for comparison (where a
+retry answers 409). Then fires `duplicates` identical requests with one key
+at once and checks that exactly one booking was made and every response
+is the same; the same for a cancel.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+FIRST = datetime(2100, 1, 1, 8, tzinfo=timezone.utc)
+
+def _slot(space_id: int, i: int) -> dict:
+    start = FIRST + timedelta(hours=i)
+    return {"space_id": space_id, "title": f"retry {i}", "start_utc": start.isoformat(),
+            "end_utc": (start + timedelta(minutes=45)).isoformat()}
+
+async def run(base: str, bookings: int, retries: int, duplicates: int):
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        token = (await client.post("/auth/login", json=CREDS)).json()["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        spaces = [s["id"] for s in (await client.get("/spaces", params={"q": "Small Room"})).json()]
+        space_id, other_id = spaces[0], spaces[1]
+
+        rows = {"no key: first": [], "no key: retry": [], "key: first": [], "key: replay": []}
+        statuses = {label: {} for label in rows}
+
+        async def send(label: str, body: dict, headers: dict):
+            t0 = time.perf_counter()
+            r = await client.post("/bookings", json=body, headers=headers)
+            rows[label].append(((time.perf_counter() - t0) * 1000, int(r.headers["X-Query-Count"])))
+            statuses[label][r.status_code] = statuses[label].get(r.status_code, 0) + 1
+            return r
+
+        for i in range(bookings):
+            await send("no key: first", _slot(other_id, i), auth)
+            for _ in range(retries):
+                await send("no key: retry", _slot(other_id, i), auth)
+            keyed = {**auth, "Idempotency-Key": str(uuid.uuid4())}
+            first = await send("key: first", _slot(space_id, i), keyed)
+            for _ in range(retries):
+                replay = await send("key: replay", _slot(space_id, i), keyed)
+                assert replay.content == first.content and replay.headers["Idempotent-Replayed"] == "true"
+
+        print(f"{'case':<16}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}{'SQL/req':>9}  statuses")
+        for label, samples in rows.items():
+            p = percentiles([ms for ms, _ in samples])
+            sql = sum(q for _, q in samples) / len(samples)
+            print(f"{label:<16}{len(samples):>9}{p['p50']:>9.2f}{p['p95']:>9.2f}{sql:>9.1f}  {statuses[label]}")
+
+        # Concurrent duplicates of one create, then of one cancel
+        keyed = {**auth, "Idempotency-Key": str(uuid.uuid4())}
+        body = _slot(space_id, bookings + 1)
+        created = await asyncio.gather(*(client.post("/bookings", json=body, headers=keyed) for _ in range(duplicates)))
+        day = (await client.get(f"/spaces/{space_id}/availability", params={"date": body["start_utc"][:10]})).json()
+        made = [b for b in day["bookings"] if b["start_utc"].startswith(body["start_utc"][:19])]
+        replayed = sum(r.headers.get("Idempotent-Replayed") == "true" for r in created)
+        print(f"{duplicates} concurrent creates: statuses {sorted({r.status_code for r in created})}, "
+              f"bookings made {len(made)}, replayed {replayed}")
+        assert len(made) == 1 and len({r.content for r in created}) == 1
+
+        booking_id = created[0].json()["id"]
+        keyed = {**auth, "Idempotency-Key": str(uuid.uuid4())}
+        cancels = await asyncio.gather(*(client.delete(f"/bookings/{booking_id}", headers=keyed) for _ in range(duplicates)))
+        print(f"{duplicates} concurrent cancels: statuses {sorted({r.status_code for r in cancels})}, "
+              f"distinct bodies {len({r.content for r in cancels})}")
+        assert {r.status_code for r in cancels} == {200} and len({r.content for r in cancels}) == 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=300)
+    parser.add_argument("--retries", type=int, default=3, help="retries per booking after the first attempt")
+    parser.add_argument("--duplicates", type=int, default=50, help="concurrent requests sharing one key")
+    args = parser.parse_args()
+    with local_server() as base:
+        asyncio.run(run(base, args.bookings, args.retries, args.duplicates))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Run the API under uvicorn against a throwaway, seeded SQLite database."""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextlib.contextmanager
+def local_server(workers: int = 1, env: dict | None = None, scheme: str = "sqlite", seed_args: list[str] = ()):
+    """Yield the base URL of a freshly seeded server; stop it on exit.
+
+    `scheme` picks the driver, e.g. "sqlite+aiosqlite" for the async stack.
+    `seed_args` go to `python -m server.seed`, e.g. ["--bookings", "100000"].
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        full_env = {**os.environ, **(env or {})}
+        full_env["DATABASE_URL"] = f"{scheme}:///{os.path.join(tmp, 'bench.db')}"
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        subprocess.run([sys.executable, "-m", "server.seed", *seed_args], cwd=root, env=full_env, check=True,
+                       stdout=subprocess.DEVNULL)
+        port = _free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server.app:app", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=root, env=full_env,
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(200):
+                try:
+                    if httpx.get(f"{base}/health").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.05)
+            else:
+                raise RuntimeError("server did not start")
+            yield base
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+def percentiles(samples: list[float]) -> dict:
+    s = sorted(samples)
+    if not s:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    pick = lambda q: s[min(len(s) - 1, int(len(s) * q))]
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
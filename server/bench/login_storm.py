@@ -0,0 +1,73 @@
+"""Login throughput, and latency of other traffic during a login storm.
+
+    python -m server.bench.login_storm --logins 400 --concurrency 64
+
+Requires httpx. Starts a local server, measures GET /spaces latency at rest,
+then again while `concurrency` clients hammer POST /auth/login. Shed logins
+(503) are counted separately from successful ones.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+
+async def _probe(client: httpx.AsyncClient, stop: asyncio.Event, out: list[float]):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/spaces/availability")
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.01)
+
+async def _storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> dict:
+    codes: dict = {}
+    queue = iter(range(logins))
+
+    async def worker():
+        for _ in queue:
+            r = await client.post("/auth/login", json=CREDS)
+            codes[r.status_code] = codes.get(r.status_code, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return codes
+
+async def run(base: str, logins: int, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency + 8)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        idle: list[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop, idle))
+        await asyncio.sleep(2)
+        stop.set()
+        await probe
+
+        busy: list[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop, busy))
+        t0 = time.perf_counter()
+        codes = await _storm(client, logins, concurrency)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await probe
+
+    ok = codes.get(200, 0)
+    print(f"logins: {dict(sorted(codes.items()))} in {elapsed:.2f}s -> {ok / elapsed:.1f} successful/s")
+    for label, samples in (("idle", idle), ("during storm", busy)):
+        p = percentiles(samples)
+        print(f"/spaces/availability {label:>13}: p50={p['p50']:.1f}ms p99={p['p99']:.1f}ms (n={len(samples)})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    args = parser.parse_args()
+    with local_server(workers=args.workers) as base:
+        asyncio.run(run(base, args.logins, args.concurrency))
+
+if __name__ == "__main__":
+    main()
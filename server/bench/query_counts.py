@@ -0,0 +1,70 @@
+"""Check that the booking list endpoints run a constant number of SQL queries.
+
+    python -m server.bench.query_counts --sizes 1 10 100 500
+
+Runs the app in-process against a throwaway database. For each size, that
+many pending bookings (spread over distinct spaces) are inserted for the test
+user, then GET /bookings/mine and GET /bookings/pending are called and their
+X-Query-Count headers recorded. Fails if a count grows with the result size.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+ADMIN = {"email": "admin@example.com", "password": "Hackathon@1234"}
+PATHS = {"/bookings/mine": CREDS, "/bookings/pending": ADMIN}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 500])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'queries.db')}"
+    # the engine is configured from DATABASE_URL at import time
+    from fastapi.testclient import TestClient
+    from ..app import app
+    from ..db import run_session
+    from ..models import Booking, BookingStatus, Space, User
+    from ..seed import seed
+
+    seed()
+    start = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+    def add_bookings(db, n: int):
+        user = db.query(User).filter(User.email == CREDS["email"]).one()
+        spaces = db.query(Space).all()
+        db.query(Booking).delete()
+        for i in range(n):
+            begin = start + timedelta(hours=i)
+            db.add(Booking(user_id=user.id, space_id=spaces[i % len(spaces)].id, title="q", attendees=1,
+                           start_utc=begin, end_utc=begin + timedelta(minutes=30),
+                           status=BookingStatus.pending))
+        db.commit()
+
+    counts: dict = {path: {} for path in PATHS}
+    with TestClient(app) as client:
+        headers = {}
+        for path, creds in PATHS.items():
+            token = client.post("/auth/login", json=creds).json()["access_token"]
+            headers[path] = {"Authorization": f"Bearer {token}"}
+            client.get(path, headers=headers[path])  # warm the user cache
+        for n in args.sizes:
+            run_session(lambda db: add_bookings(db, n))
+            for path in PATHS:
+                r = client.get(path, headers=headers[path])
+                assert len(r.json()) == n, (path, n, len(r.json()))
+                counts[path][n] = int(r.headers["X-Query-Count"])
+
+    ok = True
+    for path, by_size in counts.items():
+        constant = len(set(by_size.values())) == 1
+        ok &= constant
+        print(f"{path:<20}", " ".join(f"n={n}:{c}" for n, c in by_size.items()), "ok" if constant else "GROWS")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Server CPU per request of the list endpoints (GET /spaces, /bookings/mine, /bookings/pending).
+
+    python -m server.bench.serialization --bookings 500 --requests 300
+
+Requires httpx. Starts a local server, gives one user `bookings` pending
+bookings on approval-only spaces (so the same rows fill both booking
+lists), then sends `requests` sequential requests per case. The server's
+CPU time comes from process_cpu_seconds_total on GET /metrics, so the
+client's own work is not counted. The encoder the server uses (orjson or
+the stdlib fallback, same interpreter as this script) is printed first.
+"""
+import argparse
+import importlib.metadata
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+ADMIN = {"email": "admin@example.com", "password": "Hackathon@1234"}
+FIRST = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+def _login(client: httpx.Client, creds: dict) -> dict:
+    return {"Authorization": f"Bearer {client.post('/auth/login', json=creds).json()['access_token']}"}
+
+def _cpu(client: httpx.Client) -> float:
+    return float(re.search(r"^process_cpu_seconds_total (\S+)$", client.get("/metrics").text, re.M).group(1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    try:
+        print(f"encoder: orjson {importlib.metadata.version('orjson')}")
+    except importlib.metadata.PackageNotFoundError:
+        print("encoder: stdlib json (orjson not installed)")
+    with local_server() as base, httpx.Client(base_url=base, timeout=60) as client:
+        user, admin = _login(client, CREDS), _login(client, ADMIN)
+        spaces = [s["id"] for s in client.get("/spaces").json() if s["requires_approval"]]
+        for chunk in range(0, args.bookings, 200):
+            items = [
+                {"space_id": spaces[i % len(spaces)], "title": f"bench {i}",
+                 "start_utc": (FIRST + timedelta(hours=i)).isoformat(),
+                 "end_utc": (FIRST + timedelta(hours=i, minutes=45)).isoformat()}
+                for i in range(chunk, min(chunk + 200, args.bookings))
+            ]
+            client.post("/bookings/bulk", json={"items": items}, headers=user).raise_for_status()
+
+        cases = [
+            ("GET /spaces", "/spaces", None),
+            ("GET /bookings/mine", "/bookings/mine", user),
+            ("GET /bookings/mine?limit=50", "/bookings/mine?limit=50", user),
+            ("GET /bookings/pending", "/bookings/pending", admin),
+            ("  fields=id,start_utc,end_utc", "/bookings/pending?fields=id,start_utc,end_utc", admin),
+        ]
+        print(f"{'case':<32}{'items':>7}{'CPU ms/req':>12}{'p50 ms':>9}{'bytes':>9}")
+        for label, url, headers in cases:
+            r = client.get(url, headers=headers)
+            r.raise_for_status()
+            samples = []
+            cpu = _cpu(client)
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                client.get(url, headers=headers)
+                samples.append((time.perf_counter() - t0) * 1000)
+            cpu_ms = (_cpu(client) - cpu) * 1000 / args.requests
+            print(f"{label:<32}{len(r.json()):>7}{cpu_ms:>12.2f}{percentiles(samples)['p50']:>9.2f}{len(r.content):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Space search at catalog scale: SQL ilike scan vs. substring scan vs. the search index.
+
+    python -m server.bench.space_search --spaces 100000
+
+Runs in-process against a throwaway SQLite database holding the demo
+spaces plus `spaces` synthetic ones spread over buildings and floors. For
+the keystrokes of a few type-ahead searches it times:
+- ilike: `name ILIKE '%q%' OR description ILIKE '%q%'` plus the natural
+  sort, as list_spaces did before the catalog;
+- scan: the substring filter over the in-memory catalog that replaced it;
+- index: CatalogView.filter(q=..., limit=20), i.e. GET /spaces?q=&limit=20.
+Also reports how long the index takes to build after a catalog change.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+TYPE_AHEAD = ["Training Room 2", "b07 f3 desk 42", "quiet booth", "bldg 12 meet"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spaces", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query (median reported)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+    # the engine is configured from DATABASE_URL at import time
+    from sqlalchemy import insert, or_
+    from ..catalog import bump_revision, catalog, natural_key
+    from ..db import run_session
+    from ..models import ActivityType, Space, SpaceType
+    from ..seed import seed
+
+    seed()
+    rng = random.Random(0)
+    kinds = [
+        (SpaceType.desk, ActivityType.focus, "Desk", "Desk with monitor, whole-day bookings"),
+        (SpaceType.small_room, ActivityType.meeting, "Meeting Room", "Meeting room with screen and whiteboard"),
+        (SpaceType.wellbeing_zone, ActivityType.relaxation, "Quiet Booth", "Quiet booth for calls and focus"),
+    ]
+
+    def fill(db):
+        rows = []
+        for i in range(args.spaces):
+            space_type, activity, label, description = kinds[0] if i % 10 < 8 else rng.choice(kinds[1:])
+            building, floor = f"B{i % 40:02d}", (i // 40) % 12
+            rows.append({
+                "name": f"{building} F{floor} {label} {i}", "type": space_type, "activity": activity,
+                "capacity": 1 if space_type == SpaceType.desk else rng.randint(2, 12),
+                "description": f"{description}, Bldg {i % 40} floor {floor}",
+            })
+        db.execute(insert(Space), rows)
+        bump_revision(db)
+        db.commit()
+
+    run_session(fill)
+    t0 = time.perf_counter()
+    view = run_session(catalog.view)
+    print(f"{len(view.spaces)} spaces; catalog + index build after a change: {time.perf_counter() - t0:.2f}s")
+
+    def ilike(db, q):
+        like = f"%{q.lower()}%"
+        rows = db.query(Space).filter(Space.is_bookable == True, or_(Space.name.ilike(like), Space.description.ilike(like))).all()
+        rows.sort(key=lambda s: natural_key(s.name))
+        return rows
+
+    def scan(q):
+        needle = q.lower()
+        return [s for s in view.spaces if needle in s.name.lower() or needle in (s.description or "").lower()]
+
+    def timed(fn, *fn_args):
+        runs = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            result = fn(*fn_args)
+            runs.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(runs), len(result)
+
+    print(f"{'query':<22}{'ilike ms':>10}{'scan ms':>10}{'index ms':>10}{'matches':>9}  top hit")
+    totals = [0.0, 0.0, 0.0]
+    for target in TYPE_AHEAD:
+        for end in range(1, len(target) + 1):
+            q = target[:end]
+            if q.endswith(" "):
+                continue
+            ms_sql, _ = timed(lambda: run_session(lambda db: ilike(db, q)))
+            ms_scan, _ = timed(scan, q)
+            ms_index, _ = timed(view.filter, None, None, q, 20)
+            matches = view.index.search(q)
+            totals = [totals[0] + ms_sql, totals[1] + ms_scan, totals[2] + ms_index]
+            top = view.spaces[matches[0]].name if matches else "-"
+            print(f"{q:<22}{ms_sql:>10.1f}{ms_scan:>10.1f}{ms_index:>10.2f}{len(matches):>9}  {top}")
+    print(f"{'all keystrokes':<22}{totals[0]:>10.0f}{totals[1]:>10.0f}{totals[2]:>10.1f}")
+
+if __name__ == "__main__":
+    main()
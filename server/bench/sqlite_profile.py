@@ -0,0 +1,80 @@
+"""Default vs production SQLite profile under a mixed read/write load.
+
+    python -m server.bench.sqlite_profile --readers 48 --writers 8 --seconds 10
+
+Requires httpx. For each SQLITE_PROFILE a local server is started; `readers`
+clients loop over the read-only endpoints while `writers` clients create and
+cancel bookings. Read and write throughput and latency are reported
+separately, together with any errors (e.g. "database is locked").
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+READ_PATHS = ["/spaces/availability", "/spaces/1/availability", "/bookings/mine", "/spaces"]
+DAY = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+async def run(base: str, readers: int, writers: int, seconds: float) -> dict:
+    limits = httpx.Limits(max_connections=readers + writers)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        token = (await client.post("/auth/login", json=CREDS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        spaces = [s["id"] for s in (await client.get("/spaces")).json() if s["type"] != "desk"]
+        slots = itertools.count()
+        stats = {"read": ([], []), "write": ([], [])}
+        deadline = time.perf_counter() + seconds
+
+        async def timed(kind: str, request):
+            t0 = time.perf_counter()
+            r = await request
+            samples, errors = stats[kind]
+            samples.append((time.perf_counter() - t0) * 1000)
+            if r.status_code >= 500:
+                errors.append(r.status_code)
+            return r
+
+        async def reader(i: int):
+            for n in itertools.count(i):
+                if time.perf_counter() >= deadline:
+                    return
+                await timed("read", client.get(READ_PATHS[n % len(READ_PATHS)], headers=headers))
+
+        async def writer():
+            while time.perf_counter() < deadline:
+                n = next(slots)
+                start = DAY + timedelta(hours=n // len(spaces))
+                body = {"space_id": spaces[n % len(spaces)], "title": "mixed",
+                        "start_utc": start.isoformat(), "end_utc": (start + timedelta(minutes=30)).isoformat()}
+                r = await timed("write", client.post("/bookings", json=body, headers=headers))
+                if r.status_code == 200 and n % 2:
+                    await timed("write", client.delete(f"/bookings/{r.json()['id']}", headers=headers))
+
+        await asyncio.gather(*(reader(i) for i in range(readers)), *(writer() for _ in range(writers)))
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=48)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'kind':<7}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for profile in ("default", "production"):
+        with local_server(workers=args.workers, env={"SQLITE_PROFILE": profile}) as base:
+            stats = asyncio.run(run(base, args.readers, args.writers, args.seconds))
+        for kind, (samples, errors) in stats.items():
+            p = percentiles(samples)
+            print(f"{profile:<12}{kind:<7}{len(samples) / args.seconds:>8.0f}"
+                  f"{p['p50']:>9.1f}{p['p99']:>9.1f}{len(errors):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Concurrency stress test for the reservation path.
+
+    python -m server.bench.stress_bookings --workers 4 --requests 4000 --concurrency 256
+
+Requires httpx. Starts a local server with several uvicorn workers and fires
+heavily overlapping POST /bookings requests at one space from many
+concurrent connections. Afterwards the space's active bookings are checked
+pairwise to prove there is no double booking; throughput and the
+accepted/conflict split are reported.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .local_server import local_server
+
+DAY = datetime(2100, 1, 1, 8, tzinfo=timezone.utc)
+CREDS = {"email": "test@example.com", "password": "Hackathon@1234"}
+
+async def run(base: str, requests: int, concurrency: int, seed: int = 0):
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        token = (await client.post("/auth/login", json=CREDS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        # hourly slots: not a desk, which only takes whole days
+        space_id = (await client.get("/spaces", params={"q": "Small Room 1p #1"})).json()[0]["id"]
+
+        slots = [(rng.randrange(0, 40), rng.randrange(1, 8)) for _ in range(requests)]
+        counts: dict = {}
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(first: int, length: int):
+            start = DAY + timedelta(minutes=15 * first)
+            body = {"space_id": space_id, "title": "stress", "start_utc": start.isoformat(),
+                    "end_utc": (start + timedelta(minutes=15 * length)).isoformat()}
+            async with sem:
+                r = await client.post("/bookings", json=body, headers=headers)
+            counts[r.status_code] = counts.get(r.status_code, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(f, l) for f, l in slots))
+        elapsed = time.perf_counter() - t0
+
+        day = (await client.get(f"/spaces/{space_id}/availability", params={"date": DAY.date().isoformat()})).json()
+    booked = sorted((b["start_utc"], b["end_utc"]) for b in day["bookings"])
+    doubles = sum(1 for a, b in zip(booked, booked[1:]) if b[0] < a[1])
+
+    print(f"requests={requests} elapsed={elapsed:.2f}s throughput={requests / elapsed:.0f} req/s")
+    print("status codes:", dict(sorted(counts.items())))
+    print("double bookings:", doubles)
+    assert doubles == 0, "overlapping active bookings detected"
+    assert counts.get(200, 0) == len(booked), "accepted requests and stored bookings disagree"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--scheme", default="sqlite", help='e.g. "sqlite+aiosqlite"')
+    args = parser.parse_args()
+    with local_server(workers=args.workers, scheme=args.scheme) as base:
+        asyncio.run(run(base, args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Load benchmark: throughput and latency percentiles per endpoint on seeded volume.
+
+    python -m server.bench.suite --users 1000 --bookings 100000 --concurrency 32
+    python -m server.bench.suite --json run.json
+    python -m server.bench.suite --baseline run.json   # flag regressions, exit 1 if any
+
+Requires httpx. Seeds a throwaway database with `python -m server.seed
+--users --bookings --years --seed` (same arguments, same data), starts a
+local server and runs each scenario in turn with `concurrency` clients:
+
+- login: POST /auth/login, cycling through the synthetic users
+- list_spaces: GET /spaces
+- availability: GET /spaces/{id}/availability on random days of the data
+- create_booking: POST /bookings into free slots (no conflicts expected)
+- pending: GET /bookings/pending?limit=50 (admin queue)
+- approve: POST /bookings/{id}/approve on bookings queued beforehand
+
+Every scenario reports throughput, p50/p95/p99 latency and non-2xx
+counts. With --baseline, a p95 more than --tolerance above the baseline or
+a throughput that much below it is a regression.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+import httpx
+
+from .local_server import local_server, percentiles
+
+PASSWORD = "Hackathon@1234"
+ADMIN = {"email": "admin@example.com", "password": PASSWORD}
+USER = {"email": "test@example.com", "password": PASSWORD}
+FUTURE = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+async def _measure(requests: int, concurrency: int, call: Callable[[int], Awaitable[httpx.Response]]) -> dict:
+    samples: list[float] = []
+    codes: dict = {}
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            t0 = time.perf_counter()
+            r = await call(i)
+            samples.append((time.perf_counter() - t0) * 1000)
+            codes[r.status_code] = codes.get(r.status_code, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "throughput": requests / elapsed,
+        **percentiles(samples),
+        "errors": {str(code): n for code, n in sorted(codes.items()) if code >= 300},
+    }
+
+async def run(base: str, args) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=base, timeout=300, limits=limits) as client:
+        async def login(creds: dict) -> dict:
+            r = await client.post("/auth/login", json=creds)
+            r.raise_for_status()
+            return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        user, admin = await login(USER), await login(ADMIN)
+        spaces = (await client.get("/spaces")).json()
+        rooms = [s["id"] for s in spaces if s["type"] != "desk" and not s["requires_approval"]]
+        approval = [s["id"] for s in spaces if s["requires_approval"]]
+        today = datetime.now(timezone.utc).date()
+        days = [(today - timedelta(days=d)).isoformat() for d in range(-90, round(365 * args.years))]
+
+        # Approval queue for the approve scenario, in year 2100 so nothing conflicts
+        queued = []
+        for chunk in range(0, args.requests, 200):
+            items = [
+                {"space_id": approval[i % len(approval)], "title": "bench queue",
+                 "start_utc": (FUTURE + timedelta(hours=i)).isoformat(),
+                 "end_utc": (FUTURE + timedelta(hours=i, minutes=45)).isoformat()}
+                for i in range(chunk, min(chunk + 200, args.requests))
+            ]
+            r = await client.post("/bookings/bulk", json={"items": items}, headers=user)
+            r.raise_for_status()
+            queued.extend(item["booking"]["id"] for item in r.json()["items"])
+
+        logins = [{"email": f"user{i + 1}@example.com", "password": PASSWORD} for i in range(args.users)] or [USER]
+        new_slots = FUTURE + timedelta(days=400)
+
+        scenarios = {
+            "login": (args.login_requests, lambda i: client.post("/auth/login", json=logins[i % len(logins)])),
+            "list_spaces": (args.requests, lambda i: client.get("/spaces")),
+            "availability": (args.requests, lambda i: client.get(
+                f"/spaces/{rng.choice(spaces)['id']}/availability", params={"date": rng.choice(days)})),
+            "create_booking": (args.requests, lambda i: client.post("/bookings", headers=user, json={
+                "space_id": rooms[i % len(rooms)], "title": "bench",
+                "start_utc": (new_slots + timedelta(minutes=30 * (i // len(rooms)))).isoformat(),
+                "end_utc": (new_slots + timedelta(minutes=30 * (i // len(rooms)) + 30)).isoformat(),
+            })),
+            "pending": (args.requests, lambda i: client.get("/bookings/pending", params={"limit": 50}, headers=admin)),
+            "approve": (len(queued), lambda i: client.post(f"/bookings/{queued[i]}/approve", headers=admin)),
+        }
+        results = {}
+        for name, (requests, call) in scenarios.items():
+            if name in args.only or not args.only:
+                results[name] = await _measure(requests, args.concurrency, call)
+        return results
+
+def _report(results: dict, baseline: dict | None, tolerance: float) -> list[str]:
+    regressions = []
+    print(f"{'scenario':<15}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  errors")
+    for name, r in results.items():
+        line = (f"{name:<15}{r['requests']:>9}{r['throughput']:>9.0f}{r['p50']:>9.1f}{r['p95']:>9.1f}"
+                f"{r['p99']:>9.1f}  {r['errors'] or '-'}")
+        old = (baseline or {}).get(name)
+        if old:
+            p95 = r["p95"] / old["p95"] - 1 if old["p95"] else 0.0
+            rate = r["throughput"] / old["throughput"] - 1 if old["throughput"] else 0.0
+            line += f"  (p95 {p95:+.0%}, req/s {rate:+.0%})"
+            if p95 > tolerance or rate < -tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users to seed")
+    parser.add_argument("--bookings", type=int, default=100_000, help="synthetic bookings to seed")
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=1000, help="per scenario")
+    parser.add_argument("--login-requests", type=int, default=200, help="logins hash with Argon2: fewer of them")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--scheme", default="sqlite", help='e.g. "sqlite+aiosqlite"')
+    parser.add_argument("--only", nargs="*", default=[], help="scenario names to run")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--baseline", help="results of an earlier --json run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    seed_args = ["--users", str(args.users), "--bookings", str(args.bookings),
+                 "--years", str(args.years), "--seed", str(args.seed)]
+    with local_server(workers=args.workers, scheme=args.scheme, seed_args=seed_args) as base:
+        results = asyncio.run(run(base, args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    regressions = _report(results, baseline, args.tolerance)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    if regressions:
+        sys.exit(f"regressions: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
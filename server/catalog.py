@@ -0,0 +1,91 @@
+import re
+import threading
+from itertools import islice
+from typing import NamedTuple, Optional
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from .models import Space, SpaceType, ActivityType, Revision
+from .schemas import SpaceOut
+from .search import SpaceIndex, tokens
+from .serialization import encode_space
+
+SPACES = "spaces"
+
+def natural_key(name: str):
+    """Split a string into text/number chunks for natural sorting."""
+    parts = re.findall(r"\d+|\D+", name or "")
+    return [int(p) if p.isdigit() else p.lower() for p in parts]
+
+def current_revision(db: Session, name: str = SPACES) -> int:
+    value = db.execute(select(Revision.value).where(Revision.name == name)).scalar()
+    return value or 0
+
+def bump_revision(db: Session, name: str = SPACES) -> None:
+    """Increment a revision inside the caller's transaction.
+
+    Bulk statements (e.g. `db.query(Space).delete()`) skip flush events and
+    must call this explicitly.
+    """
+    result = db.execute(update(Revision).where(Revision.name == name).values(value=Revision.value + 1))
+    if result.rowcount == 0:
+        db.execute(insert(Revision).values(name=name, value=1))
+
+@event.listens_for(Session, "before_flush")
+def _track_space_changes(session: Session, flush_context, instances):
+    if any(isinstance(o, Space) for o in (*session.new, *session.dirty, *session.deleted)):
+        bump_revision(session)
+
+class CatalogView(NamedTuple):
+    """One revision of the catalog: sorted spaces, their JSON and their search index."""
+    revision: Optional[int]
+    spaces: list[SpaceOut]
+    encoded: dict[int, bytes]
+    index: SpaceIndex
+
+    def filter(
+        self,
+        type: Optional[SpaceType] = None,
+        activity: Optional[ActivityType] = None,
+        q: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[SpaceOut]:
+        """Spaces of `type`/`activity` in catalog order or, with `q`, matching it best first.
+
+        A `q` without any word (e.g. "#") does not filter, like a blank one.
+        """
+        keep = lambda s: (not type or s.type == type) and (not activity or s.activity == activity)
+        if tokens(q):
+            keep_at = (lambda p: keep(self.spaces[p])) if type or activity else None
+            positions = self.index.search(q, keep_at, limit)
+            return [self.spaces[p] for p in positions]
+        return list(islice((s for s in self.spaces if keep(s)), limit))
+
+class SpaceCatalog:
+    """Bookable spaces, natural-sorted once per catalog revision.
+
+    Every lookup compares the in-memory revision with the `revisions` row (a
+    primary-key read), so edits committed by any worker are picked up on
+    that worker's next request. Each space is also kept JSON-encoded, for
+    the list endpoints that splice it into their bodies, and indexed for
+    `q` searches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = CatalogView(None, [], {}, SpaceIndex([], []))
+
+    def view(self, db: Session) -> CatalogView:
+        revision = current_revision(db)
+        if self._state.revision != revision:
+            with self._lock:
+                if self._state.revision != revision:
+                    rows = db.query(Space).filter(Space.is_bookable == True).all()
+                    rows.sort(key=lambda s: natural_key(s.name))
+                    spaces = [SpaceOut.model_validate(s) for s in rows]
+                    encoded = {s.id: encode_space(s.model_dump()) for s in spaces}
+                    index = SpaceIndex([s.name for s in spaces], [s.description for s in spaces])
+                    self._state = CatalogView(revision, spaces, encoded, index)
+        return self._state
+
+catalog = SpaceCatalog()
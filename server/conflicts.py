@@ -0,0 +1,254 @@
+import asyncio
+import bisect
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .catalog import current_revision
+from .db import run_db, DBSession
+from .models import Booking, BookingStatus, Space
+
+T = TypeVar("T")
+
+# Statuses that hold a space; rejected/cancelled bookings free the slot.
+ACTIVE_STATUSES = (BookingStatus.pending, BookingStatus.approved)
+
+def norm_utc(dt: datetime) -> datetime:
+    """Return a timezone-aware UTC datetime; treat naive values as UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+def overlap(a_start: datetime, a_end: datetime, b_start: datetime, b_end: datetime) -> bool:
+    """All inputs must be UTC-aware."""
+    return not (a_end <= b_start or a_start >= b_end)
+
+class ConflictGraph:
+    """Spaces that share floor area, from the `Space.parent_id` containment tree.
+
+    A booking of a space blocks its ancestors (the combined spaces it is part
+    of) and its descendants (its member spaces), but not its siblings. The
+    closure of each linked space is precomputed; unlinked spaces, nearly all
+    of them, only conflict with themselves.
+    """
+
+    def __init__(self, parents: Dict[int, int]):
+        children: Dict[int, List[int]] = {}
+        for child, parent in parents.items():
+            children.setdefault(parent, []).append(child)
+        self._related: Dict[int, Tuple[int, ...]] = {}
+        for space_id in parents.keys() | children.keys():
+            found: Set[int] = set()
+            parent = parents.get(space_id)
+            while parent is not None and parent not in found:
+                found.add(parent)
+                parent = parents.get(parent)
+            stack = list(children.get(space_id, ()))
+            while stack:
+                child = stack.pop()
+                if child not in found:
+                    found.add(child)
+                    stack.extend(children.get(child, ()))
+            found.discard(space_id)
+            self._related[space_id] = tuple(sorted(found))
+
+    def related(self, space_id: int) -> Tuple[int, ...]:
+        """Other spaces a booking of `space_id` blocks (and is blocked by)."""
+        return self._related.get(space_id, ())
+
+    def closure(self, space_id: int) -> Tuple[int, ...]:
+        return (space_id, *self._related.get(space_id, ()))
+
+    def expand(self, space_ids: Iterable[int]) -> Set[int]:
+        """`space_ids` plus every space related to one of them."""
+        expanded = set(space_ids)
+        for space_id in list(expanded):
+            expanded.update(self._related.get(space_id, ()))
+        return expanded
+
+    def expand_ranges(self, ranges: Iterable[Tuple[int, datetime, datetime]]) -> List[Tuple[int, datetime, datetime]]:
+        """Each (space_id, start, end) range repeated for the spaces related to it."""
+        return [(other, start, end) for space_id, start, end in ranges for other in self.closure(space_id)]
+
+_graph_lock = threading.Lock()
+_graph: Tuple[Optional[int], ConflictGraph] = (None, ConflictGraph({}))
+
+def conflict_graph(db: Session) -> ConflictGraph:
+    """The graph at the current catalog revision; space edits bump it, like the catalog."""
+    global _graph
+    revision = current_revision(db)
+    if _graph[0] != revision:
+        with _graph_lock:
+            if _graph[0] != revision:
+                rows = db.execute(select(Space.id, Space.parent_id).where(Space.parent_id.is_not(None)))
+                _graph = (revision, ConflictGraph(dict(rows.all())))
+    return _graph[1]
+
+def on_spaces(space_ids: Sequence[int], *clauses, model=Booking):
+    """Bookings of `space_ids` matching `clauses`, as one OR branch per space.
+
+    Each branch carries every condition so it stays a range scan of the
+    (space_id, status, end_utc, start_utc) index. Given `space_id IN (...)`,
+    or a condition shared outside the OR, SQLite without statistics picks a
+    status index instead and reads the whole history. `model` may be
+    ArchivedBooking.
+    """
+    if len(space_ids) == 1:
+        return and_(model.space_id == space_ids[0], *clauses)
+    return or_(*(and_(model.space_id == space_id, *clauses) for space_id in space_ids))
+
+def overlapping(space_ids: Sequence[int], start: datetime, end: datetime):
+    """Select active bookings of the spaces that overlap [start, end).
+
+    Both bounds are pushed into SQL so the composite
+    (space_id, status, end_utc, start_utc) index only visits bookings that
+    are still running at `start`; past history is never read. A space and
+    the spaces related to it are checked in the same statement.
+    """
+    return select(Booking).where(
+        on_spaces(space_ids, Booking.status.in_(ACTIVE_STATUSES), Booking.end_utc > start, Booking.start_utc < end)
+    )
+
+def find_conflict(db: Session, space_id: int, start: datetime, end: datetime) -> Optional[int]:
+    """Return the id of one booking overlapping [start, end) on the space or a related one, or None."""
+    stmt = overlapping(conflict_graph(db).closure(space_id), start, end).with_only_columns(Booking.id).limit(1)
+    return db.execute(stmt).scalar()
+
+def lock_space(db: Session, space_id: int) -> bool:
+    """Take the per-space reservation lock for the current transaction.
+
+    Bumping `spaces.booking_seq` row-locks the space on Postgres (other
+    spaces stay writable) and takes the writer lock on SQLite, so the
+    conflict check and insert that follow cannot interleave with another
+    reservation of the same space in any worker. Related spaces are locked
+    too, so a combined space and its members serialize against each other.
+    Returns False if the space does not exist.
+    """
+    ids = sorted(conflict_graph(db).closure(space_id))
+    result = db.execute(
+        update(Space)
+        .where(Space.id.in_(ids) if len(ids) > 1 else Space.id == space_id)
+        .values(booking_seq=Space.booking_seq + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(ids)
+
+def lock_spaces(db: Session, space_ids: Iterable[int]) -> None:
+    """`lock_space` for several spaces in one statement (ids are locked in ascending order)."""
+    ids = sorted(conflict_graph(db).expand(space_ids))
+    if ids:
+        db.execute(
+            update(Space)
+            .where(Space.id.in_(ids))
+            .values(booking_seq=Space.booking_seq + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def find_conflicts(db: Session, ranges: Sequence[Tuple[int, datetime, datetime]]) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """Active bookings overlapping any of the (space_id, start, end) ranges, in one query.
+
+    Returns {space_id: [(start, end), ...]}; each OR branch is the same
+    index-backed range as `overlapping` (see `on_spaces`). A booking is
+    listed under its own space and under every space related to it.
+    """
+    busy: Dict[int, List[Tuple[datetime, datetime]]] = {}
+    if not ranges:
+        return busy
+    graph = conflict_graph(db)
+    stmt = select(Booking.space_id, Booking.start_utc, Booking.end_utc).where(
+        or_(*(
+            and_(Booking.space_id == space_id, Booking.status.in_(ACTIVE_STATUSES),
+                 Booking.end_utc > start, Booking.start_utc < end)
+            for space_id, start, end in graph.expand_ranges(ranges)
+        )),
+    )
+    for space_id, start, end in db.execute(stmt):
+        for other in graph.closure(space_id):
+            busy.setdefault(other, []).append((start, end))
+    return busy
+
+def space_windows(ranges: Iterable[Tuple[int, datetime, datetime]]) -> Dict[int, Tuple[datetime, datetime]]:
+    """Collapse (space_id, start, end) ranges to one covering window per space."""
+    windows: Dict[int, Tuple[datetime, datetime]] = {}
+    for space_id, start, end in ranges:
+        lo, hi = windows.get(space_id, (start, end))
+        windows[space_id] = (min(lo, start), max(hi, end))
+    return windows
+
+def bookings_around(db: Session, ranges: Sequence[Tuple[int, datetime, datetime]], statuses=ACTIVE_STATUSES):
+    """Bookings with `statuses` that may overlap the (space_id, start, end) ranges, in one query.
+
+    Ranges are collapsed to one window per space so the statement stays
+    small for thousands of ranges; rows are candidates and callers still
+    test exact overlap (see IntervalSet). Bookings of related spaces are
+    included. Yields (id, space_id, status, start, end).
+    """
+    windows = space_windows(conflict_graph(db).expand_ranges(ranges))
+    if not windows:
+        return []
+    stmt = select(Booking.id, Booking.space_id, Booking.status, Booking.start_utc, Booking.end_utc).where(
+        or_(*(
+            and_(Booking.space_id == space_id, Booking.status.in_(statuses),
+                 Booking.end_utc > lo, Booking.start_utc < hi)
+            for space_id, (lo, hi) in windows.items()
+        )),
+    )
+    return db.execute(stmt).all()
+
+class IntervalSet:
+    """Busy [start, end) intervals of one space, merged and sorted for O(log n) overlap tests."""
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # Only the last interval starting before `end` can reach past `start`
+        i = bisect.bisect_left(self._starts, end)
+        return i > 0 and self._ends[i - 1] > start
+
+    def add(self, start: datetime, end: datetime) -> None:
+        # Merge with any intervals it touches so the set stays disjoint
+        i = bisect.bisect_left(self._starts, start)
+        if i > 0 and self._ends[i - 1] > start:
+            i -= 1
+            start, end = self._starts[i], max(end, self._ends[i])
+        j = i
+        while j < len(self._starts) and self._starts[j] < end:
+            end = max(end, self._ends[j])
+            j += 1
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+# SQLSTATEs worth retrying: serialization_failure, deadlock_detected, lock_not_available
+_RETRY_SQLSTATES = {"40001", "40P01", "55P03"}
+
+def is_retryable(exc: DBAPIError) -> bool:
+    """True for lock timeouts and serialization failures, which a fresh attempt may not hit."""
+    orig = exc.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code in _RETRY_SQLSTATES:
+        return True
+    msg = str(orig).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+async def run_with_retry(db: DBSession, fn: Callable[..., T], *args, attempts: int = 5, backoff: float = 0.02) -> T:
+    """Run a write transaction `fn(session, *args)`, retrying lock timeouts and serialization failures.
+
+    `fn` must be safe to re-run from scratch: the session is rolled back
+    between attempts. Non-database errors (e.g. HTTPException) propagate.
+    """
+    for attempt in range(attempts):
+        try:
+            return await run_db(db, fn, *args)
+        except DBAPIError as exc:
+            await run_db(db, Session.rollback)
+            if attempt == attempts - 1 or not is_retryable(exc):
+                raise
+            await asyncio.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
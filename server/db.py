@@ -1,28 +1,211 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import StaticPool
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from starlette.concurrency import run_in_threadpool
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional, TypeVar, Union
+import asyncio
+import logging
 import os
+import time
+
+from .settings import settings
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./office.db")
 
-# For SQLite, ensure check_same_thread False; for file-based demo keep simple
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool if DATABASE_URL.endswith(":memory:") else None,
+# An async driver in the URL (sqlite+aiosqlite://, postgresql+asyncpg://) selects async mode
+IS_ASYNC = make_url(DATABASE_URL).get_dialect().is_async
+
+slow_log = logging.getLogger("server.db.slow")
+
+T = TypeVar("T")
+DBSession = Union[Session, AsyncSession]
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_MEMORY = DATABASE_URL.endswith(":memory:")
+PRODUCTION_SQLITE = IS_SQLITE and not IS_MEMORY and settings.SQLITE_PROFILE == "production"
+
+def _make_engine(**kwargs):
+    # For SQLite, ensure check_same_thread False; for file-based demo keep simple
+    if IS_SQLITE:
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+        if IS_MEMORY:
+            kwargs["poolclass"] = StaticPool
+    if IS_ASYNC:
+        return create_async_engine(DATABASE_URL, **kwargs)
+    return create_engine(DATABASE_URL, **kwargs)
+
+def _apply_sqlite_pragmas(engine, read_only: bool) -> None:
+    target = engine.sync_engine if IS_ASYNC else engine
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cur.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+
+if PRODUCTION_SQLITE:
+    # aiosqlite defaults to NullPool; the profile needs real pools in both modes
+    _POOL = AsyncAdaptedQueuePool if IS_ASYNC else QueuePool
+    # One writer connection: writes queue in the pool instead of fighting over the lock
+    engine = _make_engine(poolclass=_POOL, pool_size=1, max_overflow=0, pool_timeout=30)
+    # WAL readers never block the writer (or each other)
+    read_engine = _make_engine(
+        poolclass=_POOL, pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=settings.SQLITE_READ_POOL_SIZE
     )
+    _apply_sqlite_pragmas(engine, read_only=False)
+    _apply_sqlite_pragmas(read_engine, read_only=True)
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = read_engine = _make_engine()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if IS_ASYNC:
+    SessionLocal = async_sessionmaker(engine, autoflush=False)
+    ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False)
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
-class Base(DeclarativeBase):
-    pass
+class QueryCounter:
+    """Number of SQL statements executed while it was active, and their time in seconds."""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
 
-def get_db():
-    db = SessionLocal()
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count the statements run in this context (and thread-pool/run_sync calls made from it)."""
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
     try:
-        yield db
+        yield counter
     finally:
-        db.close()
+        _query_counter.reset(token)
+
+def _before_statement(conn, _cursor, _statement, _parameters, _context, executemany) -> None:
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+def _after_statement(conn, _cursor, statement, _parameters, _context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+        counter.seconds += elapsed
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        slow_log.warning("%.1f ms%s: %s", elapsed * 1000, " (executemany)" if executemany else "",
+                         " ".join(statement.split())[:2000])
+
+def _statement_failed(context) -> None:
+    started = context.connection.info.get("statement_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+for _engine in {engine, read_engine}:
+    _target = _engine.sync_engine if IS_ASYNC else _engine
+    event.listen(_target, "before_cursor_execute", _before_statement)
+    event.listen(_target, "after_cursor_execute", _after_statement)
+    event.listen(_target, "handle_error", _statement_failed)
+
+class Base(DeclarativeBase):
+    pass
+
+def unindexed(column):
+    """`+column` on SQLite: the same value, but the planner will not use an index on it.
+
+    For filters whose index would be a worse access path than another
+    one (e.g. one that yields rows out of the wanted order).
+    """
+    if not IS_SQLITE:
+        return column
+    return UnaryExpression(column, operator=operators.custom_op("+"), type_=column.type)
+
+def _session_dependency(factory):
+    if IS_ASYNC:
+        async def dependency():
+            async with factory() as db:
+                yield db
+    else:
+        def dependency():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+    return dependency
+
+# get_db for anything that may write; get_read_db for read-only endpoints
+get_db = _session_dependency(SessionLocal)
+get_read_db = _session_dependency(ReadSessionLocal) if read_engine is not engine else get_db
+
+async def run_db(db: DBSession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run `fn(session, *args)` without blocking the event loop.
+
+    Route handlers keep their database logic in plain functions taking a sync
+    `Session`. In async mode that function runs on the AsyncSession's
+    connection via `run_sync` (no worker thread); in sync mode it runs in the
+    thread pool exactly like a sync endpoint would. Whatever it returns must
+    already be loaded: lazy loads are not possible once it has returned.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def sync_session(db: DBSession) -> Session:
+    """The sync Session behind `db`, for operations that do no I/O."""
+    return db.sync_session if isinstance(db, AsyncSession) else db
+
+def run_session(fn: Callable[[Session], T]) -> T:
+    """Run `fn(session)` to completion from synchronous code (scripts), in either mode."""
+    if not IS_ASYNC:
+        with SessionLocal() as db:
+            return fn(db)
+
+    async def main():
+        try:
+            async with SessionLocal() as db:
+                return await db.run_sync(fn)
+        finally:
+            # pooled connections are bound to this event loop
+            await engine.dispose()
+    return asyncio.run(main())
+
+def migrate(conn) -> None:
+    """Additive schema sync on an open connection; see init_db."""
+    Base.metadata.create_all(bind=conn)
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+async def init_db() -> None:
+    """Create missing tables, plus columns/indexes added to tables that already exist.
+
+    Only additive changes are handled; new columns need a server default
+    (or must be nullable) so existing rows stay valid.
+    """
+    if IS_ASYNC:
+        async with engine.begin() as conn:
+            await conn.run_sync(migrate)
+    else:
+        with engine.begin() as conn:
+            migrate(conn)
@@ -0,0 +1,275 @@
+"""Availability deltas pushed to subscribers instead of being polled for.
+
+Booking and series changes are collected from the session's flushes and
+sent once the transaction commits (rolled back work never leaks out). Each
+change is serialized once per worker into an SSE frame; the same bytes
+are queued to every subscriber of that space and of the spaces it blocks
+(`blocks`: combined or member spaces, see conflicts.ConflictGraph).
+
+Workers exchange changes through a broker: `InProcessBroker` for a single
+process (and tests), `RedisBroker` for several workers. Subscriber queues
+are bounded: a client that falls behind gets its backlog replaced by one
+`resync` event, telling it to refetch availability.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .conflicts import conflict_graph
+from .models import Booking, BookingSeries
+from .settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency: only needed for EVENTS_BROKER_URL=redis://...
+    aioredis = None
+
+log = logging.getLogger(__name__)
+
+_PENDING = "availability_events"
+_GRAPH = "availability_events_graph"  # the transaction's ConflictGraph, read once
+_FIELDS_UTC = ("start_utc", "end_utc")
+RESYNC = b"event: resync\ndata: {}\n\n"
+HEARTBEAT = b": keep-alive\n\n"
+
+class Subscriber:
+    """One open stream: the spaces it watches (None = all) and its bounded frame queue."""
+
+    def __init__(self, space_ids: Optional[Set[int]], maxsize: int):
+        self.space_ids = space_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, frame: Optional[bytes]) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog, the client refetches instead
+            self._drain()
+            self.queue.put_nowait(RESYNC)
+
+    def close(self) -> None:
+        self._drain()
+        self.queue.put_nowait(None)
+
+    def _drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+class Hub:
+    """Per-worker fan-out of broker messages to the local subscribers."""
+
+    def __init__(self):
+        self._by_space: Dict[int, Set[Subscriber]] = {}
+        self._everything: Set[Subscriber] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, space_ids: Optional[Iterable[int]]) -> Subscriber:
+        sub = Subscriber(set(space_ids) if space_ids is not None else None, settings.EVENTS_QUEUE_SIZE)
+        if sub.space_ids is None:
+            self._everything.add(sub)
+        for space_id in sub.space_ids or ():
+            self._by_space.setdefault(space_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._everything.discard(sub)
+        for space_id in sub.space_ids or ():
+            subs = self._by_space.get(space_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_space[space_id]
+
+    def deliver(self, message: bytes) -> None:
+        """Broker callback: `message` is b"<space_id>[,<blocked id>...] <json>"; one frame for all recipients."""
+        head, _, body = message.partition(b" ")
+        if _remote_listeners:
+            change = json.loads(body)
+            for field in _FIELDS_UTC:
+                change[field] = datetime.fromisoformat(change[field])
+            for fn in _remote_listeners:
+                fn(change)
+        recipients = set(self._everything)
+        for space_id in head.split(b","):
+            recipients.update(self._by_space.get(int(space_id), ()))
+        if not recipients:
+            return
+        frame = b"event: availability\ndata: " + body + b"\n\n"
+        for sub in recipients:
+            sub.offer(frame)
+
+    def close(self) -> None:
+        """End every open stream (server shutdown)."""
+        for sub in self._everything | set().union(*self._by_space.values()):
+            sub.close()
+
+class InProcessBroker:
+    """Delivers straight to this worker's hub: one process, or tests."""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[bytes], None]] = None
+
+    async def start(self, deliver: Callable[[bytes], None]) -> None:
+        self._deliver = deliver
+
+    async def publish(self, message: bytes) -> None:
+        if self._deliver is not None:
+            self._deliver(message)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+class RedisBroker:
+    """Redis pub/sub on one channel; every worker, the publisher included, receives every change."""
+
+    CHANNEL = "office:availability"
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("EVENTS_BROKER_URL=redis://... needs the redis package (pip install redis)")
+        self._redis = aioredis.from_url(url)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[bytes], None]) -> None:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.CHANNEL)
+
+        async def listen() -> None:
+            async for msg in pubsub.listen():
+                deliver(msg["data"])
+
+        self._task = asyncio.create_task(listen())
+
+    async def publish(self, message: bytes) -> None:
+        await self._redis.publish(self.CHANNEL, message)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        await self._redis.aclose()
+
+def _make_broker(url: str):
+    if url == "memory":
+        return InProcessBroker()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported EVENTS_BROKER_URL {url!r}")
+
+# fn(change) per committed change: synchronously after commit in this worker,
+# and with remote=True also when the broker delivers (any worker's changes)
+_listeners: List[Callable[[dict], None]] = []
+_remote_listeners: List[Callable[[dict], None]] = []
+
+def add_listener(fn: Callable[[dict], None], remote: bool = False) -> None:
+    _listeners.append(fn)
+    if remote:
+        _remote_listeners.append(fn)
+
+hub = Hub()
+broker = _make_broker(settings.EVENTS_BROKER_URL)
+_outbox: Optional[asyncio.Queue] = None
+_pump: Optional[asyncio.Task] = None
+
+async def start() -> None:
+    global _outbox, _pump
+    hub.loop = asyncio.get_running_loop()
+    _outbox = asyncio.Queue()
+    await broker.start(hub.deliver)
+
+    async def pump() -> None:
+        # One task publishes in commit order, so a space's deltas never overtake each other
+        while True:
+            message = await _outbox.get()
+            try:
+                await broker.publish(message)
+            except Exception:
+                # The delta is lost: other workers' streams and availability caches miss it
+                # (their cached day views stay stale up to AVAILABILITY_CACHE_TTL_SECONDS)
+                metrics.events_publish_failures.inc()
+                log.warning("could not publish an availability change to the broker", exc_info=True)
+
+    _pump = asyncio.create_task(pump())
+
+async def stop() -> None:
+    hub.close()
+    if _pump is not None:
+        _pump.cancel()
+    await broker.stop()
+    hub.loop = None
+
+def _encode(change: dict) -> bytes:
+    body = json.dumps(change, default=datetime.isoformat, separators=(",", ":"))
+    return ",".join(map(str, (change["space_id"], *change["blocks"]))).encode() + b" " + body.encode()
+
+def _send(messages: List[bytes]) -> None:
+    loop = hub.loop
+    if loop is None or _outbox is None:
+        return  # no server running (scripts, seeding)
+    for message in messages:
+        # after_commit runs on a worker thread in sync mode
+        loop.call_soon_threadsafe(_outbox.put_nowait, message)
+
+def _blocks(session: Session, space_id: int) -> List[int]:
+    graph = session.info.get(_GRAPH)
+    if graph is None:
+        graph = session.info[_GRAPH] = conflict_graph(session)
+    return list(graph.related(space_id))
+
+def booking_changed(session: Session, booking_id: int, space_id: int, status, start_utc: datetime, end_utc: datetime) -> None:
+    """Queue a delta for changes that bypass the flush (bulk UPDATE statements)."""
+    session.info.setdefault(_PENDING, []).append({
+        "kind": "booking", "id": booking_id, "space_id": space_id, "blocks": _blocks(session, space_id),
+        "status": status.value, "start_utc": start_utc, "end_utc": end_utc,
+    })
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Booking):
+            if obj in session.new or inspect(obj).attrs.status.history.has_changes():
+                booking_changed(session, obj.id, obj.space_id, obj.status, obj.start_utc, obj.end_utc)
+        elif isinstance(obj, BookingSeries):
+            state = inspect(obj).attrs
+            if obj in session.new or state.status.history.has_changes() or state.exceptions.history.has_changes():
+                # Occurrences are not listed: subscribers refetch the series' space
+                session.info.setdefault(_PENDING, []).append({
+                    "kind": "series", "id": obj.id, "space_id": obj.space_id, "blocks": _blocks(session, obj.space_id),
+                    "status": obj.status.value,
+                    "start_utc": obj.first_start_utc, "end_utc": obj.last_end_utc,
+                })
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session) -> None:
+    session.info.pop(_GRAPH, None)
+    changes = session.info.pop(_PENDING, None)
+    if changes:
+        for fn in _listeners:
+            for change in changes:
+                fn(change)
+        _send([_encode(c) for c in changes])
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop(_GRAPH, None)
+    session.info.pop(_PENDING, None)
+
+async def stream(sub: Subscriber) -> AsyncIterator[bytes]:
+    """SSE body for one subscriber: frames as they come, a comment line when idle."""
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(sub.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                frame = HEARTBEAT
+            if frame is None:
+                return
+            yield frame
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,146 @@
+"""Streaming booking export (GET /bookings/export): CSV or NDJSON, optionally gzipped.
+
+One SELECT joins bookings with their space and user. Rows are fetched
+`EXPORT_BATCH_SIZE` at a time from a streaming cursor (yield_per) and
+each batch is encoded and sent before the next is read, so memory stays
+flat however many rows match. No ORM objects are built.
+
+The stream runs on its own read session: request-scoped sessions are
+closed before a streaming body is sent. Rows are ordered by (start_utc,
+id). Series occurrences are not rows and are not exported. When the
+window reaches into archived history (see archive.tables), the SELECT is a
+UNION ALL of the live and archive tables, merged in that order.
+"""
+import csv
+import io
+import zlib
+from datetime import datetime
+from operator import attrgetter
+from typing import AsyncIterator, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Enum as SAEnum, Executable, Select, select, union_all
+
+from .db import IS_ASYNC, ReadSessionLocal, unindexed
+from .models import Booking, BookingStatus, Space, SpaceType, User, UTCDateTime
+from .pagination import time_window
+from .serialization import dumps
+from .settings import settings
+
+BOOKING_FIELDS = ("id", "start_utc", "end_utc", "status", "title", "attendees", "notes", "space_id")
+COLUMNS = (
+    *((name, getattr(Booking, name)) for name in BOOKING_FIELDS),
+    ("space_name", Space.name), ("space_type", Space.type), ("space_activity", Space.activity),
+    ("user_id", Booking.user_id), ("user_email", User.email), ("user_full_name", User.full_name),
+)
+FIELDS = tuple(name for name, _ in COLUMNS)
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _select(
+    model, start_from: Optional[datetime], start_to: Optional[datetime], statuses: Sequence[BookingStatus],
+    space_type: Optional[SpaceType], user_id: Optional[int],
+) -> Select:
+    columns = [(name, getattr(model, name) if column.table is Booking.__table__ else column) for name, column in COLUMNS]
+    q = (
+        select(*(column.label(name) for name, column in columns))
+        .join(Space, Space.id == model.space_id)
+        .join(User, User.id == model.user_id)
+    )
+    q = time_window(q, start_from, start_to, model)
+    # Only the user and single-status indexes also yield (start_utc, id) order. Other
+    # filters are kept off their indexes, or SQLite drives the scan from them and
+    # sorts every matching row before sending the first one
+    if len(statuses) == 1:
+        q = q.filter(model.status == statuses[0])
+    elif statuses:
+        q = q.filter(unindexed(model.status).in_(statuses))
+    if space_type is not None:
+        q = q.filter(unindexed(Space.type) == space_type)
+    if user_id is not None:
+        q = q.filter(model.user_id == user_id)
+    return q
+
+def statement(
+    start_from: Optional[datetime], start_to: Optional[datetime], statuses: Sequence[BookingStatus],
+    space_type: Optional[SpaceType], user_id: Optional[int], models: Sequence[type] = (Booking,),
+) -> Executable:
+    """The export SELECT over `models` (see archive.tables), in (start_utc, id) order."""
+    selects = [_select(model, start_from, start_to, statuses, space_type, user_id) for model in models]
+    if len(selects) == 1:
+        q = selects[0].order_by(models[0].start_utc, models[0].id)
+    else:
+        # Each arm reads its (start_utc) index in order; SQLite and PostgreSQL merge them without a sort
+        q = union_all(*(s.order_by(None) for s in selects)).order_by("start_utc", "id")
+    return q.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+
+def _utc(value: datetime) -> str:
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+# The csv module writes None as "" and numbers as str(); these columns need help
+_CSV_CONVERT = tuple(
+    (i, _utc if isinstance(column.type, UTCDateTime) else attrgetter("value"))
+    for i, (_, column) in enumerate(COLUMNS) if isinstance(column.type, (UTCDateTime, SAEnum))
+)
+
+def encode_csv(batch: Sequence[tuple]) -> bytes:
+    rows = []
+    for row in batch:
+        row = list(row)
+        for i, convert in _CSV_CONVERT:
+            if row[i] is not None:
+                row[i] = convert(row[i])
+        rows.append(row)
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue().encode()
+
+def encode_ndjson(batch: Sequence[tuple]) -> bytes:
+    return b"".join(dumps(dict(zip(FIELDS, row))) + b"\n" for row in batch)
+
+class _Writer:
+    """Encodes batches of rows to body chunks: CSV header first, gzip if asked."""
+
+    def __init__(self, fmt: str, gzip: bool):
+        self._encode = encode_csv if fmt == "csv" else encode_ndjson
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+        self._head = ",".join(FIELDS).encode() + b"\r\n" if fmt == "csv" else b""
+
+    def write(self, batch: Sequence[tuple]) -> bytes:
+        data = self._head + self._encode(batch)
+        self._head = b""
+        return self._z.compress(data) if self._z else data
+
+    def close(self) -> bytes:
+        data = self.write(()) if self._head else b""  # an empty CSV still has its header
+        return data + self._z.flush() if self._z else data
+
+def _sync_stream(stmt: Executable, fmt: str, gzip: bool) -> Iterator[bytes]:
+    # Runs in the thread pool, one next() at a time
+    writer = _Writer(fmt, gzip)
+    with ReadSessionLocal() as db:
+        for batch in db.execute(stmt).partitions():
+            data = writer.write(batch)
+            if data:
+                yield data
+    yield writer.close()
+
+async def _async_stream(stmt: Executable, fmt: str, gzip: bool) -> AsyncIterator[bytes]:
+    writer = _Writer(fmt, gzip)
+    async with ReadSessionLocal() as db:
+        async for batch in (await db.stream(stmt)).partitions():
+            data = writer.write(batch)
+            if data:
+                yield data
+    yield writer.close()
+
+def stream(stmt: Executable, fmt: str, gzip: bool):
+    """Body iterator for a StreamingResponse: sync (thread pool) or async, following the DB mode."""
+    return _async_stream(stmt, fmt, gzip) if IS_ASYNC else _sync_stream(stmt, fmt, gzip)
+
+def filename(fmt: str, gzip: bool, start_from: Optional[datetime], start_to: Optional[datetime]) -> str:
+    parts: List[str] = ["bookings"]
+    if start_from:
+        parts.append(start_from.date().isoformat())
+    if start_to:
+        parts.append(start_to.date().isoformat())
+    return "_".join(parts) + "." + fmt + (".gz" if gzip else "")
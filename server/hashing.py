@@ -0,0 +1,133 @@
+"""Argon2 hashing off the request thread pool.
+
+Hashes and verifications run in a bounded process pool. At most
+`HASH_QUEUE_LIMIT` operations may be queued or running; beyond that callers
+are shed immediately with 503 instead of tying up more request threads.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, InvalidHashError
+from fastapi import HTTPException
+
+from .settings import settings
+from .metrics import hash_seconds, hash_shed
+
+def _make_hasher() -> PasswordHasher:
+    return PasswordHasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+# Also used in-process for cheap parameter checks (check_needs_rehash)
+hasher = _make_hasher()
+
+def _hash(plain_password: str) -> str:
+    return hasher.hash(plain_password)
+
+def _verify(password_hash: str, plain_password: str) -> bool:
+    try:
+        return hasher.verify(password_hash, plain_password)
+    except (VerifyMismatchError, InvalidHashError):
+        return False
+
+def _init_worker() -> None:
+    # Hashing is latency-tolerant; let request handling win the CPU when they compete
+    os.nice(settings.HASH_WORKER_NICE)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.HASH_QUEUE_LIMIT)
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: workers must not inherit the server's sockets or threads
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+def _discard_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is broken:  # another thread may already have replaced it
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def _submit(fn, *args) -> Future:
+    if not _slots.acquire(blocking=False):
+        hash_shed.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication service busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    op = "hash" if fn is _hash else "verify"
+    started = time.perf_counter()
+    if settings.HASH_WORKERS <= 0:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as exc:
+            future.set_exception(exc)
+        finally:
+            _slots.release()
+            hash_seconds.observe(time.perf_counter() - started, op)
+        return future
+
+    def done(_: Future) -> None:
+        _slots.release()
+        hash_seconds.observe(time.perf_counter() - started, op)
+
+    try:
+        pool = _executor()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): drop the broken pool and retry once on a new one
+            _discard_pool(pool)
+            future = _executor().submit(fn, *args)
+    except BaseException:
+        done(None)
+        raise
+    future.add_done_callback(done)
+    return future
+
+def hash_password(plain_password: str) -> str:
+    return _submit(_hash, plain_password).result()
+
+def verify_password(plain_password: str, password_hash: str) -> bool:
+    return _submit(_verify, password_hash, plain_password).result()
+
+async def hash_password_async(plain_password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, plain_password))
+
+async def verify_password_async(plain_password: str, password_hash: str) -> bool:
+    return await asyncio.wrap_future(_submit(_verify, password_hash, plain_password))
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when a stored hash was made with different cost parameters."""
+    try:
+        return hasher.check_needs_rehash(password_hash)
+    except InvalidHashError:
+        return False
@@ -0,0 +1,202 @@
+"""`Idempotency-Key` for booking writes: retries replay the first response.
+
+A client sends `Idempotency-Key: <unique string>` with POST /bookings,
+DELETE /bookings/{id} or an approve/reject. The first request runs as
+usual. Its response (status, content type, body) is stored under
+(user, method, path, key) for IDEMPOTENCY_TTL_SECONDS. A retry with the
+same key gets the stored response back, marked `Idempotent-Replayed: true`,
+and the handler does not run again: no user load, space fetch or conflict
+scan, and no 409 against the booking the first attempt made. A duplicate
+that arrives while the first request is still running waits for it and
+replays its response.
+
+- The user comes from the bearer token (see auth.token_user_id). Requests
+  without a valid one run normally, so the endpoint answers 401.
+- The same key with a different body answers 422.
+- 5xx responses and 401/403 are not stored; a retry runs again.
+
+Stores: `MemoryStore`, a per-worker LRU (with several workers a retry that
+lands on another worker runs again), and `RedisStore`, shared by all
+workers, which also coalesces duplicates across workers.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
+
+from .auth import token_user_id
+from .cache import TTLCache
+from .settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency: only needed for IDEMPOTENCY_STORE_URL=redis://...
+    aioredis = None
+
+HEADER = "idempotency-key"
+REPLAYED = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+UNSTORED = {401, 403}
+
+class Entry(NamedTuple):
+    fingerprint: bytes  # of the request body
+    status: int
+    media_type: str
+    body: bytes
+
+def idempotent(endpoint):
+    """Mark a route endpoint as honouring `Idempotency-Key`."""
+    endpoint.idempotent = True
+    return endpoint
+
+class MemoryStore:
+    """Per-worker LRU of responses; duplicates in flight are coalesced by the middleware."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache("idempotency", maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Entry]:
+        return self.cache.get(key)
+
+    async def put(self, key: str, entry: Entry) -> None:
+        self.cache.set(key, entry)
+
+    async def claim(self, key: str) -> bool:
+        return True
+
+    async def release(self, key: str) -> None:
+        pass
+
+    async def claimed(self, key: str) -> bool:
+        return key in _inflight
+
+class RedisStore:
+    """Responses in Redis, shared by every worker.
+
+    Values are b"<fingerprint hex> <status> <media type>\\n<body>" with the
+    TTL as expiry. A request claims its key with SET NX (expiring after
+    IDEMPOTENCY_WAIT_SECONDS in case the worker dies), so a duplicate on
+    another worker polls for the response instead of running.
+    """
+
+    PREFIX = "office:idempotency:"
+
+    def __init__(self, url: str, ttl: float, wait: float):
+        if aioredis is None:
+            raise RuntimeError("IDEMPOTENCY_STORE_URL=redis://... needs the redis package (pip install redis)")
+        self._redis = aioredis.Redis.from_url(url)
+        self._ttl, self._wait = int(ttl), wait
+
+    async def get(self, key: str) -> Optional[Entry]:
+        value = await self._redis.get(self.PREFIX + key)
+        if value is None:
+            return None
+        head, _, body = value.partition(b"\n")
+        fingerprint, status, media_type = head.split(b" ", 2)
+        return Entry(bytes.fromhex(fingerprint.decode()), int(status), media_type.decode(), body)
+
+    async def put(self, key: str, entry: Entry) -> None:
+        head = b"%s %d %s\n" % (entry.fingerprint.hex().encode(), entry.status, entry.media_type.encode())
+        await self._redis.set(self.PREFIX + key, head + entry.body, ex=self._ttl)
+
+    async def claim(self, key: str) -> bool:
+        return bool(await self._redis.set(self.PREFIX + key + ":lock", b"1", nx=True, px=int(self._wait * 1000)))
+
+    async def release(self, key: str) -> None:
+        await self._redis.delete(self.PREFIX + key + ":lock")
+
+    async def claimed(self, key: str) -> bool:
+        return bool(await self._redis.exists(self.PREFIX + key + ":lock"))
+
+def _make_store(url: str):
+    ttl = settings.IDEMPOTENCY_TTL_SECONDS
+    if url == "memory":
+        return MemoryStore(settings.IDEMPOTENCY_CACHE_SIZE, ttl)
+    if url.startswith(("redis://", "rediss://")):
+        return RedisStore(url, ttl, settings.IDEMPOTENCY_WAIT_SECONDS)
+    raise ValueError(f"Unsupported IDEMPOTENCY_STORE_URL {url!r}")
+
+store = _make_store(settings.IDEMPOTENCY_STORE_URL) if settings.IDEMPOTENCY_CACHE_SIZE > 0 else None
+# key -> the first request's entry (None: not stored, run again), for duplicates in this worker
+_inflight: Dict[str, "asyncio.Future[Optional[Entry]]"] = {}
+POLL_SECONDS = 0.05
+
+def _route(request: Request):
+    """The endpoint route the request will reach; its path params and template go into the scope."""
+    for route in request.app.router.routes:
+        match, child_scope = route.matches(request.scope)
+        if match == Match.FULL:
+            request.scope.update(child_scope)
+            return route
+    return None
+
+def _replay(entry: Entry, fingerprint: bytes) -> Response:
+    if entry.fingerprint != fingerprint:
+        return JSONResponse(status_code=422, content={"detail": "Idempotency-Key was used with a different request"})
+    return Response(entry.body, status_code=entry.status, media_type=entry.media_type, headers={REPLAYED: "true"})
+
+async def _wait_elsewhere(key: str) -> Optional[Entry]:
+    """Poll the shared store while another worker holds the key; None if it lets go without storing."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_SECONDS)
+        entry = await store.get(key)
+        if entry is not None or not await store.claimed(key):
+            return entry
+    raise asyncio.TimeoutError
+
+async def _run(request: Request, call_next, key: str, fingerprint: bytes) -> Response:
+    """Run the request as the key's first one: store and hand out its response."""
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    entry = None
+    try:
+        response = await call_next(request)
+        if response.status_code >= 500 or response.status_code in UNSTORED:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        media_type = response.headers.get("content-type", "application/json")
+        entry = Entry(fingerprint, response.status_code, media_type, body)
+        await store.put(key, entry)
+        return Response(body, status_code=response.status_code, headers=response.headers)
+    finally:
+        del _inflight[key]
+        future.set_result(entry)
+        await store.release(key)
+
+async def middleware(request: Request, call_next):
+    idempotency_key = request.headers.get(HEADER)
+    if idempotency_key is None or store is None or request.method in ("GET", "HEAD", "OPTIONS"):
+        return await call_next(request)
+    route = _route(request)
+    if route is None or not getattr(route.endpoint, "idempotent", False):
+        return await call_next(request)
+    if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        return JSONResponse(status_code=400, content={"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"})
+    user_id = token_user_id(request.headers.get("authorization"))
+    if user_id is None:
+        return await call_next(request)
+
+    fingerprint = hashlib.blake2b(await request.body(), digest_size=16).digest()
+    key = f"{user_id}:{request.method}:{request.url.path}:{idempotency_key}"
+    try:
+        while True:
+            entry = await store.get(key)
+            if entry is None:
+                waiting = _inflight.get(key)
+                if waiting is not None:
+                    # Same worker: share the first request's outcome
+                    entry = await asyncio.wait_for(asyncio.shield(waiting), settings.IDEMPOTENCY_WAIT_SECONDS)
+                elif await store.claim(key):
+                    return await _run(request, call_next, key, fingerprint)
+                else:
+                    entry = await _wait_elsewhere(key)
+                if entry is None:
+                    continue  # the first request was not stored (e.g. a 5xx): run this one
+            return _replay(entry, fingerprint)
+    except asyncio.TimeoutError:
+        return JSONResponse(status_code=409, content={"detail": "A request with this Idempotency-Key is still running"})
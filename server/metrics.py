@@ -0,0 +1,130 @@
+"""In-process metrics in the Prometheus text format (GET /metrics).
+
+Counters and histograms are per worker; scrape every worker, or run one.
+The request middleware in app.py feeds the HTTP series (latency, status,
+SQL statements and SQL time per route template), hashing.py the Argon2
+timings, cache.py the hit/miss/evict events of every cache, events.py
+broker publish failures and archive.py its passes.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from . import cache
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_label_text(self.labels, labels)} {_number(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram; per label set: bucket counts, sum and count."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}  # bucket counts..., +Inf, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            total = 0
+            for bound, n in zip((*self.buckets, "+Inf"), series[:-1]):
+                total += n
+                le = f'le="{bound if bound == "+Inf" else format(bound, "g")}"'
+                yield f"{self.name}_bucket{_label_text(self.labels, labels, le)} {total}"
+            yield f"{self.name}_sum{_label_text(self.labels, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_label_text(self.labels, labels)} {total}"
+
+http_requests = Counter("http_requests_total", "Requests by route template and status.", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "Time to the response headers, by route template.", ("method", "route"))
+http_db_queries = Histogram(
+    "http_request_db_queries", "SQL statements per request.", ("method", "route"), QUERY_BUCKETS)
+http_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route"))
+hash_seconds = Histogram(
+    "argon2_seconds", "Argon2 hash/verify time including the wait for a pool worker.", ("op",), HASH_BUCKETS)
+hash_shed = Counter("argon2_shed_total", "Hash/verify calls refused with 503 because the pool queue was full.")
+cache_events = Counter("cache_events_total", "Cache lookups and evictions.", ("cache", "event"))
+events_publish_failures = Counter(
+    "events_publish_failures_total", "Availability changes the broker failed to publish (lost for other workers).")
+archive_moved = Counter("archive_bookings_moved_total", "Bookings this worker moved to bookings_archive.")
+archive_passes = Counter("archive_passes_total", "Archive passes this worker completed.")
+
+REGISTRY = (
+    http_requests, http_latency, http_db_queries, http_db_seconds, hash_seconds, hash_shed, cache_events,
+    events_publish_failures, archive_moved, archive_passes,
+)
+
+cache.add_listener(cache_events.inc)
+
+def observe_request(method: str, route: str, status: int, seconds: float, queries: int, db_seconds: float) -> None:
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(seconds, method, route)
+    http_db_queries.observe(queries, method, route)
+    http_db_seconds.observe(db_seconds, method, route)
+
+def _process() -> Iterable[str]:
+    yield "# HELP process_cpu_seconds_total CPU time of this worker process, all threads."
+    yield "# TYPE process_cpu_seconds_total counter"
+    yield f"process_cpu_seconds_total {_number(time.process_time())}"
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return  # not Linux
+    yield "# HELP process_resident_memory_bytes Resident memory of this worker process."
+    yield "# TYPE process_resident_memory_bytes gauge"
+    yield f"process_resident_memory_bytes {resident}"
+
+def render() -> str:
+    lines = [line for metric in REGISTRY for line in metric.render()]
+    lines.extend(_process())
+    return "\n".join(lines) + "\n"
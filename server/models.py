@@ -1,12 +1,37 @@
-from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, Index
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 import enum
 
 from .db import Base
 
+class UTCDateTime(TypeDecorator):
+    """Timezone-aware datetime stored as normalized UTC.
+
+    SQLite drops tzinfo on write, so values are converted to UTC before they
+    reach the driver (making range comparisons in SQL correct) and come back
+    as aware UTC datetimes.
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
 class Role(str, enum.Enum):
     employee = "employee"
     admin = "admin"
@@ -35,6 +60,8 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     role: Mapped[Role] = mapped_column(Enum(Role), default=Role.employee, nullable=False)
     avatar_url: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True)
+    # Embedded in access tokens as "ver"; bumping it revokes every token issued before
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     bookings = relationship("Booking", back_populates="user")
@@ -50,8 +77,14 @@ class Space(Base):
     requires_approval: Mapped[bool] = mapped_column(Boolean, default=False)
     is_bookable: Mapped[bool] = mapped_column(Boolean, default=True)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Bumped by every reservation; the UPDATE doubles as a per-space write lock.
+    booking_seq: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # The combined space this one is part of ("Training Room 1" -> "Training Rooms (Both)").
+    # A booking of a space blocks its ancestors and descendants; see conflicts.ConflictGraph.
+    parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("spaces.id"), nullable=True, index=True)
 
     bookings = relationship("Booking", back_populates="space")
+    parent = relationship("Space", remote_side="Space.id")
 
 class BookingStatus(str, enum.Enum):
     pending = "pending"
@@ -61,6 +94,14 @@ class BookingStatus(str, enum.Enum):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Conflict lookups: "active bookings of this space still running at <start>".
+        # end_utc leads the range part so the scan skips the space's past history.
+        Index("ix_bookings_space_status_range", "space_id", "status", "end_utc", "start_utc"),
+        # Keyset pagination of "my bookings" and the approval queue, ordered by (start_utc, id)
+        Index("ix_bookings_user_start_id", "user_id", "start_utc", "id"),
+        Index("ix_bookings_status_start_id", "status", "start_utc", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -69,8 +110,8 @@ class Booking(Base):
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     attendees: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
-    start_utc: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
-    end_utc: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    start_utc: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False, index=True)
+    end_utc: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False, index=True)
 
     status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus), default=BookingStatus.pending, index=True)
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -78,3 +119,75 @@ class Booking(Base):
 
     user = relationship("User", back_populates="bookings")
     space = relationship("Space", back_populates="bookings")
+
+class ArchivedBooking(Base):
+    """A booking that ended before the archive horizon, moved out of `bookings` (see archive.py).
+
+    Same columns and ids as Booking, so reads can run the same query on
+    either table; indexed for history reads rather than conflict checks.
+    """
+    __tablename__ = "bookings_archive"
+    __table_args__ = (
+        Index("ix_bookings_archive_user_start_id", "user_id", "start_utc", "id"),
+        Index("ix_bookings_archive_status_start_id", "status", "start_utc", "id"),
+        Index("ix_bookings_archive_space_range", "space_id", "end_utc", "start_utc"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    space_id: Mapped[int] = mapped_column(ForeignKey("spaces.id"), nullable=False)
+
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    attendees: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+
+    start_utc: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False, index=True)
+    end_utc: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+
+    status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus), nullable=False)
+    notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+class RecurrenceFreq(str, enum.Enum):
+    daily = "daily"
+    weekly = "weekly"
+
+class BookingSeries(Base):
+    """A recurring booking stored once; occurrences are computed on demand (see recurrence.py)."""
+    __tablename__ = "booking_series"
+    __table_args__ = (
+        # "active series of this space that may have an occurrence in [start, end)"
+        Index("ix_booking_series_space_status_range", "space_id", "status", "last_end_utc", "first_start_utc"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    space_id: Mapped[int] = mapped_column(ForeignKey("spaces.id"), nullable=False)
+
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    attendees: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus), default=BookingStatus.approved)
+
+    # First occurrence; later ones repeat its local wall-clock time in `timezone`
+    first_start_utc: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False)
+    timezone: Mapped[str] = mapped_column(String(64), default="UTC", nullable=False)
+    freq: Mapped[RecurrenceFreq] = mapped_column(Enum(RecurrenceFreq), nullable=False)
+    interval: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    weekdays: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)  # "0,2,4" (Mon=0), weekly only
+    count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    until_utc: Mapped[Optional[datetime]] = mapped_column(UTCDateTime(), nullable=True)
+    exceptions: Mapped[str] = mapped_column(Text, default="", nullable=False)  # skipped local dates, "YYYY-MM-DD,..."
+    # End of the last occurrence, kept for range filtering
+    last_end_utc: Mapped[datetime] = mapped_column(UTCDateTime(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    space = relationship("Space")
+
+class Revision(Base):
+    """Named change counters shared by all workers (e.g. "spaces" for the catalog cache)."""
+    __tablename__ = "revisions"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
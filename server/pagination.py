@@ -0,0 +1,88 @@
+import base64
+import heapq
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Query
+
+from .conflicts import norm_utc
+from .models import Booking
+
+def encode_cursor(start: datetime, key: int) -> str:
+    """Opaque cursor for the position just after (start, key) in (start_utc, id) order."""
+    raw = f"{norm_utc(start).isoformat()}|{key}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start, booking_id = raw.split("|")
+        return norm_utc(datetime.fromisoformat(start)), int(booking_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def time_window(q: Query, start_from: Optional[datetime], start_to: Optional[datetime], model=Booking) -> Query:
+    """Keep bookings starting in [start_from, start_to); either bound may be omitted.
+
+    `model` is Booking or ArchivedBooking, whichever table `q` reads.
+    """
+    start_from, start_to = norm_utc(start_from), norm_utc(start_to)
+    if start_from and start_to and start_to <= start_from:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if start_from:
+        q = q.filter(model.start_utc >= start_from)
+    if start_to:
+        q = q.filter(model.start_utc < start_to)
+    return q
+
+def keyset_page(
+    q: Query, cursor: Optional[str], limit: int, descending: bool = False, model=Booking,
+) -> Tuple[List[Booking], Optional[str]]:
+    """One page of bookings in (start_utc, id) order and the cursor of the next page, if any.
+
+    The position is a range predicate on the same columns as the ORDER BY, so
+    with a matching index every page costs the same however deep it is.
+    """
+    if cursor:
+        start, booking_id = decode_cursor(cursor)
+        if descending:
+            q = q.filter(model.start_utc <= start, or_(model.start_utc < start, model.id < booking_id))
+        else:
+            q = q.filter(model.start_utc >= start, or_(model.start_utc > start, model.id > booking_id))
+    if descending:
+        q = q.order_by(model.start_utc.desc(), model.id.desc())
+    else:
+        q = q.order_by(model.start_utc.asc(), model.id.asc())
+    rows = q.limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1].start_utc, rows[limit - 1].id)
+    return rows, None
+
+def merged_page(
+    queries: Sequence[Tuple[Query, Any]], cursor: Optional[str], limit: Optional[int], descending: bool = False,
+) -> Tuple[list, Optional[str]]:
+    """keyset_page over several (query, model) sources, e.g. live and archived bookings.
+
+    Each source is paged on its own and the pages are merged, so a page
+    costs one indexed range scan per source. `limit` None returns every row.
+    """
+    key = lambda r: (r.start_utc, r.id)
+    if limit is None:
+        ordered = [
+            q.order_by(*((m.start_utc.desc(), m.id.desc()) if descending else (m.start_utc.asc(), m.id.asc()))).all()
+            for q, m in queries
+        ]
+        return list(heapq.merge(*ordered, key=key, reverse=descending)), None
+    rows, more = [], False
+    for q, model in queries:
+        page, next_cursor = keyset_page(q, cursor, limit, descending, model)
+        rows.extend(page)
+        more = more or next_cursor is not None
+    if len(queries) > 1:
+        rows.sort(key=key, reverse=descending)
+    if len(rows) > limit or more:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].start_utc, rows[-1].id)
+    return rows, None
@@ -0,0 +1,98 @@
+"""Opt-in sampling profiler for slow requests, writing folded stacks.
+
+A request is profiled when `PROFILE_SAMPLE_RATE` picks it, or when it
+carries `X-Profile: 1` and `PROFILE_HEADER` is on. While at least one
+profiled request is running, a background thread samples the stacks of
+every thread of the worker each `PROFILE_INTERVAL_MS`. When a profiled
+request took `PROFILE_SLOW_MS` or longer (header-triggered ones: always),
+its samples are written to `PROFILE_DIR` as one folded stack per line
+("thread;outer;...;inner count"), the input of flamegraph.pl, speedscope
+and similar tools.
+
+Samples cover the whole worker, so requests running at the same time show
+up in each other's profiles; profile under light load.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from .settings import settings
+
+HEADER = "x-profile"
+
+class Profile:
+    """Samples collected while one request ran."""
+
+    def __init__(self, forced: bool):
+        self.forced = forced
+        self.stacks: Counter = Counter()
+
+class Sampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: Dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> None:
+        with self._lock:
+            self._active[id(profile)] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._active.pop(id(profile), None)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                profiles = list(self._active.values())
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                stack = ";".join(reversed(frames))
+                for profile in profiles:
+                    profile.stacks[stack] += 1
+
+sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000)
+
+def begin(headers) -> Optional[Profile]:
+    """A Profile if this request is to be sampled, else None."""
+    forced = settings.PROFILE_HEADER and headers.get(HEADER) == "1"
+    if not forced and not (settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE):
+        return None
+    profile = Profile(forced)
+    sampler.start(profile)
+    return profile
+
+def end(profile: Profile, method: str, route: str, seconds: float) -> Optional[str]:
+    """Stop sampling; write the profile if the request was slow (or forced). Returns its path."""
+    sampler.stop(profile)
+    if not profile.stacks or (not profile.forced and seconds * 1000 < settings.PROFILE_SLOW_MS):
+        return None
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", f"{method} {route}").strip("_")
+    path = os.path.join(settings.PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{int(seconds * 1000)}ms-{slug}.folded")
+    with open(path, "w") as f:
+        for stack, count in profile.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from .conflicts import ACTIVE_STATUSES, conflict_graph
+from .models import BookingSeries, RecurrenceFreq
+
+def weekdays(series: BookingSeries) -> List[int]:
+    if series.weekdays:
+        return sorted({int(d) for d in series.weekdays.split(",")})
+    return [_local_start(series).weekday()]
+
+def exception_dates(series: BookingSeries) -> set:
+    return {date.fromisoformat(d) for d in series.exceptions.split(",") if d}
+
+def _local_start(series: BookingSeries) -> datetime:
+    return series.first_start_utc.astimezone(ZoneInfo(series.timezone))
+
+def _dates_from(series: BookingSeries, from_date: date) -> Iterator[Tuple[int, date]]:
+    """(ordinal, local date) of every candidate occurrence on or after `from_date`.
+
+    Jumps straight to `from_date` instead of walking from the first
+    occurrence, so reading a window late in a long series costs the same as
+    reading the first one. Ordinals count from 0 and ignore exceptions (an
+    exception still uses up one of `count`).
+    """
+    first = _local_start(series).date()
+    if series.freq == RecurrenceFreq.daily:
+        k = max(0, -(-(from_date - first).days // series.interval))
+        while True:
+            yield k, first + timedelta(days=k * series.interval)
+            k += 1
+
+    days = weekdays(series)
+    week0 = first - timedelta(days=first.weekday())
+    in_first_week = [d for d in days if week0 + timedelta(days=d) >= first]
+    period = 7 * series.interval
+    w = max(0, (from_date - week0).days // period)
+    while True:
+        week = week0 + timedelta(days=w * period)
+        for i, d in enumerate(in_first_week if w == 0 else days):
+            ordinal = i if w == 0 else len(in_first_week) + (w - 1) * len(days) + i
+            yield ordinal, week + timedelta(days=d)
+        w += 1
+
+def occurrences(series: BookingSeries, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                with_exceptions: bool = False) -> Iterator[Tuple[datetime, datetime]]:
+    """(start_utc, end_utc) of the occurrences overlapping [start, end), in order.
+
+    Expanded lazily from the window start; with no window, the whole series.
+    Occurrences keep their local wall-clock time across DST changes.
+    """
+    tz = ZoneInfo(series.timezone)
+    local_time = _local_start(series).timetz().replace(tzinfo=None)
+    length = timedelta(minutes=series.duration_minutes)
+    skipped = set() if with_exceptions else exception_dates(series)
+    from_date = (start - length).astimezone(tz).date() - timedelta(days=1) if start else date.min
+    from_date = max(from_date, _local_start(series).date())
+    for ordinal, day in _dates_from(series, from_date):
+        if series.count is not None and ordinal >= series.count:
+            return
+        occ_start = datetime.combine(day, local_time, tzinfo=tz).astimezone(timezone.utc)
+        if series.until_utc is not None and occ_start > series.until_utc:
+            return
+        if end is not None and occ_start >= end:
+            return
+        occ_end = occ_start + length
+        if (start is None or occ_end > start) and day not in skipped:
+            yield occ_start, occ_end
+
+def last_end(series: BookingSeries) -> datetime:
+    """End of the final occurrence (exceptions included); the series must be bounded."""
+    last = None
+    for last in occurrences(series, with_exceptions=True):
+        pass
+    return last[1] if last else series.first_start_utc + timedelta(minutes=series.duration_minutes)
+
+def active_series(db: Session, windows: Dict[int, Tuple[datetime, datetime]], statuses=ACTIVE_STATUSES) -> List[BookingSeries]:
+    """Active series of the given spaces whose span overlaps that space's (start, end) window, in one query."""
+    if not windows:
+        return []
+    stmt = select(BookingSeries).where(
+        BookingSeries.status.in_(statuses),
+        or_(*(
+            and_(BookingSeries.space_id == space_id, BookingSeries.last_end_utc > lo, BookingSeries.first_start_utc < hi)
+            for space_id, (lo, hi) in windows.items()
+        )),
+    )
+    return list(db.execute(stmt).scalars())
+
+def series_busy(db: Session, space_ids: Iterable[int], start: datetime, end: datetime) -> Dict[int, List[Tuple[datetime, datetime, BookingSeries]]]:
+    """Occurrences in [start, end) of the active series of `space_ids`: {space_id: [(start, end, series)]}."""
+    busy: Dict[int, List[Tuple[datetime, datetime, BookingSeries]]] = {}
+    stmt = select(BookingSeries).where(
+        BookingSeries.space_id.in_(list(space_ids)),
+        BookingSeries.status.in_(ACTIVE_STATUSES),
+        BookingSeries.last_end_utc > start,
+        BookingSeries.first_start_utc < end,
+    )
+    for series in db.execute(stmt).scalars():
+        for occ_start, occ_end in occurrences(series, start, end):
+            busy.setdefault(series.space_id, []).append((occ_start, occ_end, series))
+    return busy
+
+def series_conflict(db: Session, space_id: int, start: datetime, end: datetime) -> Optional[int]:
+    """Id of an active series of the space or a related one with an occurrence overlapping [start, end), or None."""
+    for series in active_series(db, {other: (start, end) for other in conflict_graph(db).closure(space_id)}):
+        if next(occurrences(series, start, end), None) is not None:
+            return series.id
+    return None
@@ -0,0 +1,42 @@
+from datetime import date
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from .. import analytics
+from ..auth import require_admin
+from ..db import get_read_db, run_db, DBSession
+from ..models import ActivityType, SpaceType, User
+from ..settings import settings
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/occupancy")
+async def occupancy(
+    start: date,
+    end: date = Query(..., description="Exclusive"),
+    slot_minutes: int = Query(60, description="15, 30 or 60"),
+    tz: str = Query("UTC", description="IANA timezone for days, hours and weekdays"),
+    type: Optional[SpaceType] = None,
+    activity: Optional[ActivityType] = None,
+    db: DBSession = Depends(get_read_db),
+    admin: User = Depends(require_admin),
+):
+    """Utilization heatmaps, peak concurrency and status mix over local days [start, end).
+
+    Returns overall utilization, by local hour, by weekday, a weekday x hour
+    heatmap, per SpaceType/ActivityType breakdowns, the slot with most spaces
+    in use and booking status counts/ratios.
+    """
+    if not analytics.available():
+        raise HTTPException(status_code=501, detail="Analytics needs numpy (pip install -r requirements.txt)")
+    if slot_minutes not in (15, 30, 60):
+        raise HTTPException(status_code=400, detail="slot_minutes must be 15, 30 or 60")
+    if not 0 < (end - start).days <= settings.ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"end must be after start, at most {settings.ANALYTICS_MAX_DAYS} days")
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone {tz!r}")
+    return await run_db(db, analytics.occupancy_report, start, end, slot_minutes, tz, type, activity)
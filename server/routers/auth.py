@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ..db import get_db
+from ..db import get_db, run_db, DBSession
 from ..models import User, Role
 from ..schemas import UserCreate, UserOut, LoginRequest, Token
 from ..auth import (
-    create_access_token,
-    verify_password,
-    hash_password,
+    issue_token,
+    verify_password_async,
+    hash_password_async,
+    needs_rehash,
     get_current_user,
 )
 
@@ -22,40 +23,58 @@ def _map_role(role_str: str) -> Role:
     return Role.employee
 
 
-# ---------- Routes ----------
-@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def _find_user(db: Session, email: str):
+    user = db.query(User).filter(User.email == email).first()
+    # Release the pooled connection before hashing; `user` stays readable once detached
+    db.close()
+    return user
+
 
-    role = _map_role(payload.role)
+def _create_user(db: Session, payload: UserCreate, password_hash: str) -> UserOut:
     user = User(
         email=payload.email.strip().lower(),
         full_name=payload.full_name.strip(),
-        password_hash=hash_password(payload.password),
-        role=role,
+        password_hash=password_hash,
+        role=_map_role(payload.role),
         avatar_url=(payload.avatar_url or None),
     )
     db.add(user)
     db.commit()
     db.refresh(user)
-    return user
+    return UserOut.model_validate(user)
+
+
+def _store_hash(db: Session, user: User, password_hash: str) -> None:
+    user = db.merge(user, load=False)
+    user.password_hash = password_hash
+    db.commit()
+
+
+# ---------- Routes ----------
+@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+async def register(payload: UserCreate, db: DBSession = Depends(get_db)):
+    """Register a new user"""
+    if await run_db(db, _find_user, payload.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    password_hash = await hash_password_async(payload.password)
+    return await run_db(db, _create_user, payload, password_hash)
 
 
 @router.post("/login", response_model=Token)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(payload: LoginRequest, db: DBSession = Depends(get_db)):
     """Authenticate a user and return a JWT token"""
-    user = db.query(User).filter(User.email == payload.email.strip().lower()).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+    user = await run_db(db, _find_user, payload.email.strip().lower())
+    if not user or not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
 
-    token = create_access_token({"sub": str(user.id)})
+    token = issue_token(user)
+    # Transparently upgrade hashes made with older Argon2 parameters
+    if needs_rehash(user.password_hash):
+        await run_db(db, _store_hash, user, await hash_password_async(payload.password))
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/verify", response_model=UserOut)
-def verify(current_user: User = Depends(get_current_user)):
+async def verify(current_user: User = Depends(get_current_user)):
     """Verify current token and return user info"""
     return current_user
@@ -1,71 +1,86 @@
 #from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
-from typing import List
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import Dict, List, Optional, Sequence, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from ..models import Booking, Space, BookingStatus, User, Role
 
 
-from ..db import get_db
+from ..db import get_db, get_read_db, run_db, DBSession
 from ..auth import get_current_user, require_admin
-from ..models import Booking, Space, BookingStatus, User
-from ..schemas import BookingCreate, BookingOut
+from ..models import Booking, BookingSeries, Space, SpaceType, BookingStatus, RecurrenceFreq, User
+from ..schemas import (
+    BookingBulkCreate, BookingBulkItem, BookingBulkResult, BookingCreate, BookingOut,
+    BookingDecisionBatch, BookingDecisionItem, BookingDecisionResult, BookingSeriesCreate, BookingSeriesOut, SpaceOut,
+)
+from ..settings import settings
+from .. import archive, events, export
+from ..catalog import catalog
+from ..idempotency import idempotent
+from ..serialization import BOOKING_FIELDS, JSONBytes, array, encode_booking, encode_space, parse_fields
+from ..pagination import decode_cursor, encode_cursor, merged_page, time_window
+from ..recurrence import active_series, exception_dates, last_end, occurrences, series_busy, series_conflict
+from ..conflicts import (
+    norm_utc, overlap, find_conflict, find_conflicts, bookings_around, space_windows, IntervalSet,
+    conflict_graph, lock_space, lock_spaces, run_with_retry, ACTIVE_STATUSES,
+)
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
-def norm_utc(dt: datetime) -> datetime:
-    """Return a timezone-aware UTC datetime; treat naive values as UTC."""
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-def overlap(a_start: datetime, a_end: datetime, b_start: datetime, b_end: datetime) -> bool:
-    """All inputs must be UTC-aware."""
-    return not (a_end <= b_start or a_start >= b_end)
+DAY = timedelta(days=1)
+DST_TOLERANCE = timedelta(hours=1)
 
-@router.post("", response_model=BookingOut)
-def create_booking(
-    payload: BookingCreate,
-    db: Session = Depends(get_db),
-    current: User = Depends(get_current_user),
-):
-    # Normalize request datetimes to aware UTC
-    start = norm_utc(payload.start_utc)
-    end = norm_utc(payload.end_utc)
+def _check_desk_span(payload: BookingCreate, start: datetime, end: datetime) -> None:
+    """Desks: whole days, 1..DESK_MAX_DAYS of them.
 
+    Days are local days, which the server cannot see when the client sends
+    UTC; so the span must be a whole number of days give or take one hour
+    (a DST change in between), starting on a quarter hour (every UTC offset
+    is one). When the client sends its own offset, both ends must be local
+    midnight.
+    """
+    days = round((end - start) / DAY)
+    if not 1 <= days <= settings.DESK_MAX_DAYS or abs(end - start - days * DAY) > DST_TOLERANCE:
+        raise HTTPException(status_code=400, detail=f"Desks are booked in whole days, 1 to {settings.DESK_MAX_DAYS}")
+    local_start, local_end = payload.start_utc, payload.end_utc
+    if local_start.utcoffset() and local_end.utcoffset():
+        aligned = local_start.time() == local_end.time() == time(0)
+    else:
+        aligned = start.minute % 15 == 0 and start.second == 0 and start.microsecond == 0
+    if not aligned:
+        raise HTTPException(status_code=400, detail="Desk bookings must start and end at midnight")
+
+def _archive_floor(db: Session, starts: Sequence[datetime]) -> Optional[datetime]:
+    """Earliest start allowed, if any of `starts` is in the past: conflict checks do not read the archive."""
+    return archive.archived_before(db) if min(starts) < datetime.now(timezone.utc) else None
+
+def _check_item(
+    space: Optional[Space], payload: BookingCreate, start: datetime, end: datetime, floor: Optional[datetime] = None,
+) -> None:
+    """Everything about a booking request that does not depend on other bookings."""
     if end <= start:
         raise HTTPException(status_code=400, detail="End must be after start")
-
-    space = db.get(Space, payload.space_id)
+    if floor is not None and start < floor:
+        raise HTTPException(status_code=400, detail=f"Bookings cannot start before {floor.isoformat()} (archived history)")
     if not space or not space.is_bookable:
         raise HTTPException(status_code=404, detail="Space not bookable")
-
     if payload.attendees > space.capacity:
         raise HTTPException(status_code=400, detail=f"Attendees exceed capacity ({space.capacity})")
+    if space.type == SpaceType.desk:
+        _check_desk_span(payload, start, end)
 
-    # Conflict check (normalize DB values too because SQLite can return naive datetimes)
-    conflicts = (
-        db.query(Booking)
-        .filter(
-            Booking.space_id == payload.space_id,
-            Booking.status.in_([BookingStatus.pending, BookingStatus.approved]),
-        )
-        .all()
-    )
-    for b in conflicts:
-        b_start = norm_utc(b.start_utc)
-        b_end = norm_utc(b.end_utc)
-        if overlap(start, end, b_start, b_end):
-            raise HTTPException(status_code=409, detail="Time conflict with existing booking")
-
+def _new_booking(payload: BookingCreate, space: Space, current: User, start: datetime, end: datetime) -> Booking:
     is_manager = current.role == Role.admin  # Role.admin is our "manager"
     status = BookingStatus.approved if (is_manager or not space.requires_approval) else BookingStatus.pending
-
-    booking = Booking(
+    return Booking(
         user_id=current.id,
-        space_id=payload.space_id,
+        space_id=space.id,
         title=payload.title,
         attendees=payload.attendees,
         start_utc=start,
@@ -73,26 +88,363 @@ def create_booking(
         status=status,
         notes=payload.notes,
     )
+
+def _reserve(db: Session, payload: BookingCreate, current: User, start: datetime, end: datetime) -> BookingOut:
+    space = db.get(Space, payload.space_id)
+    _check_item(space, payload, start, end, _archive_floor(db, [start]))
+
+    # Serialize reservations of this space, then check conflicts inside the
+    # same transaction: range-bounded, index-backed query over active bookings
+    lock_space(db, space.id)
+    if find_conflict(db, space.id, start, end) is not None or series_conflict(db, space.id, start, end) is not None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Time conflict with existing booking")
+
+    booking = _new_booking(payload, space, current, start, end)
     db.add(booking)
     db.commit()
     db.refresh(booking)
-    return booking
+    return BookingOut.model_validate(booking)
+
+@router.post("", response_model=BookingOut)
+@idempotent
+async def create_booking(
+    payload: BookingCreate,
+    db: DBSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    # Normalize request datetimes to aware UTC
+    start = norm_utc(payload.start_utc)
+    end = norm_utc(payload.end_utc)
+
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End must be after start")
+
+    return await run_with_retry(db, _reserve, payload, current, start, end)
+
+def _reserve_many(db: Session, payload: BookingBulkCreate, current: User) -> BookingBulkResult:
+    items = payload.items
+    ranges = [(item.space_id, norm_utc(item.start_utc), norm_utc(item.end_utc)) for item in items]
+    spaces = {s.id: s for s in db.query(Space).filter(Space.id.in_({r[0] for r in ranges}))}
+    results: List[Optional[BookingBulkItem]] = [None] * len(items)
+
+    def fail(i: int, exc: HTTPException) -> None:
+        results[i] = BookingBulkItem(index=i, ok=False, status_code=exc.status_code, detail=exc.detail)
+
+    valid = []
+    floor = _archive_floor(db, [start for _, start, _ in ranges])
+    for i, (item, (space_id, start, end)) in enumerate(zip(items, ranges)):
+        try:
+            _check_item(spaces.get(space_id), item, start, end, floor)
+            valid.append(i)
+        except HTTPException as exc:
+            fail(i, exc)
+
+    # Same locking as _reserve, then one query for the conflicts of every item;
+    # busy time is listed under every space it blocks (see ConflictGraph)
+    lock_spaces(db, (ranges[i][0] for i in valid))
+    busy = find_conflicts(db, [ranges[i] for i in valid])
+    graph = conflict_graph(db)
+    windows = space_windows(graph.expand_ranges(ranges[i] for i in valid))
+    for series in active_series(db, windows):
+        occs = list(occurrences(series, *windows[series.space_id]))
+        for other in graph.closure(series.space_id):
+            busy.setdefault(other, []).extend(occs)
+    accepted = []
+    for i in valid:
+        space_id, start, end = ranges[i]
+        if any(overlap(start, end, s, e) for s, e in busy.get(space_id, ())):
+            fail(i, HTTPException(status_code=409, detail="Time conflict with existing booking"))
+        else:
+            # later items in the same request must not overlap this one either
+            for other in graph.closure(space_id):
+                busy.setdefault(other, []).append((start, end))
+            accepted.append(i)
+
+    if payload.atomic and len(accepted) < len(items):
+        db.rollback()
+        errors = [r.model_dump(exclude={"booking"}) for r in results if r is not None]
+        status_code = 409 if all(e["status_code"] == 409 for e in errors) else 400
+        raise HTTPException(status_code=status_code, detail={"message": "No bookings were made", "errors": errors})
+
+    bookings = {}
+    for i in accepted:
+        space_id, start, end = ranges[i]
+        bookings[i] = _new_booking(items[i], spaces[space_id], current, start, end)
+    db.add_all(bookings.values())
+    db.flush()
+    # booking.space resolves from the identity map: the spaces are already loaded
+    for i, booking in bookings.items():
+        results[i] = BookingBulkItem(index=i, ok=True, status_code=200, booking=BookingOut.model_validate(booking))
+    db.commit()
+    return BookingBulkResult(created=len(bookings), items=results)
+
+@router.post("/bulk", response_model=BookingBulkResult)
+async def create_bookings(
+    payload: BookingBulkCreate,
+    db: DBSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    """Book many (space, time) items in one transaction.
+
+    Items are validated like POST /bookings and checked for conflicts with
+    existing bookings and with each other (earlier items win). With
+    `atomic` (default) any failure books nothing and returns 400/409 with the
+    per-item errors; otherwise the valid items are booked and each item
+    reports its own result.
+    """
+    if len(payload.items) > settings.BULK_BOOKING_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_BOOKING_MAX_ITEMS} items per request")
+    return await run_with_retry(db, _reserve_many, payload, current)
+
+def _create_series(
+    db: Session, payload: BookingSeriesCreate, current: User, start: datetime, end: datetime,
+) -> BookingSeriesOut:
+    space = db.get(Space, payload.space_id)
+    _check_item(space, payload, start, end, _archive_floor(db, [start]))
+    if space.requires_approval and current.role != Role.admin:
+        raise HTTPException(status_code=400, detail="Recurring bookings of this space need an admin")
+
+    series = BookingSeries(
+        user_id=current.id,
+        space_id=space.id,
+        title=payload.title,
+        attendees=payload.attendees,
+        notes=payload.notes,
+        status=BookingStatus.approved,
+        first_start_utc=start,
+        duration_minutes=int((end - start).total_seconds() // 60),
+        timezone=payload.timezone,
+        freq=payload.freq,
+        interval=payload.interval,
+        weekdays=",".join(map(str, sorted(set(payload.weekdays)))) if payload.weekdays else None,
+        count=payload.count,
+        until_utc=norm_utc(payload.until_utc),
+        exceptions=",".join(sorted({d.isoformat() for d in payload.exceptions})),
+    )
+    # count is capped by the schema and until_utc by create_series, so last_end() terminates
+    series.last_end_utc = last_end(series)
+    if series.last_end_utc - start > timedelta(days=settings.SERIES_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"A series may span at most {settings.SERIES_MAX_DAYS} days")
+    occs = list(occurrences(series))
+    if len(occs) > settings.SERIES_MAX_OCCURRENCES:
+        raise HTTPException(status_code=400, detail=f"A series may have at most {settings.SERIES_MAX_OCCURRENCES} occurrences")
+
+    # One lock, then everything the series could collide with in two range queries
+    lock_space(db, space.id)
+    busy = IntervalSet()
+    for row in bookings_around(db, [(space.id, start, series.last_end_utc)]):
+        busy.add(row.start_utc, row.end_utc)
+    for others in series_busy(db, conflict_graph(db).closure(space.id), start, series.last_end_utc).values():
+        for occ_start, occ_end, _ in others:
+            busy.add(occ_start, occ_end)
+    clashes = [occ for occ in occs if busy.overlaps(*occ)]
+    if clashes and (not payload.skip_conflicts or len(clashes) == len(occs)):
+        db.rollback()
+        shown = ", ".join(s.isoformat() for s, _ in clashes[:5])
+        raise HTTPException(status_code=409, detail=f"{len(clashes)} occurrence(s) conflict with existing bookings: {shown}")
+    if clashes:
+        tz = ZoneInfo(series.timezone)
+        skipped = exception_dates(series) | {s.astimezone(tz).date() for s, _ in clashes}
+        series.exceptions = ",".join(d.isoformat() for d in sorted(skipped))
+
+    db.add(series)
+    db.commit()
+    db.refresh(series)
+    return BookingSeriesOut.model_validate(series)
+
+@router.post("/series", response_model=BookingSeriesOut)
+async def create_series(
+    payload: BookingSeriesCreate,
+    db: DBSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    """Book a recurring slot, stored as one series row.
+
+    `start_utc`/`end_utc` give the first occurrence; `freq` daily or weekly
+    with `interval`, `weekdays` (weekly), `count` or `until_utc`, and local
+    `exceptions`. Every occurrence is checked against existing bookings and
+    series at once; with `skip_conflicts` clashing dates become exceptions.
+    """
+    start, end = norm_utc(payload.start_utc), norm_utc(payload.end_utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End must be after start")
+    if payload.count is None and payload.until_utc is None:
+        raise HTTPException(status_code=400, detail="A series needs count or until_utc")
+    # Checked before any occurrence is expanded: a far-off until_utc would take seconds of CPU
+    if payload.until_utc is not None and norm_utc(payload.until_utc) - start > timedelta(days=settings.SERIES_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"A series may span at most {settings.SERIES_MAX_DAYS} days")
+    try:
+        tz = ZoneInfo(payload.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone {payload.timezone!r}")
+    if payload.weekdays is not None:
+        if payload.freq != RecurrenceFreq.weekly or not payload.weekdays or not all(0 <= d <= 6 for d in payload.weekdays):
+            raise HTTPException(status_code=400, detail="weekdays (0=Monday..6) apply to weekly series only")
+        if start.astimezone(tz).weekday() not in payload.weekdays:
+            raise HTTPException(status_code=400, detail="The first occurrence must fall on one of the weekdays")
+    return await run_with_retry(db, _create_series, payload, current, start, end)
+
+def _my_series(db: Session, user_id: int, include_cancelled: bool) -> List[BookingSeriesOut]:
+    q = db.query(BookingSeries).options(selectinload(BookingSeries.space)).filter(BookingSeries.user_id == user_id)
+    if not include_cancelled:
+        q = q.filter(BookingSeries.status.in_(ACTIVE_STATUSES))
+    return [BookingSeriesOut.model_validate(s) for s in q.order_by(BookingSeries.first_start_utc.desc())]
+
+@router.get("/series/mine", response_model=List[BookingSeriesOut])
+async def my_series(
+    include_cancelled: bool = Query(False),
+    db: DBSession = Depends(get_read_db),
+    current: User = Depends(get_current_user),
+):
+    return await run_db(db, _my_series, current.id, include_cancelled)
+
+def _own_series(db: Session, series_id: int, user_id: int) -> BookingSeries:
+    series = db.get(BookingSeries, series_id)
+    if not series or series.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Series not found")
+    return series
+
+def _cancel_series(db: Session, series_id: int, user_id: int) -> dict:
+    series = _own_series(db, series_id, user_id)
+    series.status = BookingStatus.cancelled
+    db.commit()
+    return {"ok": True, "id": series_id, "message": "series cancelled"}
+
+@router.delete("/series/{series_id}")
+async def cancel_series(series_id: int, db: DBSession = Depends(get_db), current: User = Depends(get_current_user)):
+    return await run_db(db, _cancel_series, series_id, current.id)
+
+def _skip_occurrence(db: Session, series_id: int, user_id: int, day: date) -> BookingSeriesOut:
+    series = _own_series(db, series_id, user_id)
+    tz = ZoneInfo(series.timezone)
+    local_midnight = datetime.combine(day, time(0), tzinfo=tz)
+    if not any(s.astimezone(tz).date() == day for s, _ in occurrences(series, local_midnight, local_midnight + DAY)):
+        raise HTTPException(status_code=404, detail="No occurrence on that date")
+    series.exceptions = ",".join(d.isoformat() for d in sorted(exception_dates(series) | {day}))
+    db.commit()
+    db.refresh(series)
+    return BookingSeriesOut.model_validate(series)
+
+@router.delete("/series/{series_id}/occurrences/{day}", response_model=BookingSeriesOut)
+async def skip_occurrence(series_id: int, day: date, db: DBSession = Depends(get_db), current: User = Depends(get_current_user)):
+    """Cancel one occurrence (by its local date); the rest of the series stays."""
+    return await run_db(db, _skip_occurrence, series_id, current.id, day)
+
+# The columns BookingOut needs; list endpoints select these as plain rows
+BOOKING_COLUMNS = ("id", "user_id", "space_id", "title", "attendees", "start_utc", "end_utc", "status", "notes")
+
+def _booking_query(db: Session, model, *clauses):
+    """Rows of BOOKING_COLUMNS from `model` (Booking or ArchivedBooking)."""
+    return db.query(*(getattr(model, name) for name in BOOKING_COLUMNS)).filter(*clauses)
+
+def _list_tables(db: Session, include_archived: bool, start_from: Optional[datetime]) -> Tuple[type, ...]:
+    # Bookings starting at or after `start_from` still run then: archive.tables' question
+    return archive.tables(db, norm_utc(start_from)) if include_archived else archive.LIVE
+
+def _booking_row(row) -> dict:
+    return {**row._asdict(), "series_id": None}
+
+def _occurrence_row(series: BookingSeries, start: datetime, end: datetime) -> dict:
+    return {
+        "id": None, "user_id": series.user_id, "space_id": series.space_id, "title": series.title,
+        "attendees": series.attendees, "start_utc": start, "end_utc": end, "status": series.status,
+        "notes": series.notes, "series_id": series.id,
+    }
+
+def _sort_key(b: dict) -> Tuple[datetime, int]:
+    # Occurrences sort by -series_id so (start_utc, key) stays unique next to booking ids
+    return b["start_utc"], b["id"] if b["id"] is not None else -b["series_id"]
+
+def _encode_bookings(db: Session, rows: List[dict], fields: Optional[List[str]]) -> bytes:
+    """JSON array of BookingOut; each distinct space is encoded once (catalog spaces: once per revision)."""
+    spaces: Dict[int, bytes] = {}
+    if fields is None or "space" in fields:
+        spaces = catalog.view(db).encoded
+        missing = {r["space_id"] for r in rows}.difference(spaces)
+        if missing:
+            # not in the catalog: spaces that are no longer bookable
+            spaces = {**spaces, **{
+                s.id: encode_space(SpaceOut.model_validate(s).model_dump())
+                for s in db.query(Space).filter(Space.id.in_(missing))
+            }}
+    return array(encode_booking(r, spaces, fields) for r in rows)
+
+def _my_occurrences(
+    db: Session, user_id: int, start_from: Optional[datetime], start_to: Optional[datetime], cursor: Optional[str],
+) -> List[dict]:
+    """Occurrences of the user's active series in the window, newest first, after `cursor`."""
+    start_from, start_to = norm_utc(start_from), norm_utc(start_to)
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        # Newest first: only occurrences up to the cursor's start are left
+        until = after[0] + timedelta(microseconds=1)
+        start_to = min(start_to, until) if start_to else until
+    q = db.query(BookingSeries).filter(BookingSeries.user_id == user_id, BookingSeries.status.in_(ACTIVE_STATUSES))
+    if start_from:
+        q = q.filter(BookingSeries.last_end_utc > start_from)
+    if start_to:
+        q = q.filter(BookingSeries.first_start_utc < start_to)
+    out = []
+    for series in q:
+        for occ_start, occ_end in occurrences(series, start_from, start_to):
+            if start_from and occ_start < start_from:
+                continue  # window filters are on start time, like time_window
+            occ = _occurrence_row(series, occ_start, occ_end)
+            if after is None or _sort_key(occ) < after:
+                out.append(occ)
+    return out
+
+def _my_bookings(
+    db: Session, user_id: int, include_cancelled: bool, start_from: Optional[datetime],
+    start_to: Optional[datetime], cursor: Optional[str], limit: Optional[int], include_series: bool = False,
+    fields: Optional[List[str]] = None, include_archived: bool = False,
+) -> Tuple[bytes, Optional[str]]:
+    queries = []
+    for model in _list_tables(db, include_archived, start_from):
+        q = _booking_query(db, model, model.user_id == user_id)
+        if not include_cancelled:
+            q = q.filter(model.status.in_(ACTIVE_STATUSES))
+        queries.append((time_window(q, start_from, start_to, model), model))
+    # Legacy clients (neither cursor nor limit): the whole (windowed) history in one response
+    unpaged = cursor is None and limit is None
+    rows, next_cursor = merged_page(queries, cursor, None if unpaged else limit or DEFAULT_PAGE_SIZE, descending=True)
+    bookings = [_booking_row(r) for r in rows]
+    if not include_series:
+        return _encode_bookings(db, bookings, fields), next_cursor
+
+    occs = _my_occurrences(db, user_id, start_from, start_to, cursor)
+    merged = sorted(bookings + occs, key=_sort_key, reverse=True)
+    page_size = limit or DEFAULT_PAGE_SIZE
+    if (cursor is None and limit is None) or (next_cursor is None and len(merged) <= page_size):
+        return _encode_bookings(db, merged, fields), None
+    page = merged[:page_size]
+    return _encode_bookings(db, page, fields), encode_cursor(*_sort_key(page[-1]))
 
 @router.get("/mine", response_model=List[BookingOut])
-def my_bookings(
+async def my_bookings(
     include_cancelled: bool = Query(False, description="Include cancelled/rejected in results"),
-    db: Session = Depends(get_db),
+    start_from: Optional[datetime] = Query(None, alias="from", description="Only bookings starting at or after this"),
+    start_to: Optional[datetime] = Query(None, alias="to", description="Only bookings starting before this"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; with neither limit nor cursor everything is returned"),
+    include_series: bool = Query(False, description="Interleave occurrences of recurring series (id null, series_id set)"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of the fields to return"),
+    include_archived: bool = Query(False, description="Also read bookings moved to the archive (see archive.py)"),
+    db: DBSession = Depends(get_read_db),
     current: User = Depends(get_current_user),
 ):
-    q = db.query(Booking).filter(Booking.user_id == current.id)
-    if not include_cancelled:
-        q = q.filter(Booking.status.in_([BookingStatus.pending, BookingStatus.approved]))
-    return q.order_by(Booking.start_utc.desc()).all()
+    """Newest first. Passing `limit` or `cursor` pages the result; the next page's cursor is in X-Next-Cursor."""
+    wanted = parse_fields(fields, BOOKING_FIELDS)
+    body, next_cursor = await run_db(
+        db, _my_bookings, current.id, include_cancelled, start_from, start_to, cursor, limit, include_series, wanted,
+        include_archived,
+    )
+    return JSONBytes(body, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
-@router.delete("/{booking_id}")
-def cancel_booking(booking_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def _cancel(db: Session, booking_id: int, user_id: int) -> dict:
     b = db.get(Booking, booking_id)
-    if not b or b.user_id != current.id:
+    if not b or b.user_id != user_id:
         raise HTTPException(status_code=404, detail="Booking not found")
     if b.status in [BookingStatus.cancelled, BookingStatus.rejected]:
         return {"ok": True, "id": booking_id, "message": "booking cancelled"}
@@ -100,27 +452,192 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db), current: User
     db.commit()
     return {"ok": True, "id": booking_id, "message": "booking cancelled"}
 
+@router.delete("/{booking_id}")
+@idempotent
+async def cancel_booking(booking_id: int, db: DBSession = Depends(get_db), current: User = Depends(get_current_user)):
+    return await run_db(db, _cancel, booking_id, current.id)
+
+def _pending(
+    db: Session, start_from: Optional[datetime], start_to: Optional[datetime],
+    cursor: Optional[str], limit: Optional[int], fields: Optional[List[str]] = None, include_archived: bool = False,
+) -> Tuple[bytes, Optional[str]]:
+    queries = [
+        (time_window(_booking_query(db, model, model.status == BookingStatus.pending), start_from, start_to, model), model)
+        for model in _list_tables(db, include_archived, start_from)
+    ]
+    unpaged = cursor is None and limit is None
+    rows, next_cursor = merged_page(queries, cursor, None if unpaged else limit or DEFAULT_PAGE_SIZE)
+    return _encode_bookings(db, [_booking_row(r) for r in rows], fields), next_cursor
 
 @router.get("/pending", response_model=List[BookingOut])
-def pending_bookings(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    return db.query(Booking).filter(Booking.status == BookingStatus.pending).order_by(Booking.start_utc.asc()).all()
+async def pending_bookings(
+    start_from: Optional[datetime] = Query(None, alias="from", description="Only bookings starting at or after this"),
+    start_to: Optional[datetime] = Query(None, alias="to", description="Only bookings starting before this"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; with neither limit nor cursor everything is returned"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of the fields to return"),
+    include_archived: bool = Query(False, description="Also read bookings moved to the archive (still pending when archived)"),
+    db: DBSession = Depends(get_read_db),
+    admin: User = Depends(require_admin),
+):
+    """Oldest first, paged like GET /bookings/mine."""
+    wanted = parse_fields(fields, BOOKING_FIELDS)
+    body, next_cursor = await run_db(db, _pending, start_from, start_to, cursor, limit, wanted, include_archived)
+    return JSONBytes(body, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
-@router.post("/{booking_id}/approve", response_model=BookingOut)
-def approve_booking(booking_id: int, db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    b = db.get(Booking, booking_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    b.status = BookingStatus.approved
+@router.get("/export")
+async def export_bookings(
+    start_from: Optional[datetime] = Query(None, alias="from", description="Only bookings starting at or after this"),
+    start_to: Optional[datetime] = Query(None, alias="to", description="Only bookings starting before this"),
+    status: List[BookingStatus] = Query([], description="Repeat to keep several statuses; all by default"),
+    type: Optional[SpaceType] = None,
+    user_id: Optional[int] = None,
+    format: str = Query("csv", description="csv or ndjson"),
+    gzip: bool = Query(False, description="Send a .gz file"),
+    include_archived: bool = Query(False, description="Also read bookings moved to the archive (see archive.py)"),
+    db: DBSession = Depends(get_read_db),
+    admin: User = Depends(require_admin),
+):
+    """Bookings joined with their space and user, streamed in (start_utc, id) order; see export.py."""
+    if format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    models = await run_db(db, _list_tables, include_archived, start_from)
+    stmt = export.statement(start_from, start_to, status, type, user_id, models)
+    name = export.filename(format, gzip, start_from, start_to)
+    return StreamingResponse(
+        export.stream(stmt, format, gzip),
+        media_type="application/gzip" if gzip else export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
+def _decide_many(
+    db: Session, approve: Sequence[int], reject: Sequence[int], reject_conflicting: bool = False,
+) -> BookingDecisionResult:
+    """Apply approve/reject decisions with one status UPDATE per outcome.
+
+    Approvals are granted in booking id order (first come, first served)
+    against approved bookings and approvals earlier in the batch; a losing
+    approval keeps its status and reports 409. With `reject_conflicting`,
+    pending bookings overlapping a granted approval (losers included) are
+    rejected in the same transaction.
+    """
+    wanted = {i: BookingStatus.approved for i in approve}
+    wanted.update((i, BookingStatus.rejected) for i in reject)
+    rows = {
+        r.id: r for r in db.execute(
+            select(Booking.id, Booking.space_id, Booking.status, Booking.start_utc, Booking.end_utc)
+            .where(Booking.id.in_(wanted))
+        )
+    }
+    items: Dict[int, BookingDecisionItem] = {}
+    to_approve, to_reject = [], set()
+    for booking_id, status in wanted.items():
+        row = rows.get(booking_id)
+        if row is None:
+            items[booking_id] = BookingDecisionItem(id=booking_id, ok=False, status_code=404, detail="Booking not found")
+        elif row.status == BookingStatus.cancelled:
+            items[booking_id] = BookingDecisionItem(
+                id=booking_id, ok=False, status_code=409, status=row.status, detail="Booking was cancelled")
+        elif row.status == status:
+            items[booking_id] = BookingDecisionItem(id=booking_id, ok=True, status_code=200, status=status)
+        elif status == BookingStatus.approved:
+            to_approve.append(row)
+        else:
+            to_reject.add(booking_id)
+
+    # Same per-space lock as _reserve, then every possible rival in one query
+    ranges = [(r.space_id, r.start_utc, r.end_utc) for r in to_approve]
+    lock_spaces(db, (space_id for space_id, _, _ in ranges))
+    graph = conflict_graph(db)
+    candidates = {r.id for r in to_approve}
+    # Busy and granted time is kept under every space it blocks (see ConflictGraph)
+    busy: Dict[int, IntervalSet] = {}
+    pending_rivals = []
+    for rival in bookings_around(db, ranges):
+        if rival.id in to_reject or rival.id in candidates:
+            continue
+        if rival.status == BookingStatus.approved:
+            for other in graph.closure(rival.space_id):
+                busy.setdefault(other, IntervalSet()).add(rival.start_utc, rival.end_utc)
+        else:
+            pending_rivals.append(rival)
+    windows = space_windows(graph.expand_ranges(ranges))
+    for series in active_series(db, windows):
+        for occ_start, occ_end in occurrences(series, *windows[series.space_id]):
+            for other in graph.closure(series.space_id):
+                busy.setdefault(other, IntervalSet()).add(occ_start, occ_end)
+
+    granted: Dict[int, IntervalSet] = {}
+    losers = []
+    for row in sorted(to_approve, key=lambda r: r.id):
+        taken = busy.setdefault(row.space_id, IntervalSet())
+        if taken.overlaps(row.start_utc, row.end_utc):
+            items[row.id] = BookingDecisionItem(
+                id=row.id, ok=False, status_code=409, status=row.status, detail="Time conflict with an approved booking")
+            losers.append(row)
+            continue
+        for other in graph.closure(row.space_id):
+            busy.setdefault(other, IntervalSet()).add(row.start_utc, row.end_utc)
+            granted.setdefault(other, IntervalSet()).add(row.start_utc, row.end_utc)
+        items[row.id] = BookingDecisionItem(id=row.id, ok=True, status_code=200, status=BookingStatus.approved)
+
+    auto_rejected = []
+    if reject_conflicting:
+        for rival in pending_rivals + [r for r in losers if r.status == BookingStatus.pending]:
+            wins = granted.get(rival.space_id)
+            if wins is not None and wins.overlaps(rival.start_utc, rival.end_utc):
+                auto_rejected.append(rival.id)
+                if rival.id in items:
+                    items[rival.id] = items[rival.id].model_copy(update={"status": BookingStatus.rejected})
+    for booking_id in to_reject:
+        items[booking_id] = BookingDecisionItem(id=booking_id, ok=True, status_code=200, status=BookingStatus.rejected)
+
+    winners = [i for i in candidates if items[i].ok]
+    known = {**{r.id: r for r in pending_rivals}, **rows}
+    for ids, status in ((winners, BookingStatus.approved), ([*to_reject, *auto_rejected], BookingStatus.rejected)):
+        if ids:
+            db.execute(
+                update(Booking).where(Booking.id.in_(ids)).values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+        # Bulk UPDATEs skip the flush events that feed availability push
+        for booking_id in ids:
+            row = known[booking_id]
+            events.booking_changed(db, booking_id, row.space_id, status, row.start_utc, row.end_utc)
     db.commit()
-    db.refresh(b)
-    return b
+    return BookingDecisionResult(
+        approved=len(winners),
+        rejected=len(to_reject) + len(auto_rejected),
+        items=[items[i] for i in wanted],
+        auto_rejected=sorted(auto_rejected),
+    )
+
+@router.post("/decisions", response_model=BookingDecisionResult)
+async def decide_bookings(
+    payload: BookingDecisionBatch,
+    db: DBSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Approve and reject many bookings in one transaction; each id gets its own outcome."""
+    if len(payload.approve) + len(payload.reject) > settings.BULK_DECISION_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_DECISION_MAX_ITEMS} decisions per request")
+    if set(payload.approve) & set(payload.reject):
+        raise HTTPException(status_code=400, detail="A booking cannot be both approved and rejected")
+    return await run_with_retry(db, _decide_many, payload.approve, payload.reject, payload.reject_conflicting)
+
+def _decide(db: Session, booking_id: int, status: BookingStatus) -> BookingOut:
+    approve, reject = ([booking_id], []) if status == BookingStatus.approved else ([], [booking_id])
+    outcome = _decide_many(db, approve, reject).items[0]
+    if not outcome.ok:
+        raise HTTPException(status_code=outcome.status_code, detail=outcome.detail)
+    return BookingOut.model_validate(db.get(Booking, booking_id))
+
+@router.post("/{booking_id}/approve", response_model=BookingOut)
+@idempotent
+async def approve_booking(booking_id: int, db: DBSession = Depends(get_db), admin: User = Depends(require_admin)):
+    return await run_with_retry(db, _decide, booking_id, BookingStatus.approved)
 
 @router.post("/{booking_id}/reject", response_model=BookingOut)
-def reject_booking(booking_id: int, db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    b = db.get(Booking, booking_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    b.status = BookingStatus.rejected
-    db.commit()
-    db.refresh(b)
-    return b
+@idempotent
+async def reject_booking(booking_id: int, db: DBSession = Depends(get_db), admin: User = Depends(require_admin)):
+    return await run_with_retry(db, _decide, booking_id, BookingStatus.rejected)
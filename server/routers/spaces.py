@@ -1,82 +1,383 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from datetime import datetime, timezone
+from sqlalchemy import and_, select
+from datetime import datetime, timezone, timedelta
 from typing import List, Optional
-import re
+import heapq
 
-from ..db import get_db
-from ..models import Space, SpaceType, ActivityType, Booking, BookingStatus
+from .. import archive, availability as availability_cache, events
+from ..db import get_read_db, run_db, DBSession
+from ..models import Space, SpaceType, ActivityType, ArchivedBooking, Booking, BookingStatus
 from ..schemas import SpaceOut
+from ..serialization import SPACE_FIELDS, JSONBytes, array, encode_space, parse_fields
+from ..conflicts import ACTIVE_STATUSES, conflict_graph, norm_utc, on_spaces
+from ..catalog import catalog, current_revision, natural_key as _natural_key
+from ..recurrence import series_busy
+from ..settings import settings
 
 router = APIRouter(prefix="/spaces", tags=["spaces"])
 
-def _natural_key(name: str):
-    """Split a string into text/number chunks for natural sorting."""
-    parts = re.findall(r"\d+|\D+", name or "")
-    return [int(p) if p.isdigit() else p.lower() for p in parts]
+# Longer id lists from a search are applied to the rows instead of as SQL IN (bind parameter limits)
+MAX_IN_IDS = 1000
+DAY = timedelta(days=1)
+
+def _space_filters(type: Optional[SpaceType], activity: Optional[ActivityType], space_ids: Optional[list] = None) -> list:
+    """WHERE clauses shared by the floor-wide availability and the free-slot search."""
+    clauses = [Space.is_bookable == True]
+    if type:
+        clauses.append(Space.type == type)
+    if activity:
+        clauses.append(Space.activity == activity)
+    if space_ids is not None and len(space_ids) <= MAX_IN_IDS:
+        clauses.append(Space.id.in_(space_ids))
+    return clauses
+
+def _parse_day(date: Optional[str]):
+    """Parse YYYY-MM-DD (UTC day); default to today."""
+    if not date:
+        return datetime.now(timezone.utc).date()
+    try:
+        return datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
 
 @router.get("", response_model=List[SpaceOut])
-def list_spaces(
-    db: Session = Depends(get_db),
+async def list_spaces(
+    request: Request,
+    db: DBSession = Depends(get_read_db),
+    type: Optional[SpaceType] = None,
+    activity: Optional[ActivityType] = None,
+    q: Optional[str] = Query(None, description="Words to find as prefixes of name/description words; results best first"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of the fields to return"),
+):
+    """Bookable spaces in natural name order or, with `q`, ranked by relevance (type-ahead)."""
+    # Served from the pre-sorted, pre-encoded in-process catalog; the ETag changes with the catalog revision
+    wanted = parse_fields(fields, SPACE_FIELDS)
+    view = await run_db(db, catalog.view)
+    etag = f'W/"spaces-{view.revision}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+    matches = view.filter(type, activity, q, limit)
+    if wanted is None:
+        body = array(view.encoded[s.id] for s in matches)
+    else:
+        body = array(encode_space(s.model_dump(include=set(wanted)), wanted) for s in matches)
+    return JSONBytes(body, headers={"ETag": etag})
+
+@router.get("/events")
+async def availability_events(
+    space_id: Optional[List[int]] = Query(None, description="Repeat for several spaces"),
     type: Optional[SpaceType] = None,
     activity: Optional[ActivityType] = None,
     q: Optional[str] = None,
+    db: DBSession = Depends(get_read_db),
 ):
-    query = db.query(Space).filter(Space.is_bookable == True)
-    if type:
-        query = query.filter(Space.type == type)
-    if activity:
-        query = query.filter(Space.activity == activity)
-    if q:
-        like = f"%{q.lower()}%"
-        query = query.filter(or_(Space.name.ilike(like), Space.description.ilike(like)))
+    """Server-Sent Events stream of availability changes, instead of polling.
+
+    Subscribe to `space_id`s, to a floor view (`type`/`activity`/`q`, resolved
+    to its spaces when the stream opens) or, with no parameters, to every
+    space. Each `availability` event is one booking or series change:
+    `{kind: booking|series, id, space_id, status, start_utc, end_utc}`. A
+    `resync` event means changes were dropped because the client fell behind;
+    refetch the availability it shows.
+    """
+    space_ids = None
+    if space_id:
+        space_ids = set(space_id)
+    elif type or activity or q:
+        view = await run_db(db, catalog.view)
+        space_ids = {s.id for s in view.filter(type, activity, q)}
+        # End the read transaction: the stream must not keep a pooled connection
+        await run_db(db, Session.rollback)
+    sub = events.hub.subscribe(space_ids)
+    return StreamingResponse(
+        events.stream(sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/availability")
+async def floor_availability(
+    db: DBSession = Depends(get_read_db),
+    date: Optional[str] = None,
+    days: int = Query(1, ge=1, le=31),
+    type: Optional[SpaceType] = None,
+    activity: Optional[ActivityType] = None,
+    q: Optional[str] = None,
+    slot_minutes: Optional[int] = Query(None, ge=5, le=1440, description="Return slot bitmaps instead of intervals"),
+):
+    """Occupancy of every (filtered) space over `days` UTC days from `date`, in one query.
+
+    Busy time is given per space in minutes from the window start, and
+    includes the bookings of related spaces (a combined room is busy while
+    one of its member rooms is booked, and the other way round):
+    - default: `busy` = [[start_min, end_min, status], ...], clipped to the window;
+    - with `slot_minutes`: `bitmap` = hex string, bit i (MSB first) set when
+      slot i overlaps an active booking.
+    """
+    d = _parse_day(date)
+    start = datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+    return await run_db(db, _floor_availability, start, days, type, activity, q, slot_minutes)
+
+def _floor_availability(db: Session, start: datetime, days: int, type, activity, q, slot_minutes) -> dict:
+    end = start + timedelta(days=days)
+    total_min = days * 24 * 60
+
+    active = and_(
+        Booking.space_id == Space.id,
+        Booking.status.in_(ACTIVE_STATUSES),
+        Booking.end_utc > start,
+        Booking.start_utc < end,
+    )
+    # q goes through the catalog's search index, like GET /spaces
+    space_ids = [s.id for s in catalog.view(db).filter(type, activity, q)] if q else None
+    rows = db.execute(
+        select(Space.id, Booking.start_utc, Booking.end_utc, Booking.status)
+        .outerjoin(Booking, active)
+        .where(*_space_filters(type, activity, space_ids))
+        .order_by(Space.id, Booking.start_utc)
+    ).all()
+    if space_ids is not None and len(space_ids) > MAX_IN_IDS:
+        wanted = set(space_ids)
+        rows = [r for r in rows if r[0] in wanted]
+
+    def clip(b_start: datetime, b_end: datetime, status: BookingStatus) -> list:
+        s_min = max(0, int((b_start - start).total_seconds() // 60))
+        e_min = min(total_min, -int(-(b_end - start).total_seconds() // 60))
+        return [s_min, e_min, status.value]
 
-    # Minimal change: fetch then natural-sort by name
-    spaces = query.all()
-    spaces.sort(key=lambda s: _natural_key(s.name))
-    return spaces
+    busy: dict[int, list] = {}
+    for space_id, b_start, b_end, b_status in rows:
+        intervals = busy.setdefault(space_id, [])
+        if b_start is not None:
+            intervals.append(clip(b_start, b_end, b_status))
+    listed = list(busy)
+    # Related spaces outside the list lend their busy time too: one more query, only when there are any
+    graph = conflict_graph(db)
+    watched = graph.expand(listed)
+    extra = watched.difference(busy)
+    if extra:
+        for space_id, b_start, b_end, b_status in db.execute(
+            select(Booking.space_id, Booking.start_utc, Booking.end_utc, Booking.status).where(
+                on_spaces(
+                    sorted(extra), Booking.status.in_(ACTIVE_STATUSES), Booking.end_utc > start, Booking.start_utc < end,
+                )
+            )
+        ):
+            busy.setdefault(space_id, []).append(clip(b_start, b_end, b_status))
+    changed = set()
+    # Past windows: archived bookings, one range scan per space (see archive.py)
+    if ArchivedBooking in archive.tables(db, start):
+        for space_id, b_start, b_end, b_status in db.execute(
+            select(ArchivedBooking.space_id, ArchivedBooking.start_utc, ArchivedBooking.end_utc, ArchivedBooking.status)
+            .where(
+                on_spaces(
+                    sorted(watched), ArchivedBooking.status.in_(ACTIVE_STATUSES),
+                    ArchivedBooking.end_utc > start, ArchivedBooking.start_utc < end, model=ArchivedBooking,
+                )
+            )
+        ):
+            busy.setdefault(space_id, []).append(clip(b_start, b_end, b_status))
+            changed.add(space_id)
+    # Recurring series: expanded for this window only
+    for sid, occs in series_busy(db, watched, start, end).items():
+        busy.setdefault(sid, []).extend(clip(o_start, o_end, series.status) for o_start, o_end, series in occs)
+        changed.add(sid)
+    own = busy
+    busy = {}
+    for sid in listed:
+        related = graph.related(sid)
+        busy[sid] = own[sid] + [iv for other in related for iv in own.get(other, ())]
+        if related or sid in changed:
+            busy[sid].sort()
+
+    result = {"start_utc": start, "end_utc": end, "spaces": []}
+    if slot_minutes is None:
+        result["spaces"] = [{"id": sid, "busy": iv} for sid, iv in busy.items()]
+        return result
+
+    n_slots = -(-total_min // slot_minutes)
+    result["slot_minutes"] = slot_minutes
+    for sid, iv in busy.items():
+        bits = bytearray((n_slots + 7) // 8)
+        for s_min, e_min, _ in iv:
+            for i in range(s_min // slot_minutes, -(-e_min // slot_minutes)):
+                bits[i >> 3] |= 0x80 >> (i & 7)
+        result["spaces"].append({"id": sid, "bitmap": bits.hex()})
+    return result
+
+@router.get("/free-slots")
+async def free_slots(
+    start: datetime,
+    end: datetime,
+    duration: int = Query(..., ge=5, le=7 * 24 * 60, description="Minutes"),
+    attendees: int = Query(1, ge=1),
+    activity: Optional[ActivityType] = None,
+    type: Optional[SpaceType] = None,
+    step: int = Query(15, ge=1, le=24 * 60, description="Candidate start granularity in minutes"),
+    per_space: int = Query(3, ge=1, le=50),
+    limit: int = Query(20, ge=1, le=200),
+    db: DBSession = Depends(get_read_db),
+):
+    """Find (space, start) pairs where `attendees` fit for `duration` minutes inside [start, end).
+
+    Eligibility follows create_booking (bookable, capacity >= attendees) and
+    busy time follows its conflict rules (pending + approved, on the space
+    or a related one). All active
+    bookings of eligible spaces in the window come back in one ordered query
+    and are swept per space; each free gap contributes its earliest start
+    aligned to `step` from the window start. Results are ranked by start
+    time, then by the tightest capacity fit, then by name.
+
+    Desks follow POST /bookings: they are only offered for a whole number of
+    days (1 to DESK_MAX_DAYS), starting at midnight in the UTC offset of
+    `start`.
+    """
+    window_start, window_end = norm_utc(start), norm_utc(end)
+    length = timedelta(minutes=duration)
+    if window_end - window_start < length:
+        raise HTTPException(status_code=400, detail="Window is shorter than the requested duration")
+    midnight = norm_utc(start.replace(hour=0, minute=0, second=0, microsecond=0))
+    return await run_db(
+        db, _free_slots, window_start, window_end, length, attendees, activity, type, step, per_space, limit, midnight
+    )
+
+def _free_slots(
+    db: Session, window_start: datetime, window_end: datetime, length: timedelta,
+    attendees: int, activity, type, step: int, per_space: int, limit: int, midnight: Optional[datetime] = None,
+) -> list:
+    filters = [*_space_filters(type, activity), Space.capacity >= attendees]
+    if length % DAY or not DAY <= length <= settings.DESK_MAX_DAYS * DAY:
+        filters.append(Space.type != SpaceType.desk)  # desks are booked in whole days only
+    spaces = {s.id: s for s in db.query(Space).filter(*filters)}
+    if not spaces:
+        return []
+    graph = conflict_graph(db)
+    watched = graph.expand(spaces)
+    rows = db.execute(
+        select(Booking.space_id, Booking.start_utc, Booking.end_utc)
+        .where(
+            Booking.space_id.in_(watched),
+            Booking.status.in_(ACTIVE_STATUSES),
+            Booking.end_utc > window_start,
+            Booking.start_utc < window_end,
+        )
+        .order_by(Booking.space_id, Booking.start_utc)
+    ).all()
+
+    occurrences = series_busy(db, watched, window_start, window_end)
+    if occurrences or any(graph.related(sid) for sid in spaces):
+        # Recurring series, and bookings of related spaces, join the sweep as
+        # plain intervals of every eligible space they block
+        intervals = [*rows, *((sid, o_start, o_end) for sid, occs in occurrences.items() for o_start, o_end, _ in occs)]
+        rows = sorted(
+            (other, b_start, b_end)
+            for sid, b_start, b_end in intervals
+            for other in graph.closure(sid)
+            if other in spaces
+        )
+
+    busy: dict[int, list] = {sid: [] for sid in spaces}
+    for sid, b_start, b_end in rows:
+        merged = busy[sid]
+        if merged and b_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], b_end)
+        else:
+            merged.append([b_start, b_end])
+
+    candidates = []
+    for sid, merged in busy.items():
+        space = spaces[sid]
+        # Desks start at midnight, every day; other spaces every `step` minutes from the window start
+        if space.type == SpaceType.desk:
+            origin, step_s = midnight or window_start, DAY.total_seconds()
+        else:
+            origin, step_s = window_start, step * 60
+        found = 0
+        free_from = window_start
+        for b_start, b_end in merged + [[window_end, window_end]]:
+            if found >= per_space:
+                break
+            offset = (free_from - origin).total_seconds()
+            slot = origin + timedelta(seconds=-(-offset // step_s) * step_s)
+            if slot + length <= min(b_start, window_end):
+                candidates.append((slot, space.capacity - attendees, _natural_key(space.name), sid))
+                found += 1
+            free_from = max(free_from, b_end)
+
+    best = heapq.nsmallest(limit, candidates)
+    return [
+        {"space": SpaceOut.model_validate(spaces[sid]), "start_utc": slot, "end_utc": slot + length}
+        for slot, _, _, sid in best
+    ]
 
 @router.get("/{space_id}/availability")
-def availability(space_id: int, db: Session = Depends(get_db), date: Optional[str] = None):
+async def availability(space_id: int, db: DBSession = Depends(get_read_db), date: Optional[str] = None):
+    # Determine day in UTC
+    d = _parse_day(date)
+    body = await run_db(db, _cached_availability, space_id, d)
+    return Response(content=body, media_type="application/json")
+
+def _cached_availability(db: Session, space_id: int, d) -> bytes:
+    """Rendered day view, from the availability cache when it is current."""
+    revision = current_revision(db)
+    body, token = availability_cache.lookup(space_id, d, revision)
+    if body is None:
+        body = JSONResponse(jsonable_encoder(_availability(db, space_id, d))).body
+        availability_cache.store(token, body)
+    return body
+
+def _availability(db: Session, space_id: int, d) -> dict:
     space = db.get(Space, space_id)
     if not space:
         raise HTTPException(status_code=404, detail="Space not found")
 
-    # Determine day in UTC
-    if date:
-        try:
-            d = datetime.strptime(date, "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
-    else:
-        d = datetime.now(timezone.utc).date()
-
     start = datetime(d.year, d.month, d.day, 0, 0, 0, tzinfo=timezone.utc)
     end = datetime(d.year, d.month, d.day, 23, 59, 59, tzinfo=timezone.utc)
 
-    bookings = (
-        db.query(Booking)
-        .filter(
-            Booking.space_id == space_id,
-            Booking.status.in_([BookingStatus.pending, BookingStatus.approved]),
-            Booking.start_utc <= end,
-            Booking.end_utc >= start,
+    # Bookings of related spaces block this one too; `space_id` tells them apart
+    related = conflict_graph(db).closure(space_id)
+    # Past days also read archived bookings; entries are sorted below
+    bookings = [
+        b
+        for model in archive.tables(db, start)
+        for b in db.query(model).filter(
+            on_spaces(
+                related,
+                model.status.in_([BookingStatus.pending, BookingStatus.approved]),
+                model.start_utc <= end,
+                model.end_utc >= start,
+                model=model,
+            ),
         )
-        .order_by(Booking.start_utc.asc())
-        .all()
-    )
-    return {
-        "space": SpaceOut.model_validate(space),
-        "bookings": [
-            {
-                "id": b.id,
-                "title": b.title,
-                "start_utc": b.start_utc,
-                "end_utc": b.end_utc,
-                "status": b.status,
-                "attendees": b.attendees,
-            }
-            for b in bookings
-        ],
-    }
+    ]
+    entries = [
+        {
+            "id": b.id,
+            "space_id": b.space_id,
+            "title": b.title,
+            "start_utc": b.start_utc,
+            "end_utc": b.end_utc,
+            "status": b.status,
+            "attendees": b.attendees,
+        }
+        for b in bookings
+    ]
+    # Occurrences of recurring series have no booking id
+    occurrences = series_busy(db, related, start, end + timedelta(seconds=1))
+    for o_start, o_end, series in (occ for occs in occurrences.values() for occ in occs):
+        entries.append({
+            "id": None,
+            "space_id": series.space_id,
+            "series_id": series.id,
+            "title": series.title,
+            "start_utc": o_start,
+            "end_utc": o_end,
+            "status": series.status,
+            "attendees": series.attendees,
+        })
+    entries.sort(key=lambda e: e["start_utc"])
+    return {"space": SpaceOut.model_validate(space), "bookings": entries}
@@ -1,18 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
-from ..db import get_db
+from ..db import get_db, run_db, DBSession
 from ..schemas import UserOut
-from ..auth import get_current_user, hash_password
+from ..auth import get_current_user, hash_password_async, invalidate_user, issue_token
 from ..models import User
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 # ---------- GET CURRENT USER ----------
 @router.get("/me", response_model=UserOut)
-def me(current: User = Depends(get_current_user)):
+async def me(current: User = Depends(get_current_user)):
     """Return the current logged-in user"""
     return current
 
@@ -23,13 +23,7 @@ class UserUpdate(BaseModel):
     password: Optional[str] = None
     avatar_url: Optional[str] = None
 
-@router.patch("/me", response_model=UserOut)
-def update_me(
-    data: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    """Edit the currently logged-in user's profile"""
+def _apply_update(db: Session, current_user: User, data: UserUpdate, new_hash: Optional[str]) -> UserOut:
     # Check for email conflicts
     if data.email and data.email != current_user.email:
         if db.query(User).filter(User.email == data.email).first():
@@ -42,12 +36,37 @@ def update_me(
     if data.avatar_url is not None:
         current_user.avatar_url = data.avatar_url
 
-    if data.password:
-        if len(data.password) < 8:
-            raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
-        current_user.password_hash = hash_password(data.password)
+    if new_hash:
+        current_user.password_hash = new_hash
+        # Incremented in SQL: the cached snapshot's version may be stale (another
+        # worker's bump), and old + 1 could bring back a revoked version
+        current_user.token_version = User.token_version + 1
 
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
-    return current_user
+    invalidate_user(current_user.id)
+    return UserOut.model_validate(current_user)
+
+@router.patch("/me", response_model=UserOut)
+async def update_me(
+    data: UserUpdate,
+    response: Response,
+    db: DBSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Edit the currently logged-in user's profile.
+
+    A password change revokes every previously issued token; the caller gets
+    a fresh one in the `X-Access-Token` header.
+    """
+    new_hash = None
+    if data.password:
+        if len(data.password) < 8:
+            raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
+        new_hash = await hash_password_async(data.password)
+
+    updated = await run_db(db, _apply_update, current_user, data, new_hash)
+    if new_hash:
+        response.headers["X-Access-Token"] = issue_token(current_user)
+    return updated
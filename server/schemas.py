@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
-from .models import Role, SpaceType, ActivityType, BookingStatus
+from datetime import date, datetime
+from .models import Role, SpaceType, ActivityType, BookingStatus, RecurrenceFreq
+from .settings import settings
 
 class Token(BaseModel):
     access_token: str
@@ -38,6 +39,7 @@ class SpaceCreate(BaseModel):
     requires_approval: bool = False
     is_bookable: bool = True
     description: Optional[str] = None
+    parent_id: Optional[int] = None
 
 class SpaceOut(SpaceCreate):
     id: int
@@ -53,7 +55,8 @@ class BookingCreate(BaseModel):
     notes: Optional[str] = None
 
 class BookingOut(BaseModel):
-    id: int
+    # Occurrences of a recurring series have no row of their own: id is None, series_id is set
+    id: Optional[int]
     user_id: int
     space_id: int
     title: str
@@ -63,5 +66,85 @@ class BookingOut(BaseModel):
     status: BookingStatus
     notes: Optional[str] = None
     space: SpaceOut
+    series_id: Optional[int] = None
+    class Config:
+        from_attributes = True
+
+class BookingBulkCreate(BaseModel):
+    items: List[BookingCreate] = Field(..., min_length=1)
+    # True: every item is booked or none is; False: book the valid items, report the rest
+    atomic: bool = True
+
+class BookingBulkItem(BaseModel):
+    index: int
+    ok: bool
+    status_code: int
+    detail: Optional[str] = None
+    booking: Optional[BookingOut] = None
+
+class BookingBulkResult(BaseModel):
+    created: int
+    items: List[BookingBulkItem]
+
+class BookingDecisionBatch(BaseModel):
+    approve: List[int] = []
+    reject: List[int] = []
+    # Also reject pending bookings that overlap the ones approved here
+    reject_conflicting: bool = False
+
+class BookingDecisionItem(BaseModel):
+    id: int
+    ok: bool
+    status_code: int
+    status: Optional[BookingStatus] = None
+    detail: Optional[str] = None
+
+class BookingDecisionResult(BaseModel):
+    approved: int
+    rejected: int
+    items: List[BookingDecisionItem]
+    # pending bookings rejected because they lost to an approval (reject_conflicting)
+    auto_rejected: List[int] = []
+
+class BookingSeriesCreate(BookingCreate):
+    """The first occurrence (start_utc/end_utc) plus the rule that repeats it."""
+    freq: RecurrenceFreq
+    interval: int = Field(1, ge=1, le=52)
+    weekdays: Optional[List[int]] = None  # 0 = Monday; weekly only, defaults to the first occurrence's day
+    count: Optional[int] = Field(None, ge=1, le=settings.SERIES_MAX_OCCURRENCES)
+    until_utc: Optional[datetime] = None
+    exceptions: List[date] = []  # local dates to skip
+    timezone: str = "UTC"  # occurrences keep their wall-clock time here across DST
+    # Skip occurrences that clash with existing bookings instead of failing with 409
+    skip_conflicts: bool = False
+
+class BookingSeriesOut(BaseModel):
+    id: int
+    user_id: int
+    space_id: int
+    title: str
+    attendees: int
+    notes: Optional[str] = None
+    status: BookingStatus
+    first_start_utc: datetime
+    duration_minutes: int
+    timezone: str
+    freq: RecurrenceFreq
+    interval: int
+    weekdays: Optional[List[int]] = None
+    count: Optional[int] = None
+    until_utc: Optional[datetime] = None
+    exceptions: List[date] = []
+    last_end_utc: datetime
+    space: SpaceOut
+
+    @field_validator("weekdays", "exceptions", mode="before")
+    @classmethod
+    def _split(cls, value):
+        # stored as comma-separated text
+        if isinstance(value, str):
+            return [v for v in value.split(",") if v]
+        return value
+
     class Config:
         from_attributes = True
@@ -0,0 +1,96 @@
+"""Type-ahead search over the space catalog: an in-memory inverted index.
+
+Names and descriptions are split into lower-case word tokens. A query
+matches a space when each of its words is a prefix of some token of that
+space ("tra ro 2" finds "Training Room 2"). Matches are ranked by where
+each word hit: a whole name token scores highest, then a name prefix, a
+whole description token and a description prefix. Ties keep catalog
+(natural name) order.
+
+The index is built once per catalog revision (see catalog.SpaceCatalog),
+so it stays in sync with space edits from any worker. Prefix lookups are
+a binary search over the sorted vocabulary.
+"""
+import bisect
+import heapq
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+NAME_EXACT, NAME_PREFIX, DESCRIPTION_EXACT, DESCRIPTION_PREFIX = 8, 4, 2, 1
+
+def tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.casefold()) if text else []
+
+class SpaceIndex:
+    """Positions (in catalog order) of the spaces holding each token, per field."""
+
+    def __init__(self, names: Sequence[str], descriptions: Sequence[Optional[str]]):
+        self._names: Dict[str, List[int]] = {}
+        self._descriptions: Dict[str, List[int]] = {}
+        # " tok1 tok2 " per field, so a word (prefix) test is one substring test
+        self._text: List[Tuple[str, str]] = []
+        for position, (name, description) in enumerate(zip(names, descriptions)):
+            name_tokens, description_tokens = tokens(name), tokens(description)
+            self._text.append((f" {' '.join(name_tokens)} ", f" {' '.join(description_tokens)} "))
+            for token in set(name_tokens):
+                self._names.setdefault(token, []).append(position)
+            for token in set(description_tokens):
+                self._descriptions.setdefault(token, []).append(position)
+        self._vocabulary = sorted(self._names.keys() | self._descriptions.keys())
+
+    def _range(self, term: str) -> List[str]:
+        lo = bisect.bisect_left(self._vocabulary, term)
+        return self._vocabulary[lo:bisect.bisect_left(self._vocabulary, term + "\U0010ffff", lo)]
+
+    def _size(self, term: str) -> int:
+        """Postings behind a query word: an upper bound on the spaces it matches."""
+        return sum(len(self._names.get(t, ())) + len(self._descriptions.get(t, ())) for t in self._range(term))
+
+    def _term(self, term: str) -> Dict[int, int]:
+        """Best score per position for one query word, matched as a prefix."""
+        scores: Dict[int, int] = {}
+        for token in self._range(term):
+            exact = token == term
+            for postings, score in (
+                (self._names, NAME_EXACT if exact else NAME_PREFIX),
+                (self._descriptions, DESCRIPTION_EXACT if exact else DESCRIPTION_PREFIX),
+            ):
+                for position in postings.get(token, ()):
+                    if scores.get(position, 0) < score:
+                        scores[position] = score
+        return scores
+
+    def _score_at(self, position: int, term: str) -> int:
+        """The score `_term(term)` gives `position`, read from that space's own tokens."""
+        name, description = self._text[position]
+        prefix = " " + term
+        if prefix in name:
+            return NAME_EXACT if prefix + " " in name else NAME_PREFIX
+        if prefix in description:
+            return DESCRIPTION_EXACT if prefix + " " in description else DESCRIPTION_PREFIX
+        return 0
+
+    def search(self, query: str, keep: Optional[Callable[[int], bool]] = None, limit: Optional[int] = None) -> List[int]:
+        """Positions matching every word of `query` (and `keep`), best first, at most `limit`."""
+        sized = sorted((self._size(term), term) for term in dict.fromkeys(tokens(query)))
+        if not sized or not sized[0][0]:
+            return []
+        # Rarest word first; later words are checked on the remaining spaces
+        # unless looking them up is cheaper than that
+        total = self._term(sized[0][1])
+        if keep is not None:
+            total = {p: s for p, s in total.items() if keep(p)}
+        for size, term in sized[1:]:
+            if len(total) < size:
+                total = {p: s + extra for p, s in total.items() if (extra := self._score_at(p, term))}
+            else:
+                scores = self._term(term)
+                total = {p: s + scores[p] for p, s in total.items() if p in scores}
+            if not total:
+                return []
+        rank = lambda p: (-total[p], p)
+        if limit is not None and limit < len(total):
+            return heapq.nsmallest(limit, total, key=rank)
+        return sorted(total, key=rank)
@@ -1,7 +1,33 @@
+"""Demo data: spaces and two users, plus optional synthetic volume.
+
+    python -m server.seed
+    python -m server.seed --users 5000 --bookings 1000000 --years 3
+
+The synthetic mode bulk-inserts with Core `insert()` executemany in chunks
+(no ORM unit of work). Every synthetic user shares the demo password.
+Bookings never overlap on a space: each space's time range is cut into
+equal slots and a booking is drawn inside each slot. Combined spaces get
+none, so their member spaces' bookings never clash with them. Existing bookings and
+series are deleted first, since the spaces they point to are reseeded.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import delete, insert, select
 from sqlalchemy.orm import Session
-from .db import engine, Base, SessionLocal
-from .models import Space, SpaceType, ActivityType, User, Role
+from .db import run_session, migrate
+from .models import ArchivedBooking, Booking, BookingSeries, BookingStatus, Space, SpaceType, ActivityType, User, Role
 from .auth import hash_password
+from .catalog import bump_revision
+
+DEMO_PASSWORD = "Hackathon@1234"
+CHUNK = 10_000
+QUARTER = timedelta(minutes=15)
+DAY = timedelta(days=1)
+FUTURE = timedelta(days=90)  # synthetic bookings also fill the next 90 days
 
 def create_spaces() -> list[Space]:
     spaces: list[Space] = []
@@ -93,7 +119,16 @@ def create_spaces() -> list[Space]:
     )
 
     # --- TRAINING ROOMS ---
-    # Two individual rooms + one “Both” combined option (selectable as a single space)
+    # Two individual rooms + one “Both” combined option (selectable as a single space).
+    # The rooms are its members: booking either one blocks "Both", and the other way round.
+    both = Space(
+        name="Training Rooms (Both)",
+        type=SpaceType.training_room,
+        activity=ActivityType.training,
+        capacity=18 + 19,
+        requires_approval=True,
+        description="Combined Training Rooms 1+2 (both rooms as one booking)",
+    )
     spaces.append(
         Space(
             name="Training Room 1",
@@ -102,6 +137,7 @@ def create_spaces() -> list[Space]:
             capacity=18,
             requires_approval=True,
             description="Training room with 18 seats",
+            parent=both,
         )
     )
     spaces.append(
@@ -112,49 +148,153 @@ def create_spaces() -> list[Space]:
             capacity=19,
             requires_approval=True,
             description="Training room with 19 seats",
+            parent=both,
         )
     )
-    spaces.append(
-        Space(
-            name="Training Rooms (Both)",
-            type=SpaceType.training_room,
-            activity=ActivityType.training,
-            capacity=18 + 19,
-            requires_approval=True,
-            description="Combined Training Rooms 1+2 (both rooms as one booking)",
-        )
-    )
+    spaces.append(both)
 
     return spaces
 
-def seed():
-    Base.metadata.create_all(bind=engine)
-    db: Session = SessionLocal()
-    try:
-        # demo users
-        if not db.query(User).first():
-            admin = User(
-                email="admin@example.com",
-                full_name="Admin User",
-                password_hash=hash_password("Hackathon@1234"),
-                role=Role.admin,
-            )
-            user = User(
-                email="test@example.com",
-                full_name="Test User",
-                password_hash=hash_password("Hackathon@1234"),
-                role=Role.employee,
-            )
-            db.add_all([admin, user])
+def _seed(db: Session, clear_bookings: bool = False):
+    migrate(db.connection())
+    if clear_bookings:
+        # before the spaces they point to go
+        db.execute(delete(BookingSeries))
+        db.execute(delete(Booking))
+        db.execute(delete(ArchivedBooking))
+    # demo users
+    if not db.query(User).first():
+        admin = User(
+            email="admin@example.com",
+            full_name="Admin User",
+            password_hash=hash_password(DEMO_PASSWORD),
+            role=Role.admin,
+        )
+        user = User(
+            email="test@example.com",
+            full_name="Test User",
+            password_hash=hash_password(DEMO_PASSWORD),
+            role=Role.employee,
+        )
+        db.add_all([admin, user])
+
+    # wipe & reseed spaces
+    db.query(Space).delete()
+    db.add_all(create_spaces())
+    bump_revision(db)
+
+    db.commit()
+
+def _chunks(rows: Iterator[dict]) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _synthetic_users(count: int, password_hash: str) -> Iterator[dict]:
+    for i in range(1, count + 1):
+        yield {
+            "email": f"user{i}@example.com", "full_name": f"Synthetic User {i}",
+            "password_hash": password_hash, "role": Role.employee, "token_version": 0,
+        }
+
+def _capacity(space, start: datetime, end: datetime) -> int:
+    """Most bookings one space takes in [start, end): a day per desk booking, a quarter hour otherwise."""
+    return (end - start) // (DAY if space.type == SpaceType.desk else QUARTER)
+
+def _allocate(capacities: list[int], total: int) -> list[int]:
+    """Split `total` evenly, handing what full spaces cannot take to the others."""
+    counts = [0] * len(capacities)
+    open_ = [i for i, cap in enumerate(capacities) if cap]
+    while total and open_:
+        share, extra = divmod(total, len(open_))
+        for n, i in enumerate(open_):
+            take = min(share + (n < extra), capacities[i] - counts[i])
+            counts[i] += take
+            total -= take
+        open_ = [i for i in open_ if counts[i] < capacities[i]]
+    return counts
+
+def _space_bookings(space, user_ids: list[int], count: int, start: datetime, end: datetime, rng: random.Random):
+    """`count` non-overlapping bookings of one space in [start, end), one per equal slot."""
+    # desks: whole UTC days, 1-3 of them; other spaces: 15 minutes to 4 hours
+    unit, longest = (DAY, 3) if space.type == SpaceType.desk else (QUARTER, 16)
+    capacity = _capacity(space, start, end)
+    for k in range(count):
+        # Slots of (almost) equal size spread over the whole range, not packed at its start
+        begin = k * capacity // count
+        slot = (k + 1) * capacity // count - begin
+        length = rng.randint(1, min(longest, slot))
+        first = start + unit * (begin + rng.randrange(slot - length + 1))
+        yield first, first + unit * length, rng.choice(user_ids)
+
+def _synthetic_bookings(spaces: list, user_ids: list[int], total: int, years: float, rng: random.Random) -> Iterator[dict]:
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start, end = today - timedelta(days=round(365 * years)), today + FUTURE
+    counts = _allocate([_capacity(space, start, end) for space in spaces], total)
+    for space, count in zip(spaces, counts):
+        if not count:
+            continue
+        for b_start, b_end, user_id in _space_bookings(space, user_ids, count, start, end, rng):
+            roll = rng.random()
+            if roll < 0.1:
+                status = BookingStatus.cancelled
+            elif space.requires_approval:
+                status = BookingStatus.rejected if roll < 0.2 else (
+                    BookingStatus.pending if b_end > today and roll < 0.5 else BookingStatus.approved)
+            else:
+                status = BookingStatus.approved
+            yield {
+                "user_id": user_id, "space_id": space.id, "title": f"{space.name} booking",
+                "attendees": rng.randint(1, space.capacity), "start_utc": b_start, "end_utc": b_end,
+                "status": status,
+            }
+
+def _seed_synthetic(db: Session, users: int, bookings: int, years: float, seed: int) -> dict:
+    """Bulk-insert synthetic users and bookings; returns the number of rows of each."""
+    rng = random.Random(seed)
+    inserted = {"users": 0, "bookings": 0}
+    if users:
+        existing = db.execute(select(User.email).where(User.email.like("user%@example.com"))).scalars()
+        taken = set(existing)
+        rows = (u for u in _synthetic_users(users, hash_password(DEMO_PASSWORD)) if u["email"] not in taken)
+        for chunk in _chunks(rows):
+            db.execute(insert(User), chunk)
+            inserted["users"] += len(chunk)
+    if bookings:
+        user_ids = list(db.execute(select(User.id)).scalars())
+        # Only spaces with no members: related spaces would block each other's bookings
+        combined = select(Space.parent_id).where(Space.parent_id.is_not(None))
+        spaces = db.execute(
+            select(Space).where(Space.is_bookable == True, Space.id.not_in(combined)).order_by(Space.id)
+        ).scalars().all()
+        for chunk in _chunks(_synthetic_bookings(spaces, user_ids, bookings, years, rng)):
+            db.execute(insert(Booking), chunk)
+            inserted["bookings"] += len(chunk)
+    db.commit()
+    return inserted
 
-        # wipe & reseed spaces
-        db.query(Space).delete()
-        db.add_all(create_spaces())
+def seed(users: int = 0, bookings: int = 0, years: float = 2.0, random_seed: int = 0):
+    run_session(lambda db: _seed(db, clear_bookings=bookings > 0))
+    print("Seed completed.")
+    if users or bookings:
+        t0 = time.perf_counter()
+        inserted = run_session(lambda db: _seed_synthetic(db, users, bookings, years, random_seed))
+        print(f"Synthetic data: {inserted['users']} users, {inserted['bookings']} bookings "
+              f"in {time.perf_counter() - t0:.1f}s.")
 
-        db.commit()
-        print("Seed completed.")
-    finally:
-        db.close()
+def main():
+    parser = argparse.ArgumentParser(description="Seed demo spaces and users, optionally with synthetic volume")
+    parser.add_argument("--users", type=int, default=0, help="synthetic employees (user<N>@example.com)")
+    parser.add_argument("--bookings", type=int, default=0, help="synthetic bookings; replaces existing bookings")
+    parser.add_argument("--years", type=float, default=2.0, help="history the bookings span, up to 90 days ahead")
+    parser.add_argument("--seed", type=int, default=0, help="random seed, for reproducible data")
+    args = parser.parse_args()
+    seed(args.users, args.bookings, args.years, args.seed)
 
 if __name__ == "__main__":
-    seed()
+    main()
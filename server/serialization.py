@@ -0,0 +1,80 @@
+"""JSON bodies for the hot list endpoints, without response_model validation.
+
+The handlers select plain rows and build the body here. Each embedded space
+is encoded once per catalog revision and spliced into every booking that
+points at it. `fields=` picks a subset of the top-level fields.
+
+orjson (in requirements.txt) does the encoding; if it is missing, the
+stdlib encoder does. Both write UTC datetimes with a trailing "Z", as pydantic does,
+so the bodies match the response models.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; stdlib json is the fallback
+    orjson = None
+
+SPACE_FIELDS = (
+    "name", "type", "activity", "capacity", "requires_approval", "is_bookable", "description", "parent_id", "id",
+)
+# BookingOut order; "space" is spliced in from pre-encoded spaces
+BOOKING_FIELDS = (
+    "id", "user_id", "space_id", "title", "attendees", "start_utc", "end_utc", "status", "notes", "space", "series_id",
+)
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(value: Any) -> bytes:
+        return _encoder.encode(value).encode()
+
+class JSONBytes(Response):
+    """An already encoded JSON body."""
+    media_type = "application/json"
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """`fields=a,b` as the requested names in response order; None means all of them."""
+    if not fields:
+        return None
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in allowed if f in wanted]
+
+def array(items: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
+
+def encode_space(space: Dict[str, Any], fields: Optional[List[str]] = None) -> bytes:
+    return dumps({f: space[f] for f in (fields or SPACE_FIELDS)})
+
+def encode_booking(booking: Dict[str, Any], spaces: Dict[int, bytes], fields: Optional[List[str]] = None) -> bytes:
+    """`booking` holds every BOOKING_FIELDS value but "space"; `spaces` maps space id to its JSON."""
+    fields = fields or BOOKING_FIELDS
+    if "space" not in fields:
+        return dumps({f: booking[f] for f in fields})
+    at = fields.index("space")
+    parts = []
+    if at:
+        parts.append(dumps({f: booking[f] for f in fields[:at]})[1:-1])
+    parts.append(b'"space":' + spaces[booking["space_id"]])
+    if at + 1 < len(fields):
+        parts.append(dumps({f: booking[f] for f in fields[at + 1:]})[1:-1])
+    return b"{" + b",".join(parts) + b"}"
@@ -1,13 +1,66 @@
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, field_validator
 from typing import List
+import os
 
 class Settings(BaseSettings):
     SECRET_KEY: str = "change-me-please"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 720
     DATABASE_URL: str = "sqlite:///./office.db"
+    # "production" turns a file-based SQLite database into WAL mode with tuned
+    # pragmas, a pool of read-only connections and a single serialized writer
+    SQLITE_PROFILE: str = "default"
+    SQLITE_READ_POOL_SIZE: int = 8
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
     ENV: str = "dev"
     CORS_ORIGINS: str | None = None  # comma-separated
+    # Per worker; changes (revoked tokens, role, email) reach other workers only when their entry expires
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    # Argon2 cost; stored hashes are upgraded on next login when these change
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    HASH_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)  # 0 = hash inline
+    HASH_QUEUE_LIMIT: int = 16  # keep below the request thread pool size (40)
+    HASH_WORKER_NICE: int = 10
+    # Desks are booked in whole local days; DST days may be 23h or 25h long
+    DESK_MAX_DAYS: int = 7
+    BULK_BOOKING_MAX_ITEMS: int = 200
+    BULK_DECISION_MAX_ITEMS: int = 5000
+    SERIES_MAX_DAYS: int = 730
+    SERIES_MAX_OCCURRENCES: int = 1000
+    ANALYTICS_CACHE_SIZE: int = 256  # closed-month aggregates per worker
+    ANALYTICS_MAX_DAYS: int = 1100
+    # Hot/cold storage: bookings that ended this many days ago move to bookings_archive; 0 = off
+    ARCHIVE_AFTER_DAYS: float = 0
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0  # per worker; 0 = only `python -m server.archive`
+    ARCHIVE_BATCH_SIZE: int = 5000  # rows moved per transaction
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched and encoded per chunk of GET /bookings/export
+    # Availability push: "memory" (single worker) or redis://host:port/db to fan out across workers
+    EVENTS_BROKER_URL: str = "memory"
+    EVENTS_QUEUE_SIZE: int = 256  # frames buffered per subscriber before it is told to resync
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    # Day views of /spaces/{id}/availability: "memory" (per worker) or redis://host:port/db (shared)
+    AVAILABILITY_CACHE_URL: str = "memory"
+    AVAILABILITY_CACHE_SIZE: int = 20_000  # entries per worker; 0 disables the cache
+    AVAILABILITY_CACHE_TTL_SECONDS: float = 3600.0  # safety net only: writes invalidate precisely
+    # Idempotency-Key responses: "memory" (per worker) or redis://host:port/db (shared, coalesces across workers)
+    IDEMPOTENCY_STORE_URL: str = "memory"
+    IDEMPOTENCY_CACHE_SIZE: int = 20_000  # responses per worker; 0 ignores the header
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0  # a duplicate waits this long for the first request, then gets 409
+    # GET /metrics (Prometheus text format, per worker)
+    METRICS_ENABLED: bool = True
+    SLOW_QUERY_MS: float = 200.0  # statements slower than this are logged to "server.db.slow"; 0 = off
+    # Sampling profiler: fraction of requests sampled, and/or X-Profile: 1 on demand
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_HEADER: bool = False
+    PROFILE_SLOW_MS: float = 500.0  # sampled requests faster than this are not written
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_DIR: str = "./profiles"
 
     @property
     def origins(self) -> List[str]: